@@ -0,0 +1,95 @@
+"""
+Move embedded User.meals arrays into the per-meal `meals` collection
+
+For every user document that still has a `meals` array, each logged meal is
+upserted into the meals collection keyed on the username and its position
+in the array (legacy_key, "<date>/<n>"), then the array is removed from the
+user document. Re-running is safe: already copied meals match their key and
+are left alone, and users without an array are skipped. Run it after
+deploying the code that reads from the collection; meals logged in between
+already go to the collection and are unaffected.
+
+Meal times are stored zero-padded ("08:30", see normalize_meal_time) so they
+sort in time order. Copied meals are normalized on the way, and meals
+already in the collection with a time like "8:30" are rewritten in place.
+
+Usage (from Backend/FastAPI):
+    python -m auth.migrate_meals [--dry-run] [--keep-embedded] [--batch-size 500]
+"""
+import argparse
+import re
+import time
+
+from pymongo import UpdateOne
+
+from auth.mod.Config import collection, meals
+from auth.mod.meals import ensure_meal_indexes, meal_document
+from auth.mod.models import Meal, normalize_meal_time
+
+_PADDED_TIME = re.compile(r"^\d{2}:\d{2}$")
+
+
+def _operations(user):
+    for day in user.get("meals") or []:
+        for n, entry in enumerate(day.get("meals") or []):
+            document = meal_document(user["username"], day["date"], Meal(**entry))
+            # Position, not content, so two identical meals on one day both survive
+            document["legacy_key"] = f"{day['date']}/{n}"
+            key = {"username": user["username"], "legacy_key": document["legacy_key"]}
+            yield UpdateOne(key, {"$setOnInsert": document}, upsert=True)
+
+
+def normalize_times(dry_run: bool = False, batch_size: int = 500) -> int:
+    """Rewrite stored meal times that are not HH:MM yet; returns how many changed"""
+    operations = []
+    for document in meals.find({"time": {"$not": _PADDED_TIME}}, {"time": 1}):
+        normalized = normalize_meal_time(document["time"])
+        if normalized != document["time"]:
+            operations.append(UpdateOne({"_id": document["_id"]}, {"$set": {"time": normalized}}))
+    if not dry_run:
+        for i in range(0, len(operations), batch_size):
+            meals.bulk_write(operations[i:i + batch_size], ordered=False)
+    return len(operations)
+
+
+def migrate(dry_run: bool = False, keep_embedded: bool = False, batch_size: int = 500):
+    ensure_meal_indexes(meals)
+    started = time.perf_counter()
+    users = copied = skipped = 0
+
+    cursor = collection.find({"meals.0": {"$exists": True}}, {"username": 1, "meals": 1})
+    for user in cursor:
+        users += 1
+        try:
+            operations = list(_operations(user))
+        except ValueError as e:
+            # Entries that never validated are reported and left in place
+            print(f"{user['username']}: skipped, invalid meal entry ({e})")
+            skipped += 1
+            continue
+
+        if dry_run:
+            copied += len(operations)
+            continue
+
+        for i in range(0, len(operations), batch_size):
+            result = meals.bulk_write(operations[i:i + batch_size], ordered=False)
+            copied += result.upserted_count
+        if not keep_embedded:
+            collection.update_one({"_id": user["_id"]}, {"$unset": {"meals": ""}})
+
+    retimed = normalize_times(dry_run, batch_size)
+
+    verb = "would copy" if dry_run else "copied"
+    print(f"{users} users, {verb} {copied} meals, {skipped} users skipped, "
+          f"{retimed} meal times {'to normalize' if dry_run else 'normalized'} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="count what would be copied, change nothing")
+    parser.add_argument("--keep-embedded", action="store_true", help="copy without removing User.meals")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    migrate(args.dry_run, args.keep_embedded, args.batch_size)
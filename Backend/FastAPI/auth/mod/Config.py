@@ -13,10 +13,16 @@ client = MongoClient(uri, server_api=ServerApi('1'))
 db = client.CareNest
 collection = db.Users
 vaccines = db.master_vaccine
+# One document per logged meal; see auth/mod/meals.py
+meals = db.meals
+# Meal compositions Gemini has analyzed, keyed by normalized name; see auth/mod/compositions.py
+meal_compositions = db.meal_compositions
 
 # Send a ping to confirm a successful connection
 try:
     client.admin.command('ping')
     print("Pinged your deployment. You successfully connected to MongoDB!")
+    from auth.mod.meals import ensure_meal_indexes
+    ensure_meal_indexes(meals)
 except Exception as e:
     print(e)
\ No newline at end of file
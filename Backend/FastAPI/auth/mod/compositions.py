@@ -0,0 +1,276 @@
+"""
+Meal composition lookup without a Gemini call for common foods
+
+Meal names are normalized ("2 bowls of Dal-Rice" -> "dal rice") and resolved
+in order of cost:
+
+    memory   in-process LRU of recent lookups
+    table    bundled nutrient table (data/nutrient_table.json) with aliases
+    store    `meal_compositions` collection: every dish Gemini has analyzed
+    fuzzy    a known name with the same words up to typos ("chiken curry")
+    gemini   the fallback, whose answer is written to the store
+
+Only the last step leaves the process for longer than a Mongo round trip,
+and its result is shared by every later lookup of the same dish.
+"""
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from pymongo.errors import PyMongoError
+
+from auth.mod.models import MealComposition
+from core.tracing import Counter, register_metric
+from core.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+NUTRIENT_TABLE_PATH = os.getenv(
+    "NUTRIENT_TABLE_PATH", os.path.join(os.path.dirname(__file__), "..", "..", "data", "nutrient_table.json")
+)
+# Upper bound on analyzed dish names kept in memory for fuzzy matching
+COMPOSITION_FUZZY_MAX_KEYS = 20000
+
+DEFAULT_COMPOSITION = MealComposition(carbs=0.4, proteins=0.3, fats=0.3)
+
+SOURCES = ("memory", "table", "store", "fuzzy", "gemini", "default")
+# Sources answered without asking Gemini
+HIT_SOURCES = ("memory", "table", "store", "fuzzy")
+
+lookups = register_metric(Counter(
+    "meal_composition_lookups_total",
+    "Meal composition lookups by where the answer came from",
+    ("source",)
+))
+
+# Quantities, containers and sizes say nothing about the ratio of macronutrients
+_FILLER = {
+    "a", "an", "the", "of", "and", "with", "some", "my", "homemade", "fresh",
+    "small", "medium", "large", "big", "half", "full", "one", "two", "three",
+    "plate", "bowl", "cup", "glass", "piece", "slice", "serving", "portion", "katori",
+    "g", "gm", "gms", "gram", "kg", "ml", "l", "tbsp", "tsp",
+}
+_TOKEN = re.compile(r"[a-z]+")
+
+
+def _singular(token: str) -> str:
+    if token.endswith("es") and token[:-2] in _FILLER:
+        return token[:-2]
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us")):
+        return token[:-1]
+    return token
+
+
+def normalize_meal_name(name: str) -> str:
+    """Lowercase, drop quantities and filler words, singularize, sort the words"""
+    tokens = (_singular(token) for token in _TOKEN.findall(name.lower()))
+    return " ".join(sorted({token for token in tokens if token not in _FILLER}))
+
+
+def _max_edits(token: str) -> int:
+    # Short words are where one letter changes the dish (veg/egg, dal/daal is
+    # an alias instead), so they have to match exactly
+    if len(token) <= 3:
+        return 0
+    return 1 if len(token) <= 6 else 2
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, or limit + 1 as soon as it is known to exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def typo_distance(query: List[str], candidate: List[str]) -> Optional[int]:
+    """
+    Total edits if every word of the query is a misspelling of a distinct word
+    of the candidate (and nothing is left over), else None
+
+    Swapping, adding or dropping a word is never a typo, so "veg curry" does
+    not match "egg curry" and "egg biryani" does not match "veg biryani".
+    """
+    if len(query) != len(candidate):
+        return None
+    remaining = list(candidate)
+    total = 0
+    for token in query:
+        limit = _max_edits(token)
+        best = None
+        for i, other in enumerate(remaining):
+            distance = _edit_distance(token, other, limit)
+            if distance <= limit and (best is None or distance < best[1]):
+                best = (i, distance)
+        if best is None:
+            return None
+        total += best[1]
+        del remaining[best[0]]
+    return total
+
+
+def load_nutrient_table(path: str = NUTRIENT_TABLE_PATH) -> Dict[str, MealComposition]:
+    """Bundled table keyed by normalized name, aliases included"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Nutrient table not loaded from {path}: {e}")
+        return {}
+
+    table: Dict[str, MealComposition] = {}
+    for name, entry in raw.items():
+        composition = MealComposition(carbs=entry["carbs"], proteins=entry["proteins"], fats=entry["fats"])
+        for alias in [name, *entry.get("aliases", [])]:
+            key = normalize_meal_name(alias)
+            if key:
+                table.setdefault(key, composition)
+    return table
+
+
+class CompositionCache:
+    """Tiered meal composition lookup; `store` is the meal_compositions collection"""
+
+    def __init__(self, store, table: Optional[Dict[str, MealComposition]] = None,
+                 ttl_seconds: float = 24 * 3600, max_entries: int = 4096):
+        self.store = store
+        self.table = load_nutrient_table() if table is None else table
+        self.memory = TTLCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+
+        # Names fuzzy matching can snap to; analyzed dishes are read lazily
+        self._known = set(self.table)
+        self._store_keys_loaded = False
+        self._lock = threading.Lock()
+
+    # --- tiers ---
+
+    def _from_store(self, key: str) -> Optional[MealComposition]:
+        if self.store is None:
+            return None
+        try:
+            document = self.store.find_one({"_id": key}, {"carbs": 1, "proteins": 1, "fats": 1})
+        except PyMongoError as e:
+            logger.warning(f"Composition store unavailable: {e}")
+            return None
+        if document is None:
+            return None
+        return MealComposition(carbs=document["carbs"], proteins=document["proteins"], fats=document["fats"])
+
+    def _known_keys(self) -> Iterable[str]:
+        with self._lock:
+            if not self._store_keys_loaded and self.store is not None:
+                try:
+                    cursor = self.store.find({}, {"_id": 1}).limit(COMPOSITION_FUZZY_MAX_KEYS)
+                    self._known.update(document["_id"] for document in cursor)
+                    self._store_keys_loaded = True
+                except PyMongoError as e:
+                    logger.warning(f"Composition store unavailable: {e}")
+            return list(self._known)
+
+    def _fuzzy(self, key: str) -> Optional[MealComposition]:
+        tokens = key.split()
+        matches = []
+        for known in self._known_keys():
+            distance = typo_distance(tokens, known.split())
+            if distance is not None:
+                matches.append((distance, known))
+        if not matches:
+            return None
+        matches.sort()
+        if len(matches) > 1 and matches[1][0] == matches[0][0]:
+            # Equally close to two dishes: a guess either way
+            return None
+        match = matches[0][1]
+        return self.table.get(match) or self._from_store(match)
+
+    def _remember(self, key: str, meal_name: str, composition: MealComposition):
+        self.memory.put(key, composition)
+        with self._lock:
+            if len(self._known) < COMPOSITION_FUZZY_MAX_KEYS:
+                self._known.add(key)
+        if self.store is None:
+            return
+        try:
+            self.store.update_one(
+                {"_id": key},
+                {"$setOnInsert": {**composition.model_dump(), "meal_name": meal_name,
+                                  "created_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except PyMongoError as e:
+            logger.warning(f"Composition for {key!r} not stored: {e}")
+
+    # --- lookup ---
+
+    def lookup(self, meal_name: str) -> Tuple[Optional[MealComposition], Optional[str]]:
+        """
+        Composition and the tier that answered, without calling Gemini
+
+        (None, None) means the dish is unknown. Hits are counted here, misses
+        by whoever resolves them.
+        """
+        key = normalize_meal_name(meal_name)
+        if not key:
+            return None, None
+
+        composition = self.memory.get(key)
+        if composition is not None:
+            lookups.inc(source="memory")
+            return composition, "memory"
+
+        for source, tier in (("table", self.table.get), ("store", self._from_store), ("fuzzy", self._fuzzy)):
+            composition = tier(key)
+            if composition is not None:
+                self.memory.put(key, composition)
+                lookups.inc(source=source)
+                return composition, source
+        return None, None
+
+    def get(self, meal_name: str, fallback: Callable[[str], MealComposition]) -> MealComposition:
+        """Composition from the cheapest tier that knows the dish, else from `fallback` (Gemini)"""
+        composition, _ = self.lookup(meal_name)
+        if composition is not None:
+            return composition
+
+        try:
+            composition = fallback(meal_name)
+        except Exception as e:
+            # Not cached: the next request for this dish asks again
+            logger.error(f"Error getting composition for {meal_name}: {e}")
+            lookups.inc(source="default")
+            return DEFAULT_COMPOSITION
+
+        self.remember(meal_name, composition)
+        return composition
+
+    def remember(self, meal_name: str, composition: MealComposition):
+        """Record a composition Gemini produced so later lookups of the dish hit"""
+        lookups.inc(source="gemini")
+        key = normalize_meal_name(meal_name)
+        if key:
+            self._remember(key, meal_name, composition)
+
+    def stats(self) -> Dict:
+        counts = {source: int(lookups.value(source=source)) for source in SOURCES}
+        total = sum(counts.values())
+        hits = sum(counts[source] for source in HIT_SOURCES)
+        return {
+            "lookups": counts,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "table_entries": len(self.table),
+            "known_names": len(self._known),
+            "memory": self.memory.stats(),
+        }
@@ -0,0 +1,300 @@
+"""
+Background composition enrichment for meals stored as pending
+
+/meals/add stores a meal straight away. When the composition cache cannot
+answer without Gemini, the meal is written with composition_status "pending"
+and its ID is handed to CompositionEnricher, whose worker thread
+
+    - gathers pending meals for up to max_wait_seconds (or max_batch_size),
+    - answers from the composition cache where it can (another meal in the
+      queue may have taught it the dish),
+    - asks Gemini about the remaining distinct dishes in one batched prompt,
+    - writes the compositions back to every meal of that dish.
+
+A failed batch, or a dish Gemini left out of its answer, is retried with
+exponential backoff; after max_attempts the meal gets the default estimate
+and composition_status "failed".
+
+The queue lives in memory but the pending state lives in MongoDB. Before
+asking Gemini the worker leases each meal with an atomic find_one_and_update
+(auth/mod/meals.py), so with several uvicorn workers a meal is only resolved
+by one of them. Every sweep_interval_seconds the worker also sweeps the
+pending index for meals nobody holds: left by a process that exited, or
+whose lease ran out. Meals newer than one interval are left to the process
+that stored them.
+"""
+import heapq
+import itertools
+import logging
+import os
+import queue
+import random
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+
+from auth.mod import meals as meal_store
+from auth.mod.compositions import DEFAULT_COMPOSITION, CompositionCache, lookups, normalize_meal_name
+from auth.mod.models import MealComposition
+from core.tracing import Counter, register_metric
+
+logger = logging.getLogger(__name__)
+
+enrichments = register_metric(Counter(
+    "meal_enrichment_total",
+    "Pending meal compositions by outcome (cache, gemini, retry, failed, claimed_elsewhere)",
+    ("outcome",)
+))
+
+
+@dataclass
+class _Job:
+    meal_id: ObjectId
+    meal_name: str
+    attempts: int = 0
+
+
+class CompositionEnricher:
+    """
+    Worker thread that resolves pending meal compositions in batches
+
+    `batch_fn` takes a list of dish names and returns one MealComposition (or
+    None when it has no usable answer for that dish) per name, in order.
+    """
+
+    def __init__(self, meals, cache: CompositionCache,
+                 batch_fn: Callable[[List[str]], List[Optional[MealComposition]]],
+                 max_batch_size: int = 8, max_wait_seconds: float = 0.5, max_attempts: int = 5,
+                 base_delay: float = 2.0, max_delay: float = 300.0,
+                 lease_seconds: float = 300.0, sweep_interval_seconds: float = 60.0, sweep_limit: int = 100):
+        self.meals = meals
+        self.cache = cache
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_seconds
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Must outlast one Gemini call; a lease still held after a crash blocks the meal this long
+        self.lease_seconds = lease_seconds
+        self.sweep_interval = sweep_interval_seconds
+        self.sweep_limit = sweep_limit
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        # (due, seq, job); only touched by the worker thread
+        self._retries: List[tuple] = []
+        self._seq = itertools.count()
+        # Meals queued, waiting for a retry or in a batch, so a sweep does not queue them twice
+        self._held: Set[ObjectId] = set()
+        self._next_sweep = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+        self.batches = 0
+        self.llm_calls = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.swept = 0
+
+    # --- producer side (request threads) ---
+
+    def submit(self, meal_id: str, meal_name: str):
+        job = _Job(ObjectId(meal_id), meal_name)
+        with self._lock:
+            self._held.add(job.meal_id)
+        self._ensure_worker()
+        self._queue.put(job)
+
+    def resume(self):
+        """Start the worker, whose first sweep picks up meals left pending"""
+        self._ensure_worker()
+
+    def stop(self):
+        self._stopping.set()
+        self._queue.put(None)
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="composition-enricher", daemon=True)
+                self._thread.start()
+
+    # --- worker ---
+
+    def _release(self, jobs: List[_Job]):
+        with self._lock:
+            self._held.difference_update(job.meal_id for job in jobs)
+
+    def _sweep(self):
+        """Queue pending meals no process holds, leased to this one"""
+        self._next_sweep = time.monotonic() + self.sweep_interval
+        logged_before = datetime.utcnow() - timedelta(seconds=self.sweep_interval)
+        found = 0
+        try:
+            while found < self.sweep_limit:
+                with self._lock:
+                    held = list(self._held)
+                doc = meal_store.claim_pending(self.meals, self.owner, self.lease_seconds, logged_before, held)
+                if doc is None:
+                    break
+                found += 1
+                with self._lock:
+                    self._held.add(doc["_id"])
+                self._queue.put(_Job(doc["_id"], doc["meal_name"]))
+        except PyMongoError as e:
+            logger.error(f"Pending meal sweep failed: {e}")
+        if found:
+            self.swept += found
+            logger.info(f"Resuming composition enrichment for {found} pending meals")
+
+    def _claim(self, batch: List[_Job]) -> List[_Job]:
+        """The jobs of the batch this process holds the lease for; the rest are dropped"""
+        claimed, lost = [], []
+        for job in batch:
+            (claimed if meal_store.claim_meal(self.meals, job.meal_id, self.owner, self.lease_seconds)
+             else lost).append(job)
+        if lost:
+            # Resolved already, or another process holds the meal
+            enrichments.inc(len(lost), outcome="claimed_elsewhere")
+            self._release(lost)
+        return claimed
+
+    def _due_retries(self) -> List[_Job]:
+        now = time.monotonic()
+        due = []
+        while self._retries and self._retries[0][0] <= now and len(due) < self.max_batch_size:
+            due.append(heapq.heappop(self._retries)[2])
+        return due
+
+    def _collect(self) -> List[_Job]:
+        batch = self._due_retries()
+        if not batch:
+            wake = min(self._next_sweep, self._retries[0][0]) if self._retries else self._next_sweep
+            timeout = max(wake - time.monotonic(), 0)
+            try:
+                job = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                return self._due_retries()
+            if job is None:
+                return []
+            batch.append(job)
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if job is None:
+                break
+            batch.append(job)
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            if time.monotonic() >= self._next_sweep:
+                self._sweep()
+            batch = self._collect()
+            if not batch:
+                continue
+            try:
+                batch = self._claim(batch)
+                if not batch:
+                    continue
+                self.batches += 1
+                self.items += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+                self._process(batch)
+            except Exception as e:
+                logger.error(f"Composition enrichment batch of {len(batch)} failed: {e}")
+                self._retry(batch)
+
+    def _process(self, batch: List[_Job]):
+        # One answer per distinct dish, however many meals share it
+        dishes: Dict[str, List[_Job]] = {}
+        for job in batch:
+            key = normalize_meal_name(job.meal_name) or job.meal_name.strip().lower()
+            dishes.setdefault(key, []).append(job)
+
+        unknown = []
+        for jobs in dishes.values():
+            composition, _ = self.cache.lookup(jobs[0].meal_name)
+            if composition is not None:
+                self._finish(jobs, composition, "ready")
+                enrichments.inc(len(jobs), outcome="cache")
+            else:
+                unknown.append(jobs)
+        if not unknown:
+            return
+
+        names = [jobs[0].meal_name for jobs in unknown]
+        self.llm_calls += 1
+        try:
+            results = self.batch_fn(names)
+        except Exception as e:
+            logger.error(f"Gemini composition batch of {len(names)} dishes failed: {e}")
+            self._retry([job for jobs in unknown for job in jobs])
+            return
+
+        for jobs, composition in zip(unknown, results):
+            if composition is None:
+                self._retry(jobs)
+                continue
+            self.cache.remember(jobs[0].meal_name, composition)
+            self._finish(jobs, composition, "ready")
+            enrichments.inc(len(jobs), outcome="gemini")
+
+    def _finish(self, jobs: List[_Job], composition: MealComposition, status: str):
+        meal_store.set_composition(self.meals, [job.meal_id for job in jobs], composition.model_dump(), status)
+        self._release(jobs)
+
+    def _retry(self, jobs: List[_Job]):
+        # One jitter per failed batch: its meals retry together, apart from other batches
+        jitter = random.uniform(0.8, 1.2)
+        now = time.monotonic()
+        for job in jobs:
+            job.attempts += 1
+            if job.attempts >= self.max_attempts:
+                logger.error(f"Giving up on the composition of {job.meal_name!r} after {job.attempts} attempts")
+                lookups.inc(source="default")
+                enrichments.inc(outcome="failed")
+                try:
+                    self._finish([job], DEFAULT_COMPOSITION, "failed")
+                except Exception as e:
+                    # A later sweep picks it up once the lease runs out
+                    logger.error(f"Meal {job.meal_id} left pending: {e}")
+                    self._release([job])
+                continue
+            enrichments.inc(outcome="retry")
+            delay = min(self.base_delay * 2 ** (job.attempts - 1), self.max_delay)
+            due = now + delay * jitter
+            heapq.heappush(self._retries, (due, next(self._seq), job))
+
+    def stats(self) -> Dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "waiting_retry": len(self._retries),
+            "held": len(self._held),
+            "swept": self.swept,
+            "max_batch_size": self.max_batch_size,
+            "batches": self.batches,
+            "llm_calls": self.llm_calls,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "outcomes": {outcome: int(enrichments.value(outcome=outcome))
+                         for outcome in ("cache", "gemini", "retry", "failed", "claimed_elsewhere")},
+        }
@@ -0,0 +1,187 @@
+"""
+Meal log storage: one document per logged meal in the `meals` collection
+
+    {username, date: "YYYY-MM-DD", time: "HH:MM", meal_name, meal_type,
+     composition: {carbs, proteins, fats} | null, composition_status, created_at}
+
+composition is null while composition_status is "pending"; the enrichment
+worker (auth/mod/enrichment.py) fills it in after the meal is stored. A
+worker leases a pending meal before asking Gemini about it (claimed_by,
+claimed_until), so API processes sharing the database never resolve the
+same meal at once, and a lease left by a process that died expires.
+
+Every read is a range scan on the (username, date, time) index with a
+projection, so its cost depends on the days asked for, not on how long the
+user has been logging. Functions take the collection as an argument so the
+migration tool and benchmarks can point them at another database.
+"""
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+from auth.mod.models import DayMeal, Meal
+
+MEAL_INDEX = [("username", ASCENDING), ("date", ASCENDING), ("time", ASCENDING)]
+
+# Only what DayMeal/Meal need (_id becomes meal_id); username and bookkeeping fields stay in the database
+MEAL_PROJECTION = {"date": 1, "time": 1, "meal_name": 1, "meal_type": 1, "composition": 1, "composition_status": 1}
+
+
+def ensure_meal_indexes(meals) -> None:
+    """Idempotent; cheap when the index already exists"""
+    meals.create_index(MEAL_INDEX, name="username_date_time")
+    # Only pending meals are indexed, so the workers' periodic sweep stays small
+    meals.create_index("composition_status", name="pending_compositions",
+                       partialFilterExpression={"composition_status": "pending"})
+
+
+def meal_document(username: str, date: str, meal: Meal) -> Dict:
+    return {
+        "username": username,
+        "date": date,
+        **meal.model_dump(exclude={"meal_id"}),
+        "created_at": datetime.utcnow(),
+    }
+
+
+def insert_meal(meals, username: str, date: str, meal: Meal) -> str:
+    """Store the meal and return its ID"""
+    return str(meals.insert_one(meal_document(username, date, meal)).inserted_id)
+
+
+def _meal(doc: Dict) -> Dict:
+    fields = {k: v for k, v in doc.items() if k not in ("_id", "date")}
+    fields["meal_id"] = str(doc["_id"])
+    return fields
+
+
+def _iter_days(documents) -> Iterator[DayMeal]:
+    """Group a cursor sorted by date into DayMeal objects, one day at a time"""
+    for date, docs in groupby(documents, key=lambda doc: doc["date"]):
+        yield DayMeal(date=date, meals=[_meal(doc) for doc in docs])
+
+
+def find_meal(meals, username: str, meal_id: str) -> Optional[Meal]:
+    """One of the user's meals by ID; raises bson.errors.InvalidId for a malformed ID"""
+    doc = meals.find_one({"_id": ObjectId(meal_id), "username": username}, MEAL_PROJECTION)
+    return Meal(**_meal(doc)) if doc is not None else None
+
+
+def _claimable(owner: str, now: datetime) -> Dict:
+    # Never leased, lease expired, or already leased to this owner
+    return {"composition_status": "pending",
+            "$or": [{"claimed_until": None}, {"claimed_until": {"$lt": now}}, {"claimed_by": owner}]}
+
+
+def _lease(owner: str, now: datetime, lease_seconds: float) -> Dict:
+    return {"$set": {"claimed_by": owner, "claimed_until": now + timedelta(seconds=lease_seconds)}}
+
+
+def claim_meal(meals, meal_id: ObjectId, owner: str, lease_seconds: float) -> bool:
+    """Lease (or renew the lease on) one pending meal; False if it is resolved or leased elsewhere"""
+    now = datetime.utcnow()
+    query = {"_id": meal_id, **_claimable(owner, now)}
+    return meals.find_one_and_update(query, _lease(owner, now, lease_seconds), {"_id": 1}) is not None
+
+
+def claim_pending(meals, owner: str, lease_seconds: float, logged_before: datetime,
+                  exclude: Iterable[ObjectId] = ()) -> Optional[Dict]:
+    """
+    Lease the oldest claimable pending meal logged before `logged_before`,
+    skipping the IDs in `exclude`; returns {_id, meal_name} or None
+    """
+    now = datetime.utcnow()
+    query = {**_claimable(owner, now), "_id": {"$lt": ObjectId.from_datetime(logged_before), "$nin": list(exclude)}}
+    return meals.find_one_and_update(
+        query, _lease(owner, now, lease_seconds), {"meal_name": 1}, sort=[("_id", ASCENDING)]
+    )
+
+
+def set_composition(meals, meal_ids: List[ObjectId], composition: Dict, status: str = "ready") -> int:
+    """Fill in the composition of pending meals and release them; meals already resolved are left alone"""
+    result = meals.update_many(
+        {"_id": {"$in": meal_ids}, "composition_status": "pending"},
+        {"$set": {"composition": composition, "composition_status": status},
+         "$unset": {"claimed_by": "", "claimed_until": ""}}
+    )
+    return result.modified_count
+
+
+def find_day(meals, username: str, date: str) -> Optional[DayMeal]:
+    documents = meals.find({"username": username, "date": date}, MEAL_PROJECTION).sort("time", ASCENDING)
+    return next(_iter_days(documents), None)
+
+
+def find_days(meals, username: str, date_from: Optional[str] = None, date_to: Optional[str] = None,
+              limit: Optional[int] = None, after: Optional[str] = None) -> Tuple[List[DayMeal], Optional[str]]:
+    """
+    Days with logged meals in [date_from, date_to], oldest first
+
+    At most `limit` days are returned, starting after the date `after`. The
+    second value is the cursor for the next page (the last date returned),
+    or None when there is nothing more.
+    """
+    query: Dict = {"username": username}
+    date_range = {}
+    if date_from:
+        date_range["$gte"] = date_from
+    if after and (not date_from or after >= date_from):
+        date_range.pop("$gte", None)
+        date_range["$gt"] = after
+    if date_to:
+        date_range["$lte"] = date_to
+    if date_range:
+        query["date"] = date_range
+    documents = meals.find(query, MEAL_PROJECTION).sort([("date", ASCENDING), ("time", ASCENDING)])
+
+    days = []
+    for day in _iter_days(documents):
+        if limit is not None and len(days) == limit:
+            # One more day exists past this page; stop reading the cursor here
+            documents.close()
+            return days, days[-1].date
+        days.append(day)
+    return days, None
+
+
+def composition_average(meals, username: str, window: int, unit: str = "meals") -> Optional[Dict]:
+    """
+    Mean composition over the user's last `window` meals, or over the meals of
+    the last `window` days (unit="days"), computed in MongoDB
+
+    Returns {"carbs", "proteins", "fats", "count"} or None when nothing
+    matches. Both windows are bounded index range scans on (username, date,
+    time), so the cost does not depend on how much history the user has.
+    """
+    match: Dict = {"username": username, "composition": {"$ne": None}}
+    pipeline: List[Dict] = []
+    if unit == "days":
+        first_day = (datetime.now() - timedelta(days=window - 1)).strftime('%Y-%m-%d')
+        match["date"] = {"$gte": first_day}
+        pipeline.append({"$match": match})
+    elif unit == "meals":
+        pipeline += [
+            {"$match": match},
+            # Times are HH:MM (see normalize_meal_time); _id breaks ties
+            # between meals logged for the same minute, latest first
+            {"$sort": {"date": DESCENDING, "time": DESCENDING, "_id": DESCENDING}},
+            {"$limit": window},
+        ]
+    else:
+        raise ValueError(f"unit must be 'meals' or 'days', got {unit!r}")
+
+    pipeline.append({"$group": {
+        "_id": None,
+        "carbs": {"$avg": "$composition.carbs"},
+        "proteins": {"$avg": "$composition.proteins"},
+        "fats": {"$avg": "$composition.fats"},
+        "count": {"$sum": 1},
+    }})
+    result = next(meals.aggregate(pipeline), None)
+    if result is None:
+        return None
+    result.pop("_id")
+    return result
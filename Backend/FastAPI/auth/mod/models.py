@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator, model_validator
-from typing import Optional, List, Self
+from typing import Optional, List, Literal, Self
 from datetime import datetime
 
 
@@ -18,6 +18,24 @@ class TokenData(BaseModel):
 
 
 # Meal tracking models
+MEAL_TIME_FORMATS = ("%H:%M", "%I:%M %p", "%I:%M%p", "%I %p", "%I%p")
+
+
+def normalize_meal_time(value: str) -> str:
+    """
+    Zero-padded 24-hour "HH:MM" for the formats people type ("8:30",
+    "8:30 pm", "7pm"), so times stored as strings sort in time order;
+    anything else is kept as given
+    """
+    value = value.strip()
+    for fmt in MEAL_TIME_FORMATS:
+        try:
+            return datetime.strptime(value.upper(), fmt).strftime("%H:%M")
+        except ValueError:
+            continue
+    return value
+
+
 class MealComposition(BaseModel):
     """Meal composition with percentages (carbs + proteins + fats should equal 1.0)"""
     carbs: float = Field(..., ge=0.0, le=1.0, description="Carbohydrate percentage")
@@ -39,7 +57,18 @@ class Meal(BaseModel):
     time: str = Field(..., description="Time of meal (e.g., '08:00')")
     meal_name: str = Field(..., description="Name of meal ")
     meal_type: str = Field(..., description="Type of meal (breakfast, lunch, dinner, etc.)")
-    composition: MealComposition
+    composition: Optional[MealComposition] = Field(default=None, description="None while the composition is pending")
+    composition_status: Literal["ready", "pending", "failed"] = Field(
+        default="ready", description="pending until the background worker fills in the composition; "
+                                     "failed means it gave up and stored the default estimate"
+    )
+    meal_id: Optional[str] = Field(default=None, description="ID to poll a pending composition with")
+
+    @field_validator('time')
+    @classmethod
+    def validate_time(cls, v):
+        """Store times as HH:MM so meals of a day sort in time order"""
+        return normalize_meal_time(v)
 
     @field_validator('meal_type')
     @classmethod
@@ -137,7 +166,6 @@ class User(BaseModel):
     email: str = Field(..., description="Email address")
     mobile: str = Field(..., min_length=10, description="Mobile number")
     pass_hash: str = Field(..., min_length=1, description="Password hash")
-    meals: List[DayMeal] = Field(default_factory=list, description="List of daily meals")
     have_baby: bool = Field(default=False, description="Whether user has a baby")
     baby: Optional[Baby] = Field(default=None, description="Baby information")
 
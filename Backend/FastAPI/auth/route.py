@@ -4,27 +4,50 @@ import os
 import re
 import uuid
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Literal
 from typing import Optional
 
 import google.generativeai as genai
+from bson.errors import InvalidId
 from dotenv import load_dotenv
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 
-from auth.mod.Config import collection
+from auth.mod.Config import collection, meals, meal_compositions
+from auth.mod import meals as meal_store
+from auth.mod.compositions import CompositionCache
+from auth.mod.enrichment import CompositionEnricher
 from auth.mod.JWTToken import create_access_token
 from auth.mod.models import (
     User, Token, UserResponse, TokenData, MealCreate, Meal, DayMeal, MealComposition, BabyCreate, UserCreateWithBaby,
     RecommendationResponse, ErrorResponse
 )
 from auth.mod.oauth import bcrypt, verify_password, get_current_user
+from core.sse import sse_response, stream_events
+from core.tracing import stage, record_gemini_usage
 
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 genai.configure(api_key=GEMINI_API_KEY)
 model = genai.GenerativeModel('gemini-2.5-flash')
 
+# Default /meal_avg window: the last 7 meals; the AI meal guide uses the same
+MEAL_AVG_WINDOW = int(os.getenv("MEAL_AVG_WINDOW", "7"))
+MEAL_AVG_UNIT = os.getenv("MEAL_AVG_UNIT", "meals")
+MEAL_AVG_MAX_WINDOW = 365
+
+# Days per page of /meals once a client asks for paging (from, to, limit or cursor)
+MEALS_PAGE_DAYS = int(os.getenv("MEALS_PAGE_DAYS", "31"))
+MEALS_MAX_PAGE_DAYS = 366
+
+# Common foods come from the bundled nutrient table; Gemini only sees new dishes
+composition_cache = CompositionCache(meal_compositions)
+# Unknown dishes logged within this window share one Gemini prompt
+COMPOSITION_BATCH_SIZE = int(os.getenv("COMPOSITION_BATCH_SIZE", "8"))
+COMPOSITION_BATCH_WAIT = float(os.getenv("COMPOSITION_BATCH_WAIT", "0.5"))
+# Seconds a client polling a pending composition is asked to wait
+COMPOSITION_RETRY_AFTER = "2"
+
 
 # Create router for authentication
 auth_router = APIRouter()
@@ -74,7 +97,6 @@ def create_user_data(request: UserCreateWithBaby, baby_profile: Optional[Dict] =
         "email": request.email,
         "mobile": request.mobile,
         "pass_hash": bcrypt(request.password),
-        "meals": [],
         "have_baby": baby_profile is not None,
         "baby": baby_profile
     }
@@ -169,7 +191,8 @@ def read_users_me(current_user: TokenData = Depends(get_current_user)):
     )
 
 
-def _get_composition(meal_name: str) -> MealComposition:
+def _gemini_composition(meal_name: str) -> MealComposition:
+    """Ask Gemini for a dish the composition cache does not know; raises on failure"""
 
     # Create a detailed prompt for consistent responses
     prompt = f"""
@@ -192,93 +215,144 @@ def _get_composition(meal_name: str) -> MealComposition:
     - A salad might be: {{"carbs": 0.3, "proteins": 0.3, "fats": 0.4}}
     """
 
-    try:
-        # Generate response
+    # Generate response
+    with stage("meal_composition", "llm"):
         response = model.generate_content(prompt)
-        response_text = response.text.strip()
+    record_gemini_usage("meal_composition", response)
+    response_text = response.text.strip()
+
+    # Extract JSON from response
+    json_match = re.search(r'\{[^}]+}', response_text)
+    if not json_match:
+        raise ValueError("Could not extract JSON from response")
+    return _parse_composition(json.loads(json_match.group()))
+
+
+def _parse_composition(composition_data: Dict[str, Any]) -> MealComposition:
+    # Validate the data
+    carbs = float(composition_data.get('carbs', 0))
+    proteins = float(composition_data.get('proteins', 0))
+    fats = float(composition_data.get('fats', 0))
+
+    # Normalize to ensure they sum to 1.0
+    total = carbs + proteins + fats
+    if total <= 0:
+        # Not a usable answer; the caller falls back without caching it
+        raise ValueError("Gemini returned an empty composition")
+    carbs /= total
+    proteins /= total
+    fats /= total
 
-        # Extract JSON from response
-        json_match = re.search(r'\{[^}]+}', response_text)
-        if json_match:
-            json_str = json_match.group()
-            composition_data = json.loads(json_str)
-
-            # Validate the data
-            carbs = float(composition_data.get('carbs', 0))
-            proteins = float(composition_data.get('proteins', 0))
-            fats = float(composition_data.get('fats', 0))
-
-            # Normalize to ensure they sum to 1.0
-            total = carbs + proteins + fats
-            if total > 0:
-                carbs /= total
-                proteins /= total
-                fats /= total
-            else:
-                # Fallback values if something goes wrong
-                carbs, proteins, fats = 0.4, 0.3, 0.3
-
-            return MealComposition(
-                carbs=round(carbs, 2),
-                proteins=round(proteins, 2),
-                fats=round(fats, 2)
-            )
-        else:
-            raise ValueError("Could not extract JSON from response")
+    return MealComposition(
+        carbs=round(carbs, 2),
+        proteins=round(proteins, 2),
+        fats=round(fats, 2)
+    )
 
-    except Exception as e:
-        print(f"Error getting composition for {meal_name}: {e}")
-        # Return reasonable default values
-        return MealComposition(
-            carbs=0.4,
-            proteins=0.3,
-            fats=0.3
+
+def _gemini_compositions(meal_names: List[str]) -> List[Optional[MealComposition]]:
+    """
+    One Gemini call for several dishes, used by the enrichment worker
+
+    Returns a composition per name, in order, or None for a dish the answer
+    left out or got wrong (the worker retries those).
+    """
+    listing = "\n".join(f"    {i}. {name}" for i, name in enumerate(meal_names, 1))
+    prompt = f"""
+    Analyze each of these meals and provide its macronutrient composition as percentages that sum to 1.0.
+
+{listing}
+
+    Consider typical ingredients and preparation methods for each meal.
+
+    Respond with ONLY a JSON array with one object per meal, in this exact format:
+    [
+        {{"meal": 1, "carbs": 0.XX, "proteins": 0.XX, "fats": 0.XX}},
+        {{"meal": 2, "carbs": 0.XX, "proteins": 0.XX, "fats": 0.XX}}
+    ]
+
+    Where "meal" is the number of the meal in the list above, each value is a decimal between 0 and 1,
+    and the three values of a meal sum to 1.0.
+    """
+
+    with stage("meal_composition", "llm"):
+        response = model.generate_content(prompt)
+    record_gemini_usage("meal_composition", response)
+
+    json_match = re.search(r'\[.*]', response.text, re.DOTALL)
+    if not json_match:
+        raise ValueError("Could not extract JSON array from response")
+    answers = {}
+    for position, item in enumerate(json.loads(json_match.group()), 1):
+        if isinstance(item, dict) and str(item.get("meal", position)).isdigit():
+            answers.setdefault(int(item.get("meal", position)), item)
+
+    results: List[Optional[MealComposition]] = []
+    for i in range(1, len(meal_names) + 1):
+        try:
+            results.append(_parse_composition(answers[i]))
+        except (KeyError, TypeError, ValueError):
+            results.append(None)
+    return results
+
+
+def _get_composition(meal_name: str) -> MealComposition:
+    return composition_cache.get(meal_name, _gemini_composition)
+
+
+composition_enricher = CompositionEnricher(
+    meals, composition_cache, _gemini_compositions,
+    max_batch_size=COMPOSITION_BATCH_SIZE, max_wait_seconds=COMPOSITION_BATCH_WAIT
+)
+
+
+def _require_user(username: str) -> None:
+    user_exists = collection.find_one(
+        {"username": username},
+        {"_id": 1}  # Only return _id for efficiency
+    )
+    if not user_exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
         )
 
 
+def _check_date(value: Optional[str], name: str = "date") -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid {name} format. Use YYYY-MM-DD"
+        )
+    return value
+
 
 def _add_meal_to_date_helper(
         meal: MealCreate,
         date: str,
         current_user: TokenData,
-        collection
+        meals
 ) -> dict:
+    _require_user(current_user.username)
+
+    # Known dishes are answered in-process; anything else is stored as pending
+    # and enriched in the background, so the write never waits for Gemini
+    composition, _ = composition_cache.lookup(meal.name)
     new_meal = Meal(
         time=meal.time,
         meal_name=meal.name,
         meal_type=meal.meal_type,
-        composition=_get_composition(meal.name),
+        composition=composition,
+        composition_status="ready" if composition is not None else "pending",
     )
 
-    result = collection.update_one(
-        {"username": current_user.username, "meals.date": date},
-        {"$push": {"meals.$.meals": new_meal.model_dump()}},
-        upsert=False
-    )
-
-    if result.modified_count == 0:
-        user_exists = collection.find_one(
-            {"username": current_user.username},
-            {"_id": 1}  # Only return _id for efficiency
-        )
-        if not user_exists:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-
-        # Create new day meal entry
-        day_meal = DayMeal(date=date, meals=[new_meal])
-        result = collection.update_one(
-            {"username": current_user.username},
-            {"$push": {"meals": day_meal.model_dump()}}
-        )
-
-        if result.modified_count == 0:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to add meal"
-            )
+    new_meal.meal_id = meal_store.insert_meal(meals, current_user.username, date, new_meal)
+    if composition is None:
+        composition_enricher.submit(new_meal.meal_id, meal.name)
 
     return {
         "message": "Meal added successfully",
@@ -294,7 +368,7 @@ def add_meal_to_today(
 ):
     """Add meal to today's date"""
     today = datetime.now().strftime('%Y-%m-%d')
-    return _add_meal_to_date_helper(meal, today, current_user, collection)
+    return _add_meal_to_date_helper(meal, today, current_user, meals)
 
 
 @auth_router.post("/meals/add-custom", response_model=dict)
@@ -303,90 +377,97 @@ def add_meal_to_date(
         date: str,
         current_user: TokenData = Depends(get_current_user)
 ):
-    try:
-        datetime.strptime(date, '%Y-%m-%d')
-    except ValueError:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid date format. Use YYYY-MM-DD"
-        )
+    _check_date(date)
 
-    return _add_meal_to_date_helper(meal, date, current_user, collection)
+    return _add_meal_to_date_helper(meal, date, current_user, meals)
 
 @auth_router.get("/meals", response_model=list[DayMeal])
-def get_meal_plans(current_user: TokenData = Depends(get_current_user)):
-    user = collection.find_one({"username": current_user.username})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
+def get_meal_plans(
+        response: Response,
+        current_user: TokenData = Depends(get_current_user),
+        date_from: Optional[str] = Query(None, alias="from", description="First date (YYYY-MM-DD), inclusive"),
+        date_to: Optional[str] = Query(None, alias="to", description="Last date (YYYY-MM-DD), inclusive"),
+        limit: Optional[int] = Query(None, ge=1, le=MEALS_MAX_PAGE_DAYS,
+                                     description=f"Days per page, {MEALS_PAGE_DAYS} by default when paging"),
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page")
+):
+    """
+    Logged days, oldest first
 
-    return user.get("meals", [])
+    Without any parameters this is the whole history, as it always was.
+    Passing from, to, limit or cursor pages the result: when more days
+    match, the X-Next-Cursor header carries the cursor for the next page;
+    it is absent on the last page.
+    """
+    _check_date(date_from, "from")
+    _check_date(date_to, "to")
+    _check_date(cursor, "cursor")
+    _require_user(current_user.username)
+
+    if limit is None and any((date_from, date_to, cursor)):
+        limit = MEALS_PAGE_DAYS
+
+    days, next_cursor = meal_store.find_days(
+        meals, current_user.username, date_from, date_to, limit=limit, after=cursor
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return days
 
 @auth_router.get("/meals/{date}", response_model=Optional[DayMeal])
 def get_meal_plan_by_date(
         date: str,
         current_user: TokenData = Depends(get_current_user)
 ):
-    """Get meal plan for a specific date"""
-    user = collection.find_one({"username": current_user.username})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-
-    meals = user.get("meals", [])
-    for meal_day in meals:
-        if meal_day["date"] == date:
-            return DayMeal(**meal_day)
-
-    return []
+    """Get meal plan for a specific date; null when nothing was logged that day"""
+    _check_date(date)
+    _require_user(current_user.username)
 
+    return meal_store.find_day(meals, current_user.username, date)
 
-@auth_router.get("/meal_avg", response_model=MealComposition)
-def get_meal_composition_avg(current_user: TokenData = Depends(get_current_user)) -> MealComposition:
-    default_fallback = MealComposition(carbs=0.5 , proteins=0.1 , fats=0.4)
-    meals = get_meal_plans(current_user)
-
-    if not meals:
-        return default_fallback
-
-    all_meals = []
-    for day_meal in meals:
-        daily_meals = day_meal.get("meals", [])
-        for meal in daily_meals:
-            composition = meal.get("composition", {})
-            if composition:
-                all_meals.append(composition)
 
+@auth_router.get("/meals/entry/{meal_id}", response_model=Meal)
+def get_meal(
+        meal_id: str,
+        response: Response,
+        current_user: TokenData = Depends(get_current_user)
+):
+    """
+    One logged meal by the meal_id /meals/add returned
 
-    if not all_meals:
-        return default_fallback
+    Poll this while composition_status is "pending"; Retry-After says how
+    long to wait. The composition also shows up on the next /meals read.
+    """
+    try:
+        meal = meal_store.find_meal(meals, current_user.username, meal_id)
+    except InvalidId:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid meal id")
+    if meal is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meal not found")
+    if meal.composition_status == "pending":
+        response.headers["Retry-After"] = COMPOSITION_RETRY_AFTER
+    return meal
 
-    # Take the last 7 meals (or fewer if less than 7 available)
-    recent_meals = all_meals[-7:]
 
-    total_carbs = 0.0
-    total_proteins = 0.0
-    total_fats = 0.0
-    count = 0
+@auth_router.get("/meal_avg", response_model=MealComposition)
+def get_meal_composition_avg(
+        current_user: TokenData = Depends(get_current_user),
+        window: int = Query(MEAL_AVG_WINDOW, ge=1, le=MEAL_AVG_MAX_WINDOW,
+                            description="Number of meals (or days) to average over"),
+        unit: Literal["meals", "days"] = Query(MEAL_AVG_UNIT, description="Whether window counts meals or days")
+) -> MealComposition:
+    default_fallback = MealComposition(carbs=0.5 , proteins=0.1 , fats=0.4)
+    _require_user(current_user.username)
 
-    # Sum up compositions for the recent meals
-    for composition in recent_meals:
-        total_carbs += composition.get("carbs", 0.0)
-        total_proteins += composition.get("proteins", 0.0)
-        total_fats += composition.get("fats", 0.0)
-        count += 1
+    # Average over the last `window` meals (or days), computed by MongoDB
+    average = meal_store.composition_average(meals, current_user.username, window, unit)
 
-    # Calculate averages
-    if count == 0:
+    if not average:
         return default_fallback
 
-    avg_carbs = total_carbs / count
-    avg_proteins = total_proteins / count
-    avg_fats = total_fats / count
+    avg_carbs = average["carbs"] or 0.0
+    avg_proteins = average["proteins"] or 0.0
+    avg_fats = average["fats"] or 0.0
 
     # Ensure the averages sum to 1.0
     total_avg = avg_carbs + avg_proteins + avg_fats
@@ -442,14 +523,9 @@ def create_baby(
         )
 
 
-@auth_router.get("/ai_meal_guide", response_model=RecommendationResponse,
-         responses={404: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
-async def get_recommendations(current_user: TokenData = Depends(get_current_user)):
-
-    average_data = get_meal_composition_avg(current_user)
-
+def _meal_guide_prompt(average_data: MealComposition) -> str:
     # 3. Prepare prompt for RAG model
-    prompt = f"""
+    return f"""
     User's average nutrition intake:
     - Carbohydrates: {average_data.carbs}
     - Protein: {average_data.proteins}
@@ -473,32 +549,49 @@ async def get_recommendations(current_user: TokenData = Depends(get_current_user
     Only return the JSON object, nothing else.
     """
 
-    # 4. Query Gemini model
-    try:
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
 
-        # Clean the response
-        if response_text.startswith('```json'):
-            response_text = response_text[7:-3].strip()
-        elif response_text.startswith('```'):
-            response_text = response_text[3:-3].strip()
+def _parse_meal_guide(response_text: str) -> Dict[str, Any]:
+    """Validate the model's JSON; raises json.JSONDecodeError or ValueError"""
+    response_text = response_text.strip()
 
-        # Parse the JSON
-        recommendations = json.loads(response_text)
+    # Clean the response
+    if response_text.startswith('```json'):
+        response_text = response_text[7:-3].strip()
+    elif response_text.startswith('```'):
+        response_text = response_text[3:-3].strip()
 
-        # Validate the response structure
-        if not all(key in recommendations for key in ["analysis", "recommendations"]):
-            raise ValueError("Invalid response format from model")
+    # Parse the JSON
+    recommendations = json.loads(response_text)
 
-        if not all(key in recommendations["recommendations"] for key in ["foods", "meals", "rationale"]):
-            raise ValueError("Invalid recommendations format")
+    # Validate the response structure
+    if not all(key in recommendations for key in ["analysis", "recommendations"]):
+        raise ValueError("Invalid response format from model")
 
-        return {
-            "status": "success",
-            "analysis": recommendations["analysis"],
-            "recommendations": recommendations["recommendations"]
-        }
+    if not all(key in recommendations["recommendations"] for key in ["foods", "meals", "rationale"]):
+        raise ValueError("Invalid recommendations format")
+
+    return {
+        "status": "success",
+        "analysis": recommendations["analysis"],
+        "recommendations": recommendations["recommendations"]
+    }
+
+
+@auth_router.get("/ai_meal_guide", response_model=RecommendationResponse,
+         responses={404: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
+async def get_recommendations(current_user: TokenData = Depends(get_current_user)):
+
+    average_data = get_meal_composition_avg(current_user, window=MEAL_AVG_WINDOW, unit=MEAL_AVG_UNIT)
+    prompt = _meal_guide_prompt(average_data)
+
+    # 4. Query Gemini model
+    try:
+        with stage("ai_meal_guide", "llm"):
+            response = model.generate_content(prompt)
+        record_gemini_usage("ai_meal_guide", response)
+        response_text = response.text.strip()
+
+        return _parse_meal_guide(response_text)
 
     except json.JSONDecodeError as e:
         raise HTTPException(
@@ -522,11 +615,33 @@ async def get_recommendations(current_user: TokenData = Depends(get_current_user
         )
 
 
+@auth_router.get("/ai_meal_guide/stream")
+async def get_recommendations_stream(current_user: TokenData = Depends(get_current_user)):
+    """
+    Server-Sent Events variant of /ai_meal_guide
+
+    The raw JSON streams as "token" events; the validated analysis and
+    recommendations arrive in the final "done" event.
+    """
+    average_data = get_meal_composition_avg(current_user, window=MEAL_AVG_WINDOW, unit=MEAL_AVG_UNIT)
+    prompt = _meal_guide_prompt(average_data)
+
+    async def tokens():
+        response = await model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            yield chunk.text
+        record_gemini_usage("ai_meal_guide", response)
+
+    return await sse_response(stream_events("ai_meal_guide", tokens(), _parse_meal_guide))
+
+
 @auth_router.get("/analyze/{meal_name}", response_model=MealComposition)
 def analyze_meal_composition(meal_name: str):
     """
-    Analyze the macronutrient composition of a meal using Google Gemini AI.
+    Analyze the macronutrient composition of a meal.
 
+    Common foods come from the nutrient table and earlier analyses; Google
+    Gemini AI is only asked about dishes seen for the first time.
     Returns the carbohydrate, protein, and fat ratios that sum to 1.0.
     """
     try:
@@ -548,4 +663,10 @@ def analyze_meal_composition(meal_name: str):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Internal server error while analyzing meal composition: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@auth_router.get("/compositions/stats")
+def composition_stats():
+    """Meal composition lookups by source, the share answered without Gemini, and the enrichment queue"""
+    return {**composition_cache.stats(), "enrichment": composition_enricher.stats()}
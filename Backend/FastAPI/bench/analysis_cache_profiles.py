@@ -0,0 +1,68 @@
+"""
+Check: one clip posted to the newborn and pregnancy endpoints gets two analyses
+
+SymptomEngine.analysis_cache is shared by every profile, so its key has to
+include the profile. This sends the same decoded clip with the same age
+group through /api/f2 (NEWBORN) and /api/f7 (PREGNANT) paths of
+audio_to_analysis, with transcription and the LLM replaced by functions
+that report which profile they ran for, and checks that:
+
+    - each profile gets its own analysis and its own cache entry,
+    - a repeat for either profile is a cache hit with that profile's analysis.
+
+Needs the app's Python dependencies (it imports symptomCore) but no models,
+API keys or ffmpeg.
+
+Usage (from Backend/FastAPI):
+    python -m bench.analysis_cache_profiles
+"""
+import asyncio
+
+import numpy as np
+
+from routes.symptom import symptomCore
+from routes.symptom.profiles import NEWBORN, PREGNANT
+from routes.symptom.symptomCore import SymptomEngine
+
+CLIP = np.linspace(-0.5, 0.5, 16000, dtype=np.float32)
+AGE_GROUP = "adult"
+
+
+async def _decoded(audio_data):
+    return CLIP
+
+
+async def main():
+    engine = SymptomEngine()
+    calls = []
+
+    async def transcribe(profile, audio, model, is_disconnected=None):
+        return "fever since last night", "en"
+
+    async def analyze(profile, transcript, patient_age_group=None, structured=None):
+        calls.append(profile.name)
+        return {"friendly_summary": f"analysis from the {profile.name} profile"}
+
+    engine._transcribe_pcm = transcribe
+    engine.analyze_symptoms = analyze
+    symptomCore.decode_audio_async = _decoded
+
+    results = {}
+    for profile in (NEWBORN, PREGNANT):
+        _, analysis, cached = await engine.audio_to_analysis(profile, b"clip", "base", AGE_GROUP)
+        assert not cached, f"{profile.name}: first upload served from another profile's cache entry"
+        results[profile.name] = analysis
+
+    assert results[NEWBORN.name] != results[PREGNANT.name], "both profiles got the same analysis"
+    assert engine.analysis_cache.stats()["entries"] == 2, engine.analysis_cache.stats()
+
+    for profile in (NEWBORN, PREGNANT):
+        _, analysis, cached = await engine.audio_to_analysis(profile, b"clip", "base", AGE_GROUP)
+        assert cached and analysis == results[profile.name], f"{profile.name}: repeat not served from its own entry"
+
+    assert calls == [NEWBORN.name, PREGNANT.name], calls
+    print(f"ok: 2 cache entries, analyses {results}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""
+In-memory ffmpeg pipe decode vs the previous temp-file round trip
+
+Generates a short tone in wav/mp3/ogg/webm/m4a with ffmpeg and times both
+paths, checking they agree when whisper is installed. The decoder's own
+checks live in tests/test_audio.py.
+
+Usage:
+    python -m bench.audio_decode [--seconds 10] [--rounds 20]
+"""
+import argparse
+import os
+import subprocess
+import tempfile
+import timeit
+
+import numpy as np
+
+from core.audio import decode_audio
+
+FORMATS = {
+    "wav": ["-c:a", "pcm_s16le"],
+    "mp3": ["-c:a", "libmp3lame"],
+    "ogg": ["-c:a", "libvorbis"],
+    "webm": ["-c:a", "libopus"],
+    # ffmpeg writes the moov atom after the audio, like the app's m4a recordings
+    "m4a": ["-c:a", "aac"],
+}
+
+
+def make_fixture(fmt: str, seconds: float) -> bytes:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"tone.{fmt}")
+        subprocess.run(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-f", "lavfi",
+             "-i", f"sine=frequency=440:duration={seconds}:sample_rate=44100",
+             *FORMATS[fmt], path],
+            check=True,
+        )
+        with open(path, "rb") as f:
+            return f.read()
+
+
+def decode_via_tempfile(data: bytes, suffix: str) -> np.ndarray:
+    """What transcribe_audio used to do before handing the path to Whisper"""
+    import whisper
+
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
+        temp_file.write(data)
+        path = temp_file.name
+    try:
+        return whisper.load_audio(path)
+    finally:
+        os.unlink(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    fixtures = {fmt: make_fixture(fmt, args.seconds) for fmt in FORMATS}
+
+    try:
+        import whisper  # noqa: F401
+    except ImportError:
+        print("\nwhisper not installed, skipping the temp-file comparison")
+        whisper = None
+
+    print()
+    for fmt, data in fixtures.items():
+        pipe = timeit.timeit(lambda: decode_audio(data), number=args.rounds) / args.rounds
+        line = f"{fmt:5s} pipe={pipe * 1000:7.1f}ms"
+        if whisper is not None:
+            legacy = timeit.timeit(lambda: decode_via_tempfile(data, f".{fmt}"), number=args.rounds) / args.rounds
+            assert np.array_equal(decode_audio(data), decode_via_tempfile(data, f".{fmt}")), fmt
+            line += f"  tempfile={legacy * 1000:7.1f}ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Outbound network activity while importing main.py
+
+Imports main in a fresh interpreter with socket.getaddrinfo and
+socket.connect instrumented, waits --settle seconds for background threads
+started at import (database monitors and the like), then lists every host
+that was resolved or connected to and the import time. Exits non-zero if any
+LLM API host was contacted, so it can gate startup regressions such as a
+module-level chain.invoke().
+
+Usage:
+    python -m bench.import_network [--settle 2]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LLM_HOSTS = ("api.groq.com", "generativelanguage.googleapis.com", "api.openai.com")
+
+PROBE = r"""
+import json, socket, sys, threading, time
+
+lookups, connects = [], []
+lock = threading.Lock()
+_getaddrinfo = socket.getaddrinfo
+_connect = socket.socket.connect
+_connect_ex = socket.socket.connect_ex
+
+def getaddrinfo(host, port, *args, **kwargs):
+    with lock:
+        lookups.append(f"{host}:{port}")
+    return _getaddrinfo(host, port, *args, **kwargs)
+
+def connect(self, address):
+    with lock:
+        connects.append(str(address))
+    return _connect(self, address)
+
+def connect_ex(self, address):
+    with lock:
+        connects.append(str(address))
+    return _connect_ex(self, address)
+
+socket.getaddrinfo = getaddrinfo
+socket.socket.connect = connect
+socket.socket.connect_ex = connect_ex
+
+started = time.perf_counter()
+import main
+import_seconds = time.perf_counter() - started
+time.sleep(float(sys.argv[1]))
+print("\n" + json.dumps({"import_seconds": import_seconds, "lookups": lookups, "connects": connects}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds to keep watching after import")
+    args = parser.parse_args()
+
+    # WARMUP_ON_STARTUP only acts in the lifespan hook; importing must not load anything either way
+    proc = subprocess.run([sys.executable, "-c", PROBE, str(args.settle)], capture_output=True, text=True, cwd=APP_DIR)
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"import main failed with exit code {proc.returncode}")
+    report = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    print(f"import main: {report['import_seconds']:.2f}s")
+    print(f"DNS lookups ({len(report['lookups'])}): {', '.join(sorted(set(report['lookups']))) or '-'}")
+    print(f"connections ({len(report['connects'])}): {', '.join(sorted(set(report['connects']))) or '-'}")
+
+    llm = sorted({lookup for lookup in report["lookups"] if lookup.split(":")[0] in LLM_HOSTS})
+    if llm:
+        raise SystemExit(f"FAIL: LLM hosts contacted during import: {', '.join(llm)}")
+    print("OK: no LLM API host contacted during import")
+
+
+if __name__ == "__main__":
+    main()
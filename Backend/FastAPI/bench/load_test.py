@@ -0,0 +1,61 @@
+"""
+Concurrent load test for the RAG endpoints
+
+Fires N requests at once against a running server and reports per-request
+start/end offsets. With a blocking handler the requests run back to back
+(overlap ~1.0); with async chain invocation they overlap (overlap ~N, bounded
+by the endpoint's *_MAX_CONCURRENCY).
+
+Usage:
+    python -m bench.load_test --url http://localhost:8000 --endpoint f1 -n 8
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+PAYLOADS = {
+    "f1": ("/api/f1/query", {"query": "Is paracetamol safe during pregnancy?"}),
+    "f3": ("/api/f3/generate", {
+        "age": "8", "meal_duration": "1", "diet": "Vegetarian",
+        "diet_notes": "ensure iron bioavailability with vitamin C", "allergies": "None",
+        "nutrient_focus": "Iron", "foods_tolerated": "Sweet potato, oats",
+        "medical_conditions": "None", "cultural_preference": "Indian",
+    }),
+    "f6": ("/api/f6/generate", {
+        "pregnancy_month": "4", "allergies": "None", "nutrient_focus": "calcium",
+        "medical_condition": "None", "cultural_preference": "south Indian",
+        "preference": "high protein",
+    }),
+}
+
+
+async def _one(client, path, payload, started):
+    begin = time.perf_counter() - started
+    response = await client.post(path, json=payload)
+    end = time.perf_counter() - started
+    return begin, end, response.status_code
+
+
+async def run(url: str, endpoint: str, n: int, timeout: float):
+    path, payload = PAYLOADS[endpoint]
+    async with httpx.AsyncClient(base_url=url, timeout=timeout) as client:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(_one(client, path, payload, started) for _ in range(n)))
+        wall = time.perf_counter() - started
+
+    busy = sum(end - begin for begin, end, _ in results)
+    for i, (begin, end, code) in enumerate(sorted(results, key=lambda r: r[1])):
+        print(f"#{i:02d} status={code} start={begin:6.2f}s end={end:6.2f}s latency={end - begin:6.2f}s")
+    print(f"\nwall={wall:.2f}s  sum(latency)={busy:.2f}s  overlap={busy / wall:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", choices=sorted(PAYLOADS), default="f1")
+    parser.add_argument("-n", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.endpoint, args.n, args.timeout))
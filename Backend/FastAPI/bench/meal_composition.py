@@ -0,0 +1,93 @@
+"""
+Meal composition lookups: Gemini on every meal vs the tiered composition cache
+
+Replays a meal log of common foods, spelling variants, typos and a few
+unusual dishes through CompositionCache and reports, per source tier, how
+many lookups it answered and their latency, plus the overall hit rate. The
+Gemini fallback is simulated with a fixed delay (--gemini-latency) unless
+--gemini is given, in which case the real model is called for the misses.
+
+With --mongo-uri the analyzed dishes go to a scratch collection that is
+dropped at the end; without it the store tier is skipped.
+
+Usage:
+    python -m bench.meal_composition [--rounds 5] [--gemini-latency 1.5] [--gemini] [--mongo-uri ...]
+"""
+import argparse
+import statistics
+import time
+from collections import defaultdict
+
+from auth.mod.compositions import CompositionCache
+from auth.mod.models import MealComposition
+
+MEAL_LOG = [
+    "Dal Rice", "dal chawal", "2 rotis with dal", "Roti", "chapati", "oats", "Oatmeal", "Poha",
+    "kanda poha", "idli sambar", "Idlis", "masala dosa", "curd rice", "Curd", "a glass of milk",
+    "banana", "2 boiled eggs", "omelette", "paneer butter masala", "Rajma Chawal", "rajma rice",
+    "chicken curry", "chiken curry", "vegetable pulao", "veg pulao", "upma", "upmaa", "tea",
+    "masala chai", "buttermilk", "sprouts salad", "aloo paratha", "alu paratha", "khichdi",
+    "quinoa avocado bowl", "ragi dosa with peanut chutney", "mushroom risotto", "thai green curry",
+]
+
+
+def simulated_gemini(latency):
+    def fallback(meal_name):
+        time.sleep(latency)
+        return MealComposition(carbs=0.5, proteins=0.25, fats=0.25)
+    return fallback
+
+
+def real_gemini():
+    # Imports the app's router module, so GEMINI_API_KEY and MONGO_DB must be set
+    from auth.route import _gemini_composition
+    return _gemini_composition
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5, help="times the meal log is replayed")
+    parser.add_argument("--gemini-latency", type=float, default=1.5, help="seconds per simulated Gemini call")
+    parser.add_argument("--gemini", action="store_true", help="call the real Gemini model for misses")
+    parser.add_argument("--mongo-uri", default=None)
+    args = parser.parse_args()
+
+    store = client = None
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        client = MongoClient(args.mongo_uri)
+        store = client.bench_meal_composition.meal_compositions
+
+    fallback = real_gemini() if args.gemini else simulated_gemini(args.gemini_latency)
+    cache = CompositionCache(store)
+    before = cache.stats()["lookups"]
+
+    timings = defaultdict(list)
+    try:
+        for _ in range(args.rounds):
+            for name in MEAL_LOG:
+                counts = cache.stats()["lookups"]
+                started = time.perf_counter()
+                cache.get(name, fallback)
+                elapsed = time.perf_counter() - started
+                source = next(s for s, n in cache.stats()["lookups"].items() if n > counts[s])
+                timings[source].append(elapsed)
+    finally:
+        if client is not None:
+            client.drop_database("bench_meal_composition")
+
+    after = cache.stats()["lookups"]
+    total = sum(after[s] - before[s] for s in after)
+    gemini_calls = (after["gemini"] - before["gemini"]) + (after["default"] - before["default"])
+    print(f"{total} lookups, {len(MEAL_LOG)} distinct names, {cache.stats()['table_entries']} table keys\n")
+    print(f"{'source':<8} {'lookups':>8} {'p50 ms':>10} {'max ms':>10}")
+    for source, samples in sorted(timings.items(), key=lambda item: statistics.median(item[1])):
+        print(f"{source:<8} {len(samples):>8} {statistics.median(samples) * 1000:>10.3f} {max(samples) * 1000:>10.3f}")
+    all_samples = [t for samples in timings.values() for t in samples]
+    print(f"\nhit rate {1 - gemini_calls / total:.1%}, mean lookup {statistics.mean(all_samples) * 1000:.1f} ms "
+          f"(Gemini on every meal: {args.gemini_latency * 1000:.0f} ms)" if not args.gemini else
+          f"\nhit rate {1 - gemini_calls / total:.1%}, mean lookup {statistics.mean(all_samples) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
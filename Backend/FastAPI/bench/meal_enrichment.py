@@ -0,0 +1,89 @@
+"""
+Meal writes with background composition enrichment
+
+Logs a burst of meals for dishes the composition cache does not know into a
+scratch database, the way /meals/add does (cache lookup, insert as pending,
+hand to the enricher), with Gemini simulated by a fixed per-call delay and
+a failure rate. Reports the write latency the client sees, the time until
+every meal is resolved, and how many Gemini calls the batching needed
+against one call per meal before. The scratch database is dropped at the end.
+
+Usage:
+    python -m bench.meal_enrichment [--mongo-uri mongodb://localhost:27017] [--meals 40]
+        [--gemini-latency 1.5] [--failure-rate 0.2]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from pymongo import MongoClient
+
+from auth.mod import meals as meal_store
+from auth.mod.compositions import CompositionCache
+from auth.mod.enrichment import CompositionEnricher
+from auth.mod.models import Meal, MealComposition
+
+DISHES = [
+    "quinoa avocado bowl", "mushroom risotto", "thai green curry", "ragi dosa with peanut chutney",
+    "shakshuka", "miso ramen", "falafel wrap", "pesto gnocchi", "bibimbap", "moussaka",
+]
+
+
+def simulated_gemini(latency, failure_rate):
+    def batch_fn(names):
+        time.sleep(latency)
+        if random.random() < failure_rate:
+            raise RuntimeError("429 Resource has been exhausted")
+        return [MealComposition(carbs=0.5, proteins=0.25, fats=0.25) for _ in names]
+    return batch_fn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--meals", type=int, default=40)
+    parser.add_argument("--gemini-latency", type=float, default=1.5)
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_uri)
+    db = client.bench_meal_enrichment
+    meals = db.meals
+    meal_store.ensure_meal_indexes(meals)
+    cache = CompositionCache(db.meal_compositions)
+    enricher = CompositionEnricher(meals, cache, simulated_gemini(args.gemini_latency, args.failure_rate),
+                                   base_delay=0.5)
+
+    writes = []
+    started = time.perf_counter()
+    try:
+        for i in range(args.meals):
+            name = random.choice(DISHES)
+            write_started = time.perf_counter()
+            composition, _ = cache.lookup(name)
+            meal = Meal(time="13:00", meal_name=name, meal_type="lunch", composition=composition,
+                        composition_status="ready" if composition is not None else "pending")
+            meal_id = meal_store.insert_meal(meals, "bench_user", "2026-01-01", meal)
+            if composition is None:
+                enricher.submit(meal_id, name)
+            writes.append(time.perf_counter() - write_started)
+
+        while meals.count_documents({"composition_status": "pending"}):
+            time.sleep(0.05)
+        resolved = time.perf_counter() - started
+        stats = enricher.stats()
+    finally:
+        enricher.stop()
+        client.drop_database("bench_meal_enrichment")
+
+    print(f"{args.meals} meals, {len(DISHES)} distinct unknown dishes, "
+          f"simulated Gemini {args.gemini_latency * 1000:.0f} ms with {args.failure_rate:.0%} failures\n")
+    print(f"write p50 {statistics.median(writes) * 1000:.2f} ms, max {max(writes) * 1000:.2f} ms "
+          f"(blocking on Gemini: >= {args.gemini_latency * 1000:.0f} ms per write)")
+    print(f"all compositions resolved after {resolved:.1f}s")
+    print(f"Gemini calls {stats['llm_calls']} (one per meal before: {args.meals}), outcomes {stats['outcomes']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Meal reads: embedded User.meals array vs the indexed per-meal collection
+
+Seeds users with 30 days to several years of history (4 meals a day) into a
+scratch database in both layouts, then times the three read paths for each
+history length:
+
+    day      /meals/{date}  embedded: find_one(user) + scan  vs  find_day
+    avg      /meal_avg      embedded: find_one(user) + scan  vs  composition_average (7 meals)
+    avg30d   /meal_avg      embedded: find_one(user) + scan  vs  composition_average (30 days)
+    month    /meals range   embedded: find_one(user) + scan  vs  find_days over 30 days
+
+With the collection the day, avg and month reads stay flat as history
+grows; the embedded reads grow with the size of the user document.
+The scratch database is dropped at the end.
+
+Usage:
+    python -m bench.meal_reads [--mongo-uri mongodb://localhost:27017] [--rounds 50]
+"""
+import argparse
+import statistics
+import time
+from datetime import date, timedelta
+
+from pymongo import MongoClient
+
+from auth.mod import meals as meal_store
+from auth.mod.models import Meal
+
+HISTORY_DAYS = (30, 365, 3 * 365)
+MEALS_PER_DAY = (("08:00", "breakfast"), ("13:00", "lunch"), ("17:00", "snack"), ("20:00", "dinner"))
+COMPOSITION = {"carbs": 0.5, "proteins": 0.3, "fats": 0.2}
+
+
+def _days(n):
+    today = date.today()
+    return [(today - timedelta(days=i)).isoformat() for i in range(n)][::-1]
+
+
+def seed(users, meals, username, n_days):
+    days = _days(n_days)
+    embedded = []
+    documents = []
+    for day in days:
+        entries = [Meal(time=t, meal_name=f"{kind} dish", meal_type=kind, composition=COMPOSITION)
+                   for t, kind in MEALS_PER_DAY]
+        embedded.append({"date": day, "meals": [entry.model_dump() for entry in entries]})
+        documents.extend(meal_store.meal_document(username, day, entry) for entry in entries)
+    users.insert_one({"username": username, "pass_hash": "x" * 60, "baby": None, "meals": embedded})
+    meals.insert_many(documents)
+    return days
+
+
+def embedded_day(users, username, day):
+    user = users.find_one({"username": username})
+    return next((d for d in user.get("meals", []) if d["date"] == day), None)
+
+
+def embedded_avg(users, username, first_day=None):
+    user = users.find_one({"username": username})
+    compositions = [m["composition"] for d in user.get("meals", []) for m in d["meals"]
+                    if first_day is None or d["date"] >= first_day]
+    recent = compositions[-7:] if first_day is None else compositions
+    return {key: statistics.mean(c[key] for c in recent) for key in COMPOSITION}
+
+
+def embedded_range(users, username, first, last):
+    user = users.find_one({"username": username})
+    return [d for d in user.get("meals", []) if first <= d["date"] <= last]
+
+
+def timed(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main(uri, database, rounds):
+    client = MongoClient(uri)
+    db = client[database]
+    users, meals = db.users, db.meals
+    meal_store.ensure_meal_indexes(meals)
+    users.create_index("username")
+
+    try:
+        print(f"{'history':>8} {'read':<6} {'embedded':>10} {'collection':>11}")
+        for n_days in HISTORY_DAYS:
+            username = f"bench_{n_days}"
+            days = seed(users, meals, username, n_days)
+            day, first = days[len(days) // 2], days[-30]
+            rows = {
+                "day": (lambda: embedded_day(users, username, day),
+                        lambda: meal_store.find_day(meals, username, day)),
+                "avg": (lambda: embedded_avg(users, username),
+                        lambda: meal_store.composition_average(meals, username, 7, "meals")),
+                "avg30d": (lambda: embedded_avg(users, username, first),
+                           lambda: meal_store.composition_average(meals, username, 30, "days")),
+                "month": (lambda: embedded_range(users, username, first, days[-1]),
+                          lambda: meal_store.find_days(meals, username, first, days[-1], limit=31)),
+            }
+            for read, (embedded, indexed) in rows.items():
+                print(f"{n_days:>7}d {read:<6} {timed(embedded, rounds):>8.2f}ms {timed(indexed, rounds):>9.2f}ms")
+    finally:
+        client.drop_database(database)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="carenest_meal_bench")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    main(args.mongo_uri, args.database, args.rounds)
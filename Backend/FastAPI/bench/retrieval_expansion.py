@@ -0,0 +1,88 @@
+"""
+Latency and recall of each query expansion strategy on a fixed eval set
+
+Every query in bench/data/retrieval_eval.json lists terms a relevant
+passage mentions; a retrieved document counts as relevant when it contains
+one of them. For each strategy the bench reports hit rate (queries with at
+least one relevant document in the top k), mean fraction of relevant
+documents in the top k, LLM expansion calls, and p50/p95 latency. The
+cached and adaptive strategies run the set twice so the second round shows
+the warm paraphrase cache. adaptive runs once per --thresholds value, to
+show what each cut-off costs in LLM calls against what it recovers in
+recall. LLM strategies need GROQ_API_KEY and are skipped without it; off and
+local only need the embedding model and the vector store.
+
+Usage:
+    python -m bench.retrieval_expansion [--store medical_db_faiss] [--k 3] [--thresholds 0.4,0.5,0.6]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from core.query_expansion import STRATEGIES, ExpandingRetriever, expansions
+from routes.symptom.symptomCore import _load_llm, _load_vector_store
+
+DATA = os.path.join(os.path.dirname(__file__), "data", "retrieval_eval.json")
+
+
+def _relevant(doc, terms):
+    text = doc.page_content.lower()
+    return any(term.lower() in text for term in terms)
+
+
+async def run_strategy(label, retriever, cases, rounds):
+    for round_ in range(rounds):
+        llm_before = expansions.value(pipeline="bench", strategy=retriever.strategy, expansion="llm")
+        latencies, hits, precision = [], 0, []
+        for case in cases:
+            started = time.perf_counter()
+            docs = await retriever.ainvoke(case["query"])
+            latencies.append(time.perf_counter() - started)
+            relevant = [_relevant(doc, case["relevant"]) for doc in docs]
+            hits += any(relevant)
+            precision.append(sum(relevant) / max(len(docs), 1))
+        llm_calls = expansions.value(pipeline="bench", strategy=retriever.strategy, expansion="llm") - llm_before
+
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        name = label if rounds == 1 else f"{label}#{round_ + 1}"
+        print(f"{name:<15} hit@{retriever.k}={hits / len(cases):6.1%}  relevant@{retriever.k}={statistics.mean(precision):6.1%}  "
+              f"llm_calls={int(llm_calls):3d}  p50={statistics.median(latencies) * 1000:7.1f}ms  "
+              f"p95={p95 * 1000:7.1f}ms")
+
+
+async def main(store, k, thresholds):
+    with open(DATA) as f:
+        cases = json.load(f)
+
+    db = _load_vector_store(store)
+    if db is None:
+        raise SystemExit(f"vector store {store} not found")
+    llm = _load_llm() if os.getenv("GROQ_API_KEY") else None
+
+    # Load the embedding model before timing anything
+    db.embeddings.embed_query("warm up")
+
+    for strategy in STRATEGIES:
+        if llm is None and strategy in ("cached", "adaptive", "llm"):
+            print(f"{strategy:<15} skipped (no GROQ_API_KEY)")
+            continue
+        rounds = 2 if strategy in ("cached", "adaptive") else 1
+        for threshold in (thresholds if strategy == "adaptive" else thresholds[:1]):
+            retriever = ExpandingRetriever(vectorstore=db, llm=llm, strategy=strategy, k=k,
+                                           score_threshold=threshold, pipeline="bench")
+            label = f"{strategy}@{threshold}" if strategy == "adaptive" else strategy
+            await run_strategy(label, retriever, cases, rounds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default="medical_db_faiss")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--thresholds", default="0.5",
+                        help="comma-separated adaptive cut-offs on the best first-pass cosine")
+    args = parser.parse_args()
+    asyncio.run(main(args.store, args.k, [float(t) for t in args.thresholds.split(",")]))
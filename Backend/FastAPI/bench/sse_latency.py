@@ -0,0 +1,106 @@
+"""
+Time to first token on the /stream endpoints vs full-response latency
+
+For each LLM-backed endpoint, requests the JSON variant (time to the whole
+answer) and the Server-Sent Events variant (time to the first "token"
+event and to "done"), --rounds times each. /ai_meal_guide needs a bearer
+token (--token); the milestone service runs as its own app and is only
+measured when --milestone-url is given. Start the server with
+F1_CACHE_ENABLED=false, otherwise every f1 round after the first is a
+semantic cache hit.
+
+Usage:
+    python -m bench.sse_latency --url http://localhost:8000 [--token JWT] \\
+        [--milestone-url http://localhost:8001] [--rounds 3]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+MEAL_PLAN = {
+    "age": "8", "meal_duration": "1", "diet": "Vegetarian",
+    "diet_notes": "ensure iron bioavailability with vitamin C", "allergies": "None",
+    "nutrient_focus": "Vitamin A", "foods_tolerated": "Sweet potato, oats",
+    "medical_conditions": "None", "cultural_preference": "Indian",
+}
+MEAL_WOMAN = {
+    "pregnancy_month": "4", "allergies": "None", "nutrient_focus": "calcium",
+    "medical_condition": "None", "cultural_preference": "south Indian",
+    "preference": "high protein vegetarian",
+}
+
+# (label, method, path, JSON body)
+ENDPOINTS = [
+    ("f1 query", "POST", "/api/f1/query", {"query": "What are the early signs of chronic kidney disease?"}),
+    ("f3 generate", "POST", "/api/f3/generate", MEAL_PLAN),
+    ("f6 generate", "POST", "/api/f6/generate", MEAL_WOMAN),
+    ("f5 ask", "POST", "/api/f5/ask", {"user_input": "Is it true that pregnant women should eat for two?"}),
+    ("ai_meal_guide", "GET", "/api/auth/ai_meal_guide", None),
+]
+MILESTONE = ("milestone", "POST", "/milestone", {"query": "What should my 6 month old be able to do?"})
+
+
+async def full_response(client, method, path, body):
+    started = time.perf_counter()
+    response = await client.request(method, path, json=body)
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def streamed(client, method, path, body):
+    started = time.perf_counter()
+    first_token = None
+    event = None
+    async with client.stream(method, f"{path}/stream", json=body) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: ") and event == "token" and first_token is None:
+                first_token = time.perf_counter() - started
+            elif line.startswith("data: ") and event == "error":
+                raise RuntimeError(json.loads(line[len("data: "):])["error"])
+    return first_token, time.perf_counter() - started
+
+
+async def measure(client, label, method, path, body, rounds):
+    full, first, total = [], [], []
+    for _ in range(rounds):
+        full.append(await full_response(client, method, path, body))
+        ttft, done = await streamed(client, method, path, body)
+        first.append(ttft if ttft is not None else done)
+        total.append(done)
+    print(f"{label:<14} full={statistics.median(full):6.2f}s  "
+          f"stream first_token={statistics.median(first):6.2f}s  done={statistics.median(total):6.2f}s")
+
+
+async def main(url, token, milestone_url, rounds, timeout):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    async with httpx.AsyncClient(base_url=url, headers=headers, timeout=timeout) as client:
+        for label, method, path, body in ENDPOINTS:
+            if label == "ai_meal_guide" and not token:
+                print(f"{label:<14} skipped (no --token)")
+                continue
+            try:
+                await measure(client, label, method, path, body, rounds)
+            except Exception as e:
+                print(f"{label:<14} failed: {e}")
+
+    if milestone_url:
+        async with httpx.AsyncClient(base_url=milestone_url, timeout=timeout) as client:
+            await measure(client, *MILESTONE, rounds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", help="JWT for /api/auth/ai_meal_guide")
+    parser.add_argument("--milestone-url")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.token, args.milestone_url, args.rounds, args.timeout))
@@ -0,0 +1,73 @@
+"""
+Parse-failure rate and latency: regex over emoji headers vs JSON output
+
+Runs every transcript in bench/data/symptom_transcripts.json through
+SymptomEngine.analyze_symptoms in both modes and reports, per mode, how
+many outputs parsed cleanly, needed the repair call or fell back to
+defaults, alongside p50/p95 latency. Needs GROQ_API_KEY and the vector
+stores; run from Backend/FastAPI.
+
+Usage:
+    python -m bench.symptom_analysis [--rounds 1]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from routes.symptom.profiles import PROFILES
+from routes.symptom.symptomCore import analysis_outputs, symptom_engine
+
+DATA = os.path.join(os.path.dirname(__file__), "data", "symptom_transcripts.json")
+
+OUTCOMES = {
+    False: ("regex_ok", "regex_partial"),
+    True: ("ok", "repaired", "salvaged"),
+}
+
+
+def _outcomes(structured, pipelines):
+    return {
+        outcome: sum(analysis_outputs.value(pipeline=p, outcome=outcome) for p in pipelines)
+        for outcome in OUTCOMES[structured]
+    }
+
+
+async def run_mode(cases, structured, rounds):
+    pipelines = {case["profile"].pipeline for case in cases}
+    before = _outcomes(structured, pipelines)
+    latencies = []
+    for _ in range(rounds):
+        for case in cases:
+            started = time.perf_counter()
+            await symptom_engine.analyze_symptoms(case["profile"], case["transcript"], structured=structured)
+            latencies.append(time.perf_counter() - started)
+    after = _outcomes(structured, pipelines)
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    counts = {outcome: int(after[outcome] - before[outcome]) for outcome in after}
+    failed = counts.get("regex_partial", 0) + counts.get("salvaged", 0)
+    print(f"{'json' if structured else 'regex':<6} n={len(latencies):3d}  "
+          f"failures={failed / len(latencies):6.1%}  "
+          f"p50={statistics.median(latencies):6.2f}s  p95={p95:6.2f}s  "
+          + "  ".join(f"{outcome}={count}" for outcome, count in counts.items()))
+
+
+async def main(rounds):
+    with open(DATA) as f:
+        cases = [{**case, "profile": PROFILES[case["profile"]]} for case in json.load(f)]
+    for profile in {case["profile"].name: case["profile"] for case in cases}.values():
+        symptom_engine.register_profile(profile)
+
+    for structured in (False, True):
+        await run_mode(cases, structured, rounds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(main(args.rounds))
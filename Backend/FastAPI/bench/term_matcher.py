@@ -0,0 +1,77 @@
+"""
+Micro-benchmark: TermMatcher vs the previous per-call regex/substring scan
+
+The legacy implementation recompiled every pattern through re.findall and did
+one substring scan per vocabulary term, so its cost grows with the vocabulary.
+The matcher scans each text once regardless of vocabulary size.
+
+Usage:
+    python -m bench.term_matcher [--synthetic 5000] [--rounds 2000]
+"""
+import argparse
+import os
+import re
+import timeit
+
+from core.term_matcher import TermMatcher
+
+# Snapshot of routes/query.py before the matcher, kept here so the
+# benchmark does not import the NLP models
+MEDICAL_PATTERNS = [
+    r'\b\w*itis\b', r'\b\w*osis\b', r'\b\w*emia\b', r'\b\w*pathy\b', r'\b\w*algia\b',
+    r'\b\w*ectomy\b', r'\b\w*scopy\b', r'\b\w*gram\b', r'\b\w*therapy\b',
+    r'\b(?:mg|ml|cc|mcg|IU|units?)\b',
+]
+
+SAMPLES = [
+    "My 3 month old has had a fever and cough since yesterday, should I give paracetamol?",
+    "Is it safe to take 500 mg of ibuprofen during pregnancy for back pain and headache?",
+    "Doctor suspects preeclampsia after ultrasound; blood pressure is high and feet swelling",
+    "Baby has jaundice, poor feeding and lethargy. Is phototherapy needed?",
+    "What foods help with anemia and iron deficiency in the second trimester?",
+]
+
+VOCAB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "medical_terms.txt")
+
+
+def legacy_extract(text, vocabulary):
+    medical_terms = []
+    text_lower = text.lower()
+    for term in vocabulary:
+        if term.lower() in text_lower:
+            medical_terms.append(term)
+    for pattern in MEDICAL_PATTERNS:
+        medical_terms.extend(re.findall(pattern, text, re.IGNORECASE))
+    return list(set([term for term in medical_terms if len(term) > 2]))
+
+
+def load_vocabulary(synthetic: int):
+    vocabulary = []
+    with open(VOCAB_PATH, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                vocabulary.append(line.split("\t")[-1])
+    # Pad with unique filler terms to simulate a large externally supplied vocabulary
+    vocabulary.extend(f"syntheticterm{i} condition" for i in range(synthetic))
+    return vocabulary
+
+
+def main(synthetic: int, rounds: int):
+    for size in sorted({0, synthetic}):
+        vocabulary = load_vocabulary(size)
+        matcher = TermMatcher(vocabulary, MEDICAL_PATTERNS)
+
+        legacy = timeit.timeit(lambda: [legacy_extract(t, vocabulary) for t in SAMPLES], number=rounds)
+        compiled = timeit.timeit(lambda: [matcher.match(t) for t in SAMPLES], number=rounds)
+        per_call = 1e6 / (rounds * len(SAMPLES))
+        print(f"vocabulary={len(vocabulary):6d}  legacy={legacy * per_call:8.1f}us/text  "
+              f"matcher={compiled * per_call:8.1f}us/text  speedup={legacy / compiled:5.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.synthetic, args.rounds)
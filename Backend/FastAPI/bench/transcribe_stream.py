@@ -0,0 +1,91 @@
+"""
+Time to first text: streaming WebSocket transcription vs one-shot /transcribe
+
+Decodes --audio to 16 kHz PCM16 with ffmpeg, plays it into
+<prefix>/transcribe-stream at --speed times real time and reports when each
+partial transcript arrives, then posts the same clip to <prefix>/transcribe
+for comparison.
+
+Usage:
+    python -m bench.transcribe_stream --audio voice_note.mp3 \\
+        --url http://localhost:8000 --prefix /api/f2/medical --model base
+"""
+import argparse
+import asyncio
+import base64
+import json
+import subprocess
+import time
+
+import httpx
+import websockets
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 0.25
+
+
+def load_pcm16(path: str) -> bytes:
+    return subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", path,
+         "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+        capture_output=True, check=True,
+    ).stdout
+
+
+async def stream(ws_url: str, pcm: bytes, speed: float):
+    chunk = int(SAMPLE_RATE * CHUNK_SECONDS) * 2
+    started = time.perf_counter()
+    first = None
+
+    async with websockets.connect(ws_url, max_size=None) as ws:
+        async def play():
+            for offset in range(0, len(pcm), chunk):
+                await ws.send(pcm[offset:offset + chunk])
+                await asyncio.sleep(CHUNK_SECONDS / speed)
+            await ws.send(json.dumps({"type": "end"}))
+
+        player = asyncio.create_task(play())
+        async for raw in ws:
+            message = json.loads(raw)
+            elapsed = time.perf_counter() - started
+            if message["type"] == "partial":
+                first = first or elapsed
+                print(f"  {elapsed:6.2f}s partial #{message['index']} "
+                      f"[{message['start']:.1f}-{message['end']:.1f}s] {message['text'][:60]}")
+            else:
+                print(f"  {elapsed:6.2f}s {message['type']}")
+                if message["type"] in ("final", "error"):
+                    break
+        await player
+    return first, time.perf_counter() - started
+
+
+async def run(url, prefix, audio, model, speed, timeout):
+    pcm = load_pcm16(audio)
+    print(f"clip: {len(pcm) / 2 / SAMPLE_RATE:.1f}s")
+
+    ws_url = url.replace("http", "ws", 1) + f"{prefix}/transcribe-stream?model={model}"
+    print("\nstreaming:")
+    first, total = await stream(ws_url, pcm, speed)
+
+    with open(audio, "rb") as f:
+        payload = {"audio_data": base64.b64encode(f.read()).decode(), "model": model}
+    async with httpx.AsyncClient(base_url=url, timeout=timeout) as client:
+        started = time.perf_counter()
+        response = await client.post(f"{prefix}/transcribe", json=payload)
+        one_shot = time.perf_counter() - started
+
+    print(f"\nstreaming: first text {first or float('nan'):.2f}s, done {total:.2f}s")
+    print(f"one-shot:  first text {one_shot:.2f}s (status {response.status_code}, upload not paced)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--prefix", default="/api/f2/medical")
+    parser.add_argument("--audio", required=True)
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed relative to real time")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.prefix, args.audio, args.model, args.speed, args.timeout))
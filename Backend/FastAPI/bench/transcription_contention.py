@@ -0,0 +1,81 @@
+"""
+Latency of a light endpoint while transcriptions are running
+
+Probes --probe every 100 ms, first alone (baseline) and then while N
+transcription requests are in flight. With Whisper running inline on the
+event loop the probe stalls for the whole transcription; with the
+transcription pool (WHISPER_WORKERS >= 1) probe latency stays at baseline.
+Run the server once with WHISPER_WORKERS=0 and once with WHISPER_WORKERS=1
+to compare. Requests beyond WHISPER_MAX_PENDING come back as 503.
+
+Usage:
+    python -m bench.transcription_contention --audio sample.mp3 -n 4 \\
+        --url http://localhost:8000 --prefix /api/f2/medical --probe /api/f1/status
+"""
+import argparse
+import asyncio
+import base64
+import statistics
+import time
+
+import httpx
+
+PROBE_INTERVAL = 0.1
+
+
+async def _probe(client, path, stop: asyncio.Event):
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get(path)
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(PROBE_INTERVAL)
+    return latencies
+
+
+def _summary(label, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{label:<14} n={len(latencies):4d}  p50={statistics.median(latencies) * 1000:8.1f}ms  "
+          f"p95={p95 * 1000:8.1f}ms  max={latencies[-1] * 1000:8.1f}ms")
+
+
+async def run(url, prefix, probe, audio_path, model, n, baseline_seconds, timeout):
+    with open(audio_path, "rb") as f:
+        payload = {"audio_data": base64.b64encode(f.read()).decode(), "model": model}
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout) as client:
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(_probe(client, probe, stop))
+        await asyncio.sleep(baseline_seconds)
+        stop.set()
+        _summary("baseline", await probe_task)
+
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(_probe(client, probe, stop))
+        started = time.perf_counter()
+        responses = await asyncio.gather(
+            *(client.post(f"{prefix}/transcribe", json=payload) for _ in range(n))
+        )
+        wall = time.perf_counter() - started
+        stop.set()
+        _summary("during", await probe_task)
+
+    codes = [response.status_code for response in responses]
+    print(f"\n{n} transcriptions in {wall:.2f}s, status codes: "
+          + ", ".join(f"{code}x{codes.count(code)}" for code in sorted(set(codes))))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--prefix", default="/api/f2/medical", help="mount point of the symptom router")
+    parser.add_argument("--probe", default="/api/f1/status", help="cheap GET endpoint to watch")
+    parser.add_argument("--audio", required=True)
+    parser.add_argument("--model", default="base")
+    parser.add_argument("-n", type=int, default=4)
+    parser.add_argument("--baseline-seconds", type=float, default=3.0)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.prefix, args.probe, args.audio, args.model, args.n,
+                    args.baseline_seconds, args.timeout))
@@ -0,0 +1,120 @@
+import asyncio
+import base64
+import binascii
+import os
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, Optional, Union
+
+import numpy as np
+
+# Whisper works on 16 kHz mono float32 in [-1, 1]
+SAMPLE_RATE = 16000
+
+
+def ffmpeg_decode_command(source: str = "pipe:0") -> list:
+    """Same conversion whisper.load_audio runs; reads stdin unless given a file path"""
+    return [
+        "ffmpeg", "-nostdin", "-threads", "0", "-hide_banner", "-loglevel", "error",
+        "-i", source,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE),
+        "pipe:1",
+    ]
+
+
+FFMPEG_DECODE = ffmpeg_decode_command()
+
+
+class AudioDecodeError(ValueError):
+    """Raised when the payload is not valid base64 or not audio ffmpeg can read"""
+
+
+def audio_bytes(audio_data: Union[str, bytes]) -> bytes:
+    """Raw bytes for an upload; str payloads are base64, optionally as a data: URL"""
+    if isinstance(audio_data, (bytes, bytearray)):
+        return bytes(audio_data)
+    if audio_data.startswith("data:"):
+        audio_data = audio_data.split(",", 1)[-1]
+    try:
+        return base64.b64decode(audio_data, validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise AudioDecodeError(f"Audio data is not valid base64: {e}")
+
+
+def needs_seekable_input(data: bytes) -> bool:
+    """
+    ISO-BMFF (mp4/m4a/mov, an ftyp box at bytes 4-8) may keep its moov atom
+    after the audio data, which ffmpeg cannot demux from a pipe; phones
+    record m4a this way
+    """
+    return data[4:8] == b"ftyp"
+
+
+@contextmanager
+def _ffmpeg_input(data: bytes) -> Iterator[Optional[str]]:
+    """Temp file path for containers that need seeking, else None (pipe the bytes)"""
+    if not needs_seekable_input(data):
+        yield None
+        return
+    # delete=False: on Windows an open NamedTemporaryFile cannot be read by ffmpeg
+    handle = tempfile.NamedTemporaryFile(suffix=".m4a", delete=False)
+    try:
+        with handle:
+            handle.write(data)
+        yield handle.name
+    finally:
+        os.remove(handle.name)
+
+
+def pcm16_to_float32(pcm: bytes) -> np.ndarray:
+    """Little-endian 16-bit PCM to float32 in [-1, 1]"""
+    return np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+
+
+def _check(returncode: int, stdout: bytes, stderr: bytes):
+    if returncode != 0 or not stdout:
+        message = stderr.decode(errors="replace").strip().splitlines()
+        raise AudioDecodeError(f"Could not decode audio: {message[-1] if message else 'no audio stream'}")
+
+
+def decode_audio(audio_data: Union[str, bytes]) -> np.ndarray:
+    """
+    Decode any ffmpeg-readable container to 16 kHz mono float32 PCM
+
+    Piped through ffmpeg in memory, except mp4/m4a, which go through a temp file
+    """
+    data = audio_bytes(audio_data)
+    with _ffmpeg_input(data) as path:
+        try:
+            if path is None:
+                result = subprocess.run(FFMPEG_DECODE, input=data, capture_output=True)
+            else:
+                result = subprocess.run(ffmpeg_decode_command(path), stdin=subprocess.DEVNULL, capture_output=True)
+        except FileNotFoundError:
+            raise RuntimeError("ffmpeg is not installed or not on PATH")
+    _check(result.returncode, result.stdout, result.stderr)
+    return pcm16_to_float32(result.stdout)
+
+
+async def decode_audio_async(audio_data: Union[str, bytes]) -> np.ndarray:
+    """decode_audio without blocking the event loop while ffmpeg runs"""
+    data = audio_bytes(audio_data)
+    with _ffmpeg_input(data) as path:
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *(FFMPEG_DECODE if path is None else ffmpeg_decode_command(path)),
+                stdin=asyncio.subprocess.PIPE if path is None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError:
+            raise RuntimeError("ffmpeg is not installed or not on PATH")
+
+        try:
+            stdout, stderr = await process.communicate(data if path is None else None)
+        except asyncio.CancelledError:
+            process.kill()
+            raise
+    _check(process.returncode, stdout, stderr)
+    return pcm16_to_float32(stdout)
@@ -0,0 +1,90 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Dict
+
+from fastapi import HTTPException, status
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight requests for one endpoint; waiters give up after max_wait seconds"""
+
+    def __init__(self, name: str, max_concurrency: int, max_wait: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def acquire(self):
+        """Take a slot or raise 503 after max_wait; pair with release()"""
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"{self.name} is at capacity, please retry shortly"
+            )
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def status(self) -> Dict[str, int]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+_limiters: Dict[str, ConcurrencyLimiter] = {}
+
+
+def get_limiter(name: str, default_concurrency: int = 8, default_wait: float = 30.0) -> ConcurrencyLimiter:
+    """
+    Return the limiter for an endpoint, creating it on first use
+
+    Overridable per endpoint with <NAME>_MAX_CONCURRENCY and <NAME>_MAX_WAIT.
+    """
+    limiter = _limiters.get(name)
+    if limiter is None:
+        env_prefix = name.upper()
+        limiter = ConcurrencyLimiter(
+            name,
+            int(os.getenv(f"{env_prefix}_MAX_CONCURRENCY", default_concurrency)),
+            float(os.getenv(f"{env_prefix}_MAX_WAIT", default_wait)),
+        )
+        _limiters[name] = limiter
+    return limiter
+
+
+def limiter_status() -> Dict[str, Dict[str, int]]:
+    return {name: limiter.status() for name, limiter in _limiters.items()}
+
+
+def limit_concurrency(name: str, default_concurrency: int = 8, default_wait: float = 30.0):
+    """FastAPI dependency that holds an endpoint slot for the duration of the request"""
+    limiter = get_limiter(name, default_concurrency, default_wait)
+
+    async def dependency():
+        async with limiter.slot():
+            yield
+
+    return dependency
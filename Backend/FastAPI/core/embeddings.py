@@ -0,0 +1,54 @@
+import logging
+import os
+import threading
+from typing import Dict, List
+
+from langchain_huggingface import HuggingFaceEmbeddings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+
+# One instance per model name per process, shared read-only by every router
+_models: Dict[str, HuggingFaceEmbeddings] = {}
+_lock = threading.Lock()
+
+
+def _normalize_model_name(model_name: str) -> str:
+    """Map short sentence-transformers names onto their hub id"""
+    if "/" not in model_name:
+        return f"sentence-transformers/{model_name}"
+    return model_name
+
+
+def get_embedding_model(model_name: str = DEFAULT_EMBEDDING_MODEL) -> HuggingFaceEmbeddings:
+    """Return the process-wide embedding model, loading it on first use"""
+    model_name = _normalize_model_name(model_name)
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(model_name)
+        if model is None:
+            logger.info(f"Loading embedding model {model_name}...")
+            model = HuggingFaceEmbeddings(
+                model_name=model_name,
+                encode_kwargs={"batch_size": EMBEDDING_BATCH_SIZE},
+            )
+            _models[model_name] = model
+            logger.info(f"Embedding model {model_name} loaded")
+    return model
+
+
+def embed_batch(texts: List[str], model_name: str = DEFAULT_EMBEDDING_MODEL) -> List[List[float]]:
+    """Encode several texts in one forward pass batch"""
+    if not texts:
+        return []
+    return get_embedding_model(model_name).embed_documents(texts)
+
+
+def loaded_models() -> List[str]:
+    """Names of embedding models currently resident in this process"""
+    return list(_models)
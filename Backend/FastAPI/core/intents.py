@@ -0,0 +1,96 @@
+import json
+import logging
+import os
+import re
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Phrases shorter than this only match exactly; one edit on "ok" is a different word
+MIN_FUZZY_LENGTH = 4
+# A substitution is matched through deletions on both sides, which also admits some
+# two-edit pairs ("cold"/"cool"), so it is reserved for longer messages
+MIN_SUBSTITUTION_LENGTH = 6
+MAX_QUERY_LENGTH = 48
+
+_non_word = re.compile(r"[^a-z0-9 ]+")
+_repeats = re.compile(r"(.)\1{2,}")
+
+
+class Intent:
+    def __init__(self, name: str, response: str):
+        self.name = name
+        self.response = response
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation and squeeze stretched letters ("hiiii" -> "hii")"""
+    text = _non_word.sub(" ", text.lower())
+    text = _repeats.sub(r"\1\1", text)
+    return " ".join(text.split())
+
+
+def _deletes(text: str) -> List[str]:
+    return [text[:i] + text[i + 1:] for i in range(len(text))]
+
+
+class IntentRouter:
+    """
+    Answers chit-chat (greetings, thanks, goodbyes) before any retrieval or LLM call
+
+    Whole-message matches only. Exact lookups are one dict probe; near misses
+    within one edit are found through a precomputed deletion index
+    (SymSpell-style), so matching stays in the microsecond range.
+    """
+
+    def __init__(self, intents: Dict[str, dict]):
+        self.intents: Dict[str, Intent] = {}
+        self._exact: Dict[str, str] = {}
+        self._deleted: Dict[str, str] = {}
+
+        for name, spec in intents.items():
+            self.intents[name] = Intent(name, spec["response"])
+            for phrase in spec.get("phrases", []):
+                key = normalize(phrase)
+                if not key:
+                    continue
+                self._exact.setdefault(key, name)
+                if len(key) >= MIN_FUZZY_LENGTH:
+                    for deleted in _deletes(key):
+                        self._deleted.setdefault(deleted, name)
+
+    def match(self, text: str) -> Optional[Intent]:
+        if len(text) > MAX_QUERY_LENGTH * 2:
+            return None
+        key = normalize(text)
+        if not key or len(key) > MAX_QUERY_LENGTH:
+            return None
+
+        name = self._exact.get(key)
+        if name is None:
+            # Missing character: the query is itself a deletion of a phrase
+            name = self._deleted.get(key)
+        if name is None and len(key) > MIN_FUZZY_LENGTH:
+            # Extra (or substituted) character: one of the query's deletions matches
+            substitution = len(key) >= MIN_SUBSTITUTION_LENGTH
+            for deleted in _deletes(key):
+                name = self._exact.get(deleted)
+                if name is None and substitution:
+                    name = self._deleted.get(deleted)
+                if name is not None:
+                    break
+
+        return self.intents.get(name) if name is not None else None
+
+    @classmethod
+    def from_file(cls, path: str, default: Dict[str, dict]) -> "IntentRouter":
+        """Load intents from a JSON file of {name: {"phrases": [...], "response": "..."}}"""
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    return cls(json.load(f))
+            except (ValueError, KeyError) as e:
+                logger.error(f"Invalid intents file {path}: {e}, using defaults")
+        else:
+            logger.warning(f"Intents file not found at {path}, using defaults")
+        return cls(default)
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+# A failed component is tried again after this many seconds, doubling per
+# consecutive failure up to the maximum
+RETRY_SECONDS = float(os.getenv("COMPONENT_RETRY_SECONDS", "30"))
+MAX_RETRY_SECONDS = float(os.getenv("COMPONENT_MAX_RETRY_SECONDS", "600"))
+
+
+class ComponentUnavailable(RuntimeError):
+    """Raised when a registered component failed to load and is not due for a retry"""
+
+
+class Component:
+    """A heavy resource (model, index, client) loaded once, retried with backoff after a failure"""
+
+    def __init__(self, name: str, loader: Callable[[], Any], warmup: bool = True):
+        self.name = name
+        self.loader = loader
+        self.warmup = warmup
+        self.state = PENDING
+        self.value = None
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.failures = 0
+        self.retry_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def waiting_to_retry(self) -> bool:
+        """Failed, and the backoff has not run out yet"""
+        return self.state == FAILED and time.monotonic() < self.retry_at
+
+    def load(self) -> Any:
+        if self.state == READY:
+            return self.value
+        if self.waiting_to_retry():
+            raise ComponentUnavailable(f"{self.name} failed to load: {self.error}")
+
+        with self._lock:
+            if self.state == READY:
+                return self.value
+            if self.waiting_to_retry():
+                # Another thread retried while this one waited for the lock
+                raise ComponentUnavailable(f"{self.name} failed to load: {self.error}")
+
+            self.state = LOADING
+            started = time.perf_counter()
+            logger.info(f"Loading component {self.name}...")
+            try:
+                self.value = self.loader()
+            except Exception as e:
+                self.state = FAILED
+                self.error = str(e)
+                self.load_seconds = time.perf_counter() - started
+                self.failures += 1
+                backoff = min(RETRY_SECONDS * 2 ** (self.failures - 1), MAX_RETRY_SECONDS)
+                self.retry_at = time.monotonic() + backoff
+                logger.error(f"Component {self.name} failed to load: {e}; retrying in {backoff:.0f}s")
+                raise ComponentUnavailable(f"{self.name} failed to load: {e}") from e
+
+            self.load_seconds = time.perf_counter() - started
+            self.state = READY
+            self.error = None
+            self.failures = 0
+            logger.info(f"Component {self.name} ready in {self.load_seconds:.2f}s")
+            return self.value
+
+    def status(self) -> Dict[str, Any]:
+        retry_in = max(self.retry_at - time.monotonic(), 0) if self.state == FAILED else None
+        return {
+            "state": self.state,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "error": self.error,
+            "retry_in_seconds": round(retry_in, 3) if retry_in is not None else None,
+        }
+
+
+class LifecycleManager:
+    """Registry of lazily loaded components with optional background warmup"""
+
+    def __init__(self):
+        self._components: Dict[str, Component] = {}
+        self.warmup_started_at: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+
+    def register(self, name: str, loader: Callable[[], Any], warmup: bool = True) -> Component:
+        """Register a loader; nothing is loaded until get() or warmup()"""
+        if name in self._components:
+            return self._components[name]
+        component = Component(name, loader, warmup)
+        self._components[name] = component
+        return component
+
+    def get(self, name: str) -> Any:
+        """Return the component, loading it on first use"""
+        return self._components[name].load()
+
+    async def aget(self, name: str) -> Any:
+        """Async variant of get() that never blocks the event loop on a load"""
+        component = self._components[name]
+        if component.state == READY or component.waiting_to_retry():
+            # Answered without a load, so without a thread hop
+            return component.load()
+        return await asyncio.to_thread(component.load)
+
+    def try_get(self, name: str) -> Any:
+        """Return the component, or None if it cannot be loaded; blocks while it loads"""
+        try:
+            return self.get(name)
+        except ComponentUnavailable:
+            return None
+
+    async def atry_get(self, name: str) -> Any:
+        """Async variant of try_get() for request handlers"""
+        try:
+            return await self.aget(name)
+        except ComponentUnavailable:
+            return None
+
+    def is_ready(self, name: str) -> bool:
+        component = self._components.get(name)
+        return component is not None and component.state == READY
+
+    def is_failed(self, name: str) -> bool:
+        component = self._components.get(name)
+        return component is not None and component.state == FAILED
+
+    async def warmup(self):
+        """Load every warmup component off the event loop, one at a time"""
+        self.warmup_started_at = time.time()
+        started = time.perf_counter()
+        for component in list(self._components.values()):
+            if not component.warmup or component.state != PENDING:
+                continue
+            try:
+                await asyncio.to_thread(component.load)
+            except ComponentUnavailable:
+                # Already recorded on the component; keep warming the rest
+                pass
+        self.warmup_seconds = time.perf_counter() - started
+        logger.info(f"Warmup finished in {self.warmup_seconds:.2f}s")
+
+    def status(self) -> Dict[str, Any]:
+        components = {name: c.status() for name, c in self._components.items()}
+        return {
+            "ready": all(c.state == READY for c in self._components.values() if c.warmup),
+            "warmup_seconds": round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None,
+            "components": components,
+        }
+
+
+lifecycle = LifecycleManager()
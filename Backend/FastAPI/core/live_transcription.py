@@ -0,0 +1,135 @@
+import asyncio
+import json
+import logging
+from typing import List, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from core.audio import pcm16_to_float32
+from core.tracing import stage
+from core.transcription import transcription_pool, TranscriptionQueueFull
+from core.vad import EnergySegmenter, Segment
+
+logger = logging.getLogger(__name__)
+
+# WebSocket close code for "try again later"
+CLOSE_TRY_AGAIN_LATER = 1013
+# Utterances of one stream sent to the pool at once; keeps a client that uploads
+# faster than real time from filling the whole transcription queue
+STREAM_MAX_IN_FLIGHT = 2
+
+
+async def _transcribe_segment(pipeline: str, segment: Segment, model: str, slots: asyncio.Semaphore) -> dict:
+    async with slots:
+        with stage(pipeline, "transcribe_segment"):
+            result = await transcription_pool.transcribe(segment.audio, model)
+    return {
+        "text": result["text"].strip(),
+        "language": result.get("language", "unknown"),
+        "start": round(segment.start, 2),
+        "end": round(segment.end, 2),
+    }
+
+
+async def _close_with_error(websocket: WebSocket, detail: str, code: int):
+    try:
+        await websocket.send_json({"type": "error", "detail": detail})
+        await websocket.close(code=code)
+    except Exception:
+        # The client is already gone
+        pass
+
+
+async def serve_transcription_stream(websocket: WebSocket, model: str, pipeline: str) -> Optional[str]:
+    """
+    Incremental transcription over a WebSocket
+
+    Protocol: the client sends binary messages of 16 kHz mono little-endian
+    PCM16 in any chunk size, then the text message {"type": "end"}. Audio is
+    split at pauses (core.vad) and each utterance is transcribed as soon as it
+    is complete; the server sends {"type": "partial", ...} per utterance in
+    order, then {"type": "final", "transcript": ...} and closes. Errors are
+    sent as {"type": "error", "detail": ...}.
+
+    Returns the full transcript, or None if the stream did not complete.
+    """
+    await websocket.accept()
+    segmenter = EnergySegmenter()
+    # Transcriptions run concurrently in the pool but are reported in order
+    jobs: asyncio.Queue = asyncio.Queue()
+    slots = asyncio.Semaphore(STREAM_MAX_IN_FLIGHT)
+    leftover = b""
+
+    async def send_results() -> str:
+        parts: List[str] = []
+        index = 0
+        while True:
+            job = await jobs.get()
+            if job is None:
+                break
+            partial = await job
+            if not partial["text"]:
+                continue
+            parts.append(partial["text"])
+            await websocket.send_json({"type": "partial", "index": index, **partial})
+            index += 1
+        transcript = " ".join(parts)
+        await websocket.send_json({"type": "final", "transcript": transcript, "segments": index})
+        return transcript
+
+    def submit(segment: Optional[Segment]):
+        if segment is not None:
+            jobs.put_nowait(asyncio.create_task(_transcribe_segment(pipeline, segment, model, slots)))
+
+    sender = asyncio.create_task(send_results())
+    receiver: Optional[asyncio.Task] = None
+    try:
+        while True:
+            # Wait on the client and the sender together, so a failed transcription
+            # closes the socket right away instead of on the client's next frame
+            receiver = asyncio.create_task(websocket.receive())
+            done, _ = await asyncio.wait({receiver, sender}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver not in done:
+                # The sender stopped early: a transcription failed; this re-raises it
+                await sender
+                return None
+
+            message = receiver.result()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            if message.get("bytes") is not None:
+                data = leftover + message["bytes"]
+                # A chunk may end mid-sample; carry the odd byte over
+                cut = len(data) - len(data) % 2
+                leftover = data[cut:]
+                for segment in segmenter.feed(pcm16_to_float32(data[:cut])):
+                    submit(segment)
+            elif message.get("text") is not None:
+                try:
+                    control = json.loads(message["text"])
+                except ValueError:
+                    control = {}
+                if control.get("type") == "end":
+                    submit(segmenter.flush())
+                    jobs.put_nowait(None)
+                    transcript = await sender
+                    await websocket.close()
+                    return transcript
+
+    except WebSocketDisconnect:
+        logger.info("Transcription stream closed by client")
+    except TranscriptionQueueFull as e:
+        await _close_with_error(websocket, str(e), CLOSE_TRY_AGAIN_LATER)
+    except Exception as e:
+        logger.error(f"Transcription stream failed: {e}")
+        await _close_with_error(websocket, f"Transcription failed: {str(e)}", 1011)
+    finally:
+        if receiver is not None:
+            receiver.cancel()
+        sender.cancel()
+        while not jobs.empty():
+            job = jobs.get_nowait()
+            if job is not None:
+                job.cancel()
+    return None
@@ -0,0 +1,198 @@
+"""
+Query expansion for FAISS retrieval without an LLM hop on every query
+
+MultiQueryRetriever asks the LLM for paraphrases before it retrieves
+anything, so every RAG query pays a serial Groq round trip. ExpandingRetriever
+makes that a strategy:
+
+    off       plain similarity search
+    local     Rocchio expansion: the query vector is moved towards the
+              stored vectors of its first-pass neighbours and searched again
+    cached    LLM paraphrases, remembered per query embedding
+    adaptive  first-pass search; LLM paraphrases (cached) only when the best
+              cosine is below the threshold
+    llm       LLM paraphrases on every query (the MultiQueryRetriever behaviour)
+
+Every strategy returns the same number of documents, so the prompt that is
+stuffed with them does not grow with the number of paraphrases.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain.retrievers.multi_query import DEFAULT_QUERY_PROMPT
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+from core.retrieval import search_with_vectors
+from core.semantic_cache import SemanticCache
+from core.tracing import Counter, register_metric, stage
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("off", "local", "cached", "adaptive", "llm")
+
+QUERY_EXPANSION = os.getenv("QUERY_EXPANSION", "adaptive").lower()
+# Below this first-pass cosine the adaptive strategy asks the LLM for paraphrases
+QUERY_EXPANSION_THRESHOLD = float(os.getenv("QUERY_EXPANSION_THRESHOLD", "0.5"))
+
+expansions = register_metric(Counter(
+    "retrieval_expansions_total",
+    "Retrievals by query expansion strategy and what the expansion cost (none, local, cache_hit, llm)",
+    ("pipeline", "strategy", "expansion")
+))
+
+
+def _parse_paraphrases(text: str) -> List[str]:
+    return [line.strip() for line in text.strip().split("\n") if line.strip()]
+
+
+class ExpandingRetriever(BaseRetriever):
+    """FAISS retriever with a configurable, cost-aware query expansion step"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: Any
+    llm: Any = None
+    strategy: str = "adaptive"
+    k: int = 3
+    score_threshold: float = QUERY_EXPANSION_THRESHOLD
+    # Neighbours fed back into the query vector by the local strategy, and their weight
+    feedback_docs: int = 5
+    feedback_weight: float = 0.5
+    paraphrase_cache: Optional[SemanticCache] = None
+    pipeline: str = "retrieval"
+
+    def model_post_init(self, __context):
+        if self.strategy not in STRATEGIES:
+            raise ValueError(f"Unknown query expansion strategy {self.strategy!r}, expected one of {STRATEGIES}")
+        if self.llm is None and self.strategy in ("cached", "adaptive", "llm"):
+            logger.warning(f"No LLM for query expansion, using the local strategy instead of {self.strategy}")
+            self.strategy = "local"
+        if self.paraphrase_cache is None and self.strategy in ("cached", "adaptive"):
+            self.paraphrase_cache = SemanticCache(threshold=0.97, ttl_seconds=24 * 3600, max_entries=4096)
+
+    @property
+    def search_kwargs(self) -> Dict[str, Any]:
+        # Same shape as a VectorStoreRetriever for callers that read k from it
+        return {"k": self.k}
+
+    # --- vector work (CPU, sync) ---
+
+    def _first_pass(self, query: str):
+        vector = np.asarray(self.vectorstore.embeddings.embed_query(query), dtype=np.float32)
+        depth = max(self.k, self.feedback_docs) if self.strategy == "local" else self.k
+        documents, similarities, vectors = search_with_vectors(self.vectorstore, vector, depth)
+        return vector, documents, similarities, vectors
+
+    def _needs_llm(self, similarities: np.ndarray) -> bool:
+        if self.strategy in ("cached", "llm"):
+            return True
+        if self.strategy == "adaptive":
+            return similarities.size == 0 or float(similarities.max()) < self.score_threshold
+        return False
+
+    def _rocchio(self, vector: np.ndarray, vectors: np.ndarray) -> List[Document]:
+        if not len(vectors):
+            return []
+        query = vector / max(np.linalg.norm(vector), 1e-12)
+        neighbours = vectors[:self.feedback_docs]
+        neighbours = neighbours / np.maximum(np.linalg.norm(neighbours, axis=1, keepdims=True), 1e-12)
+        expanded = query + self.feedback_weight * neighbours.mean(axis=0)
+        documents, _, _ = search_with_vectors(self.vectorstore, expanded, self.k)
+        return documents
+
+    def _fuse(self, documents: List[Document], similarities: np.ndarray, paraphrases: List[str]) -> List[Document]:
+        """Top k over the original and paraphrased queries by best cosine to any of them"""
+        best: Dict[str, tuple] = {}
+
+        def add(docs, sims):
+            for doc, sim in zip(docs, np.asarray(sims).tolist()):
+                key = doc.page_content
+                if key not in best or sim > best[key][1]:
+                    best[key] = (doc, sim)
+
+        add(documents, similarities)
+        if paraphrases:
+            # One batched encode for all paraphrases
+            for vector in self.vectorstore.embeddings.embed_documents(paraphrases):
+                docs, sims, _ = search_with_vectors(self.vectorstore, vector, self.k)
+                add(docs, sims)
+        ranked = sorted(best.values(), key=lambda pair: pair[1], reverse=True)
+        return [doc for doc, _ in ranked[:self.k]]
+
+    def _cached_paraphrases(self, vector: np.ndarray) -> Optional[List[str]]:
+        if self.strategy == "llm" or self.paraphrase_cache is None:
+            return None
+        return self.paraphrase_cache.lookup(vector)
+
+    def _remember(self, vector: np.ndarray, paraphrases: List[str]):
+        if self.strategy != "llm" and self.paraphrase_cache is not None:
+            self.paraphrase_cache.store(vector, paraphrases, size_bytes=sum(len(p) for p in paraphrases))
+
+    def _count(self, expansion: str):
+        expansions.inc(pipeline=self.pipeline, strategy=self.strategy, expansion=expansion)
+
+    def _without_llm(self, vector, documents, similarities, vectors) -> List[Document]:
+        if self.strategy == "local":
+            self._count("local")
+            return self._rocchio(vector, vectors)
+        self._count("none")
+        return documents[:self.k]
+
+    # --- retriever interface ---
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        vector, documents, similarities, vectors = self._first_pass(query)
+        if not self._needs_llm(similarities):
+            return self._without_llm(vector, documents, similarities, vectors)
+
+        paraphrases = self._cached_paraphrases(vector)
+        if paraphrases is not None:
+            self._count("cache_hit")
+        else:
+            self._count("llm")
+            with stage(self.pipeline, "expand"):
+                response = self.llm.invoke(
+                    DEFAULT_QUERY_PROMPT.format(question=query),
+                    config={"callbacks": run_manager.get_child()}
+                )
+            paraphrases = _parse_paraphrases(getattr(response, "content", response))
+            self._remember(vector, paraphrases)
+        return self._fuse(documents, similarities, paraphrases)
+
+    async def _aget_relevant_documents(self, query: str, *,
+                                       run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        vector, documents, similarities, vectors = await asyncio.to_thread(self._first_pass, query)
+        if not self._needs_llm(similarities):
+            return await asyncio.to_thread(self._without_llm, vector, documents, similarities, vectors)
+
+        paraphrases = self._cached_paraphrases(vector)
+        if paraphrases is not None:
+            self._count("cache_hit")
+        else:
+            self._count("llm")
+            with stage(self.pipeline, "expand"):
+                response = await self.llm.ainvoke(
+                    DEFAULT_QUERY_PROMPT.format(question=query),
+                    config={"callbacks": run_manager.get_child()}
+                )
+            paraphrases = _parse_paraphrases(getattr(response, "content", response))
+            self._remember(vector, paraphrases)
+        return await asyncio.to_thread(self._fuse, documents, similarities, paraphrases)
+
+
+def expanding_retriever_from_env(vectorstore, llm=None, k: int = 3, pipeline: str = "retrieval",
+                                 strategy: Optional[str] = None) -> ExpandingRetriever:
+    """ExpandingRetriever configured by QUERY_EXPANSION / QUERY_EXPANSION_THRESHOLD"""
+    return ExpandingRetriever(
+        vectorstore=vectorstore,
+        llm=llm,
+        strategy=strategy or QUERY_EXPANSION,
+        k=k,
+        pipeline=pipeline,
+    )
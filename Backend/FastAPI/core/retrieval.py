@@ -0,0 +1,51 @@
+import logging
+from typing import List, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+
+def cosine_similarities(query_vector, matrix) -> np.ndarray:
+    """Cosine similarity of one vector against every row of a matrix"""
+    query = np.asarray(query_vector, dtype=np.float32).ravel()
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.size == 0:
+        return np.zeros(0, dtype=np.float32)
+    denom = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    return (matrix @ query) / np.maximum(denom, 1e-12)
+
+
+def search_with_vectors(db, query_vector, k: int = 3) -> Tuple[List[Document], np.ndarray, np.ndarray]:
+    """
+    Search a LangChain FAISS store by vector; return documents, cosines and stored vectors
+
+    The cosine is computed against the vectors already stored in the index,
+    so no source document has to be embedded again.
+    """
+    query = np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+    _, indices = db.index.search(query, k)
+    positions = [int(i) for i in indices[0] if i != -1]
+    if not positions:
+        return [], np.zeros(0, dtype=np.float32), np.zeros((0, query.shape[1]), dtype=np.float32)
+
+    documents = [db.docstore.search(db.index_to_docstore_id[i]) for i in positions]
+
+    try:
+        vectors = np.vstack([db.index.reconstruct(i) for i in positions])
+    except RuntimeError as e:
+        # Index types without a direct map cannot reconstruct; fall back to one batched encode
+        logger.warning(f"Index cannot reconstruct vectors ({e}), re-embedding sources")
+        vectors = np.asarray(
+            db.embeddings.embed_documents([doc.page_content for doc in documents]),
+            dtype=np.float32
+        )
+
+    return documents, cosine_similarities(query[0], vectors), vectors
+
+
+def search_with_cosine(db, query_vector, k: int = 3) -> List[Tuple[Document, float]]:
+    """Search a LangChain FAISS store by vector and return (document, cosine) pairs"""
+    documents, similarities, _ = search_with_vectors(db, query_vector, k)
+    return list(zip(documents, similarities.tolist()))
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+from itertools import count
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+class _Entry:
+    __slots__ = ("vector", "value", "size_bytes", "expires_at")
+
+    def __init__(self, vector: np.ndarray, value: Any, size_bytes: int, expires_at: float):
+        self.vector = vector
+        self.value = value
+        self.size_bytes = size_bytes
+        self.expires_at = expires_at
+
+
+class SemanticCache:
+    """
+    LRU + TTL cache keyed on an embedding instead of an exact string
+
+    A lookup hits when the best cosine similarity against the stored
+    embeddings reaches `threshold`, so paraphrases and spelling variants of a
+    question share one entry.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 3600,
+                 max_entries: int = 2048, max_bytes: int = 64 * 1024 * 1024):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._ids = count()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Stacked vectors for one matrix product per lookup; rebuilt lazily after writes
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: list = []
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _remove(self, key: int):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size_bytes
+        self._matrix = None
+
+    def _purge_expired(self, now: float):
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        for key in expired:
+            self._remove(key)
+            self.evictions += 1
+
+    def lookup(self, vector) -> Optional[Any]:
+        """Return the cached value for the closest stored embedding, if close enough"""
+        query = self._normalize(vector)
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            if self._matrix is None:
+                self._matrix_keys = list(self._entries)
+                self._matrix = np.vstack([self._entries[key].vector for key in self._matrix_keys])
+
+            similarities = self._matrix @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            key = self._matrix_keys[best]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key].value
+
+    def store(self, vector, value: Any, size_bytes: int = 0):
+        """Insert a value, evicting least recently used entries past the size bounds"""
+        vector = self._normalize(vector)
+        size_bytes = size_bytes + vector.nbytes
+        if size_bytes > self.max_bytes:
+            return
+
+        with self._lock:
+            key = next(self._ids)
+            self._entries[key] = _Entry(vector, value, size_bytes, time.monotonic() + self.ttl_seconds)
+            self._bytes += size_bytes
+            self._matrix = None
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._matrix = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,152 @@
+"""
+Server-Sent Events for LLM-backed endpoints
+
+A /stream variant answers with text/event-stream instead of waiting for the
+whole completion:
+
+    event: token   data: {"text": "..."}        one per chunk, in order
+    event: reset   data: {"reason": "..."}      discard the text so far (fallback model follows)
+    event: done    data: {...}                  the endpoint's metadata (sources, ids, ...)
+    event: error   data: {"error": "..."}       generation failed after the stream started
+
+Failures before the first byte (validation, capacity, missing models) are
+still plain HTTP errors, because the setup runs before the response starts.
+"""
+import asyncio
+import inspect
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Union
+
+from fastapi.responses import StreamingResponse
+from langchain_core.documents import Document
+from langchain_core.prompts import format_document
+from starlette.background import BackgroundTask
+
+from core.concurrency import ConcurrencyLimiter
+from core.tracing import Histogram, register_metric, trace_config
+
+logger = logging.getLogger(__name__)
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Stop nginx-style proxies from buffering the stream into one response
+    "X-Accel-Buffering": "no",
+}
+
+first_token_seconds = register_metric(Histogram(
+    "llm_first_token_seconds", "Time from stream start to the first generated token", ("pipeline",)
+))
+
+
+class Reset:
+    """Yielded by a token source to make the client discard the text shown so far"""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+
+
+def sse_event(event: str, data: Any) -> str:
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def _text(chunk) -> str:
+    # Chat models stream message chunks, plain LLMs stream strings
+    return chunk if isinstance(chunk, str) else getattr(chunk, "content", "") or ""
+
+
+async def stream_events(pipeline: str, tokens: AsyncIterator[Any],
+                        done: Callable[[str], Union[dict, Awaitable[dict]]]) -> AsyncIterator[str]:
+    """
+    Turn a token source into SSE events
+
+    `done` receives the full generated text and returns the final event's
+    payload; it may be async. A token source yields Reset when it abandons
+    its answer for a fallback model.
+    """
+    started = time.perf_counter()
+    parts: List[str] = []
+    try:
+        async for chunk in tokens:
+            if isinstance(chunk, Reset):
+                parts.clear()
+                yield sse_event("reset", {"reason": chunk.reason})
+                continue
+            text = _text(chunk)
+            if not text:
+                continue
+            if not parts:
+                first_token_seconds.observe(time.perf_counter() - started, pipeline=pipeline)
+            parts.append(text)
+            yield sse_event("token", {"text": text})
+
+        final = done("".join(parts))
+        if inspect.isawaitable(final):
+            final = await final
+        yield sse_event("done", final)
+    except asyncio.CancelledError:
+        # Client went away; cancelling here also closes the upstream LLM stream
+        raise
+    except Exception as e:
+        logger.error(f"{pipeline} stream failed: {e}")
+        yield sse_event("error", {"error": str(e)})
+
+
+async def single_event_stream(text: str) -> AsyncIterator[str]:
+    """Token source for answers that are already complete (cache hits, canned replies)"""
+    yield text
+
+
+async def sse_response(events: AsyncIterator[str], limiter: Optional[ConcurrencyLimiter] = None) -> StreamingResponse:
+    """
+    StreamingResponse for an event generator
+
+    With a limiter, the endpoint slot is taken before the response starts (so
+    a full endpoint still answers 503) and held until the stream ends. It is
+    released by whichever comes first: the generator finishing or being
+    closed, or the response's background task, which also runs when the
+    client disconnects before the generator was ever started.
+    """
+    if limiter is None:
+        return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+    await limiter.acquire()
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            limiter.release()
+
+    async def held():
+        try:
+            async for event in events:
+                yield event
+        finally:
+            release()
+
+    return StreamingResponse(held(), media_type="text/event-stream", headers=SSE_HEADERS,
+                             background=BackgroundTask(release))
+
+
+async def astream_stuffed(qa_chain, documents: List[Document], question: str, pipeline: str) -> AsyncIterator[Any]:
+    """
+    Stream the answer step of a "stuff" RetrievalQA chain for already retrieved documents
+
+    The legacy chain only returns whole completions, so the prompt is built
+    from the chain's document prompt and separator, as StuffDocumentsChain
+    does, and streamed from its LLM directly.
+    """
+    combine = qa_chain.combine_documents_chain
+    context = combine.document_separator.join(format_document(doc, combine.document_prompt) for doc in documents)
+    inputs = {combine.document_variable_name: context, "question": question}
+    prompt = combine.llm_chain.prompt.format_prompt(**inputs)
+    async for chunk in combine.llm_chain.llm.astream(prompt, config=trace_config(pipeline)):
+        yield chunk
+
+
+def source_list(documents: List[Document]) -> List[dict]:
+    return [{"source": doc.metadata.get("source", "Unknown")} for doc in documents]
@@ -0,0 +1,109 @@
+import logging
+import os
+import re
+from collections import deque
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+
+class TermMatcher:
+    """
+    Single-pass keyword and suffix-pattern matcher
+
+    Keywords are compiled into an Aho-Corasick automaton, so a scan costs one
+    step per input character no matter how many terms are loaded. Matches
+    must sit on word boundaries. Regex patterns are combined into one
+    alternation compiled once.
+    """
+
+    def __init__(self, terms: Iterable[str] = (), patterns: Iterable[str] = ()):
+        self._terms: List[str] = []
+        self._lengths: List[int] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        seen = set()
+        for term in terms:
+            key = " ".join(term.lower().split())
+            if key and key not in seen:
+                seen.add(key)
+                self._add(key, term.strip())
+        self._build()
+
+        patterns = list(patterns)
+        self._pattern_re = (
+            re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE) if patterns else None
+        )
+
+    def _add(self, key: str, term: str):
+        state = 0
+        for ch in key:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(len(self._terms))
+        self._terms.append(term)
+        self._lengths.append(len(key))
+
+    def _build(self):
+        """Breadth-first pass setting failure links and merging their outputs"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __len__(self):
+        return len(self._terms)
+
+    def find_terms(self, text: str) -> List[str]:
+        """Vocabulary terms present in text, as written in the vocabulary"""
+        lowered = text.lower()
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self._lengths
+        found = set()
+        state = 0
+        for end, ch in enumerate(lowered, 1):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in out[state]:
+                start = end - lengths[index]
+                if (start == 0 or not lowered[start - 1].isalnum()) and \
+                        (end == len(lowered) or not lowered[end].isalnum()):
+                    found.add(index)
+        return [self._terms[index] for index in found]
+
+    def find_patterns(self, text: str) -> List[str]:
+        if self._pattern_re is None:
+            return []
+        return self._pattern_re.findall(text)
+
+    def match(self, text: str) -> List[str]:
+        return self.find_terms(text) + self.find_patterns(text)
+
+    @classmethod
+    def from_file(cls, path: str, extra_terms: Iterable[str] = (), patterns: Iterable[str] = ()) -> "TermMatcher":
+        """Build from a `<category><TAB><term>` (or one term per line) vocabulary file"""
+        terms = list(extra_terms)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+                    terms.append(line.split("\t")[-1])
+        else:
+            logger.warning(f"Medical vocabulary not found at {path}, using built-in terms only")
+        return cls(terms, patterns)
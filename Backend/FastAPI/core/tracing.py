@@ -0,0 +1,212 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+
+# Seconds; covers sub-millisecond cache hits up to long LLM generations
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram keyed by label tuples"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                labels = ",".join(f'{n}="{v}"' for n, v in zip(self.label_names, key))
+                sep = "," if labels else ""
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{{labels}{sep}le="{bound}"}} {bucket_count}')
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {count}')
+                lines.append(f"{self.name}_sum{{{labels}}} {total}")
+                lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+class Counter:
+    """Prometheus-style monotonically increasing counter keyed by label tuples"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._series: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._series.get(tuple(labels.get(name, "") for name in self.label_names), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._series.items()):
+                labels = ",".join(f'{n}="{v}"' for n, v in zip(self.label_names, key))
+                lines.append(f"{self.name}{{{labels}}} {value}")
+        return lines
+
+
+stage_seconds = Histogram(
+    "pipeline_stage_seconds", "Time spent in each pipeline stage", ("pipeline", "stage")
+)
+request_seconds = Histogram(
+    "http_request_seconds", "End-to-end request latency", ("route", "method", "status")
+)
+llm_tokens = Counter(
+    "llm_tokens_total", "LLM tokens consumed", ("pipeline", "kind")
+)
+
+_metrics = [request_seconds, stage_seconds, llm_tokens]
+
+
+def register_metric(metric):
+    """Add a module-specific Histogram or Counter to the /metrics output"""
+    if metric not in _metrics:
+        _metrics.append(metric)
+    return metric
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class Trace:
+    """Stage timings collected for one request"""
+
+    def __init__(self):
+        self.stages: List[Tuple[str, float]] = []
+        self.tokens: Dict[str, int] = {}
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages)
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+
+
+def start_trace() -> Tuple[Trace, contextvars.Token]:
+    trace = Trace()
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token: contextvars.Token):
+    _current_trace.reset(token)
+
+
+@contextmanager
+def stage(pipeline: str, name: str):
+    """Time a block as one stage of a pipeline; works from sync and async code"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stage_seconds.observe(elapsed, pipeline=pipeline, stage=name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.stages.append((f"{pipeline}.{name}", elapsed))
+
+
+def record_tokens(pipeline: str, usage: Dict[str, int]):
+    """Count prompt_tokens/completion_tokens reported by an LLM response"""
+    trace = _current_trace.get()
+    for kind in ("prompt_tokens", "completion_tokens"):
+        value = usage.get(kind)
+        if value:
+            llm_tokens.inc(value, pipeline=pipeline, kind=kind.replace("_tokens", ""))
+            if trace is not None:
+                trace.tokens[kind] = trace.tokens.get(kind, 0) + value
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """LangChain callback that records token usage and LLM time for a pipeline"""
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self._started: Dict[str, float] = {}
+
+    def _finish(self, run_id, stage_name: str):
+        started = self._started.pop(str(run_id), None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            stage_seconds.observe(elapsed, pipeline=self.pipeline, stage=stage_name)
+            trace = _current_trace.get()
+            if trace is not None:
+                trace.stages.append((f"{self.pipeline}.{stage_name}", elapsed))
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._started[str(run_id)] = time.perf_counter()
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._finish(run_id, "retrieve")
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[str(run_id)] = time.perf_counter()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[str(run_id)] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id, "llm")
+
+        usage = (response.llm_output or {}).get("token_usage")
+        if usage:
+            record_tokens(self.pipeline, usage)
+            return
+
+        # Chat models also report usage on the generated message
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if metadata:
+                    record_tokens(self.pipeline, {
+                        "prompt_tokens": metadata.get("input_tokens"),
+                        "completion_tokens": metadata.get("output_tokens"),
+                    })
+
+
+def record_gemini_usage(pipeline: str, response):
+    """Count the tokens of a google.generativeai response (called outside LangChain)"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        record_tokens(pipeline, {
+            "prompt_tokens": usage.prompt_token_count,
+            "completion_tokens": usage.candidates_token_count,
+        })
+
+
+def trace_config(pipeline: str) -> Dict[str, list]:
+    """RunnableConfig fragment to pass as config= to invoke/ainvoke"""
+    return {"callbacks": [TokenUsageCallback(pipeline)]}
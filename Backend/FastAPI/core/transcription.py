@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# How often a waiting request checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
+
+
+class TranscriptionQueueFull(RuntimeError):
+    """Raised when the pool already holds max_pending jobs"""
+
+
+class TranscriptionCancelled(RuntimeError):
+    """Raised when the client went away before its transcription finished"""
+
+
+def _init_worker(preload):
+    # Each worker process owns its own model copies (and memory budget)
+    from core.whisper_models import whisper_models
+    whisper_models.preload(preload)
+
+
+def _warmup() -> Dict[str, Any]:
+    """No-op job: makes the pool spawn a worker, whose initializer loads the preloaded sizes"""
+    from core.whisper_models import whisper_models
+    return {"pid": os.getpid(), "models": whisper_models.status()}
+
+
+def _transcribe(model_name: str, audio) -> Dict[str, Any]:
+    """Runs inside a worker process (or a thread when the pool is disabled)"""
+    from core.whisper_models import whisper_models
+
+    started = time.perf_counter()
+    model = whisper_models.get(model_name)
+    loaded = time.perf_counter()
+    result = model.transcribe(audio, task="transcribe")
+    return {
+        "text": result["text"],
+        "language": result.get("language", "unknown"),
+        "load_seconds": loaded - started,
+        "transcribe_seconds": time.perf_counter() - loaded,
+        "pid": os.getpid(),
+        "models": whisper_models.status(),
+    }
+
+
+class TranscriptionPool:
+    """
+    Runs Whisper in dedicated worker processes so transcription never holds
+    the event loop (or the GIL) of the API process
+
+    At most max_pending jobs are accepted (running plus queued); beyond that
+    submit raises TranscriptionQueueFull so the route can shed load. A job
+    whose client disconnects is cancelled if it has not started yet; a job
+    already running finishes in its worker and the result is dropped.
+    With workers=0 transcription runs in a thread of the API process instead.
+    """
+
+    def __init__(self, workers: int, max_pending: int, preload=()):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.preload = list(preload)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self._worker_models: Dict[int, Dict[str, Any]] = {}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            logger.info(f"Starting transcription pool with {self.workers} worker(s)")
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # fork would copy the API process (torch, FAISS, open sockets)
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.preload,),
+            )
+        return self._executor
+
+    def start(self):
+        """Create the pool; worker processes are spawned by warmup() or the first jobs"""
+        if self.workers > 0:
+            self._get_executor()
+        else:
+            from core.whisper_models import whisper_models
+            whisper_models.preload(self.preload)
+
+    def warmup(self):
+        """
+        Spawn every worker now so WHISPER_PRELOAD is loaded before the first request
+
+        The executor only spawns a process when a job finds no idle worker, so
+        one no-op job per worker brings the whole pool up. Call it from app
+        startup, not at import: spawned workers re-import the launching module.
+        """
+        if self.workers <= 0:
+            return
+        executor = self._get_executor()
+        for _ in range(self.workers):
+            executor.submit(_warmup).add_done_callback(self._record_warmup)
+
+    def _record_warmup(self, future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logger.error(f"Transcription worker warmup failed: {future.exception()}")
+            return
+        result = future.result()
+        self._worker_models[result["pid"]] = result["models"]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def transcribe(self, audio, model_name: str,
+                         is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None) -> Dict[str, Any]:
+        """
+        Transcribe 16 kHz float32 PCM (see core.audio) or an audio file path
+        with the given Whisper size
+
+        is_disconnected is typically Request.is_disconnected; when it reports
+        True the job is abandoned and TranscriptionCancelled is raised.
+        """
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise TranscriptionQueueFull(
+                f"Transcription queue is full ({self.max_pending} jobs), please retry shortly"
+            )
+
+        self.pending += 1
+        try:
+            if self.workers > 0:
+                try:
+                    job = asyncio.wrap_future(self._get_executor().submit(_transcribe, model_name, audio))
+                except BrokenProcessPool:
+                    # A worker died (e.g. out of memory); start a fresh pool
+                    logger.error("Transcription pool is broken, restarting it")
+                    self.shutdown()
+                    job = asyncio.wrap_future(self._get_executor().submit(_transcribe, model_name, audio))
+            else:
+                job = asyncio.ensure_future(asyncio.to_thread(_transcribe, model_name, audio))
+
+            result = await self._wait(job, is_disconnected)
+        except (TranscriptionCancelled, asyncio.CancelledError):
+            self.cancelled += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+
+        self.completed += 1
+        self._worker_models[result["pid"]] = result.pop("models")
+        return result
+
+    async def _wait(self, job: asyncio.Future, is_disconnected) -> Dict[str, Any]:
+        try:
+            if is_disconnected is None:
+                return await job
+            while True:
+                done, _ = await asyncio.wait({job}, timeout=DISCONNECT_POLL_SECONDS)
+                if done:
+                    return job.result()
+                if await is_disconnected():
+                    raise TranscriptionCancelled("Client disconnected before transcription finished")
+        finally:
+            if not job.done():
+                # Cancels the underlying executor future if it has not started yet
+                job.cancel()
+
+    def status(self) -> Dict[str, Any]:
+        status = {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+        }
+        if self.workers > 0:
+            status["worker_models"] = dict(self._worker_models)
+        else:
+            from core.whisper_models import whisper_models
+            status["models"] = whisper_models.status()
+        return status
+
+
+def preload_models_from_env() -> List[str]:
+    """Sizes listed in WHISPER_PRELOAD, e.g. "small,medium" """
+    return [name.strip() for name in os.getenv("WHISPER_PRELOAD", "").split(",") if name.strip()]
+
+
+def _pool_from_env() -> TranscriptionPool:
+    workers = int(os.getenv("WHISPER_WORKERS", "1"))
+    return TranscriptionPool(
+        workers=workers,
+        max_pending=int(os.getenv("WHISPER_MAX_PENDING", str(max(workers, 1) * 4))),
+        preload=preload_models_from_env(),
+    )
+
+
+transcription_pool = _pool_from_env()
@@ -0,0 +1,115 @@
+import os
+from collections import deque
+from typing import List, Optional
+
+import numpy as np
+
+from core.audio import SAMPLE_RATE
+
+# RMS of a float32 frame in [-1, 1]; 0.01 is roughly -40 dBFS
+DEFAULT_ENERGY_THRESHOLD = float(os.getenv("VAD_ENERGY_THRESHOLD", "0.01"))
+
+
+class Segment:
+    def __init__(self, audio: np.ndarray, start: float):
+        self.audio = audio
+        self.start = start
+        self.end = start + len(audio) / SAMPLE_RATE
+
+
+class EnergySegmenter:
+    """
+    Splits a stream of 16 kHz float32 audio into utterances at pauses
+
+    Frames whose RMS energy reaches the threshold count as speech. A segment
+    starts at the first speech frame (plus a little pre-roll), ends after
+    min_silence_ms of quiet and is cut at max_segment_s regardless, so long
+    monologues still produce text early. Segments with less than
+    min_speech_ms of speech (coughs, clicks) are dropped.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_ENERGY_THRESHOLD, frame_ms: int = 30,
+                 min_silence_ms: int = 600, min_speech_ms: int = 250,
+                 max_segment_s: float = 20.0, padding_ms: int = 200):
+        self.threshold = threshold
+        self.frame_size = SAMPLE_RATE * frame_ms // 1000
+        self.min_silence_frames = max(1, min_silence_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.max_segment_frames = int(max_segment_s * 1000) // frame_ms
+        self.padding_frames = padding_ms // frame_ms
+
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._preroll: deque = deque(maxlen=self.padding_frames)
+        self._frames: List[np.ndarray] = []
+        self._speech_frames = 0
+        self._silent_run = 0
+
+        # Sample offsets in the stream, for segment timestamps
+        self._consumed = 0
+        self._segment_start = 0
+
+    def feed(self, samples: np.ndarray) -> List[Segment]:
+        """Add audio; returns the segments completed by it (possibly none)"""
+        samples = np.concatenate([self._pending, samples.astype(np.float32, copy=False)])
+        usable = len(samples) - len(samples) % self.frame_size
+        self._pending = samples[usable:]
+        if not usable:
+            return []
+
+        frames = samples[:usable].reshape(-1, self.frame_size)
+        is_speech = np.sqrt(np.mean(frames ** 2, axis=1)) >= self.threshold
+
+        segments = []
+        for frame, speech in zip(frames, is_speech):
+            segment = self._step(frame, bool(speech))
+            if segment is not None:
+                segments.append(segment)
+        return segments
+
+    def flush(self) -> Optional[Segment]:
+        """End of stream: return whatever speech is still buffered"""
+        if self._pending.size and self._frames:
+            self._frames.append(self._pending)
+        self._pending = np.zeros(0, dtype=np.float32)
+        return self._emit()
+
+    def _step(self, frame: np.ndarray, speech: bool) -> Optional[Segment]:
+        self._consumed += self.frame_size
+
+        if not self._frames:
+            if not speech:
+                self._preroll.append(frame)
+                return None
+            self._frames = list(self._preroll) + [frame]
+            self._segment_start = self._consumed - self.frame_size * len(self._frames)
+            self._preroll.clear()
+            self._speech_frames = 1
+            self._silent_run = 0
+            return None
+
+        self._frames.append(frame)
+        if speech:
+            self._speech_frames += 1
+            self._silent_run = 0
+        else:
+            self._silent_run += 1
+
+        if self._silent_run >= self.min_silence_frames:
+            # Keep a little trailing silence, drop the rest of the pause
+            trim = max(0, self._silent_run - self.padding_frames)
+            if trim:
+                del self._frames[-trim:]
+            return self._emit()
+        if len(self._frames) >= self.max_segment_frames:
+            return self._emit()
+        return None
+
+    def _emit(self) -> Optional[Segment]:
+        frames, speech_frames = self._frames, self._speech_frames
+        self._frames = []
+        self._speech_frames = 0
+        self._silent_run = 0
+        if not frames or speech_frames < self.min_speech_frames:
+            return None
+
+        return Segment(np.concatenate(frames), self._segment_start / SAMPLE_RATE)
@@ -0,0 +1,121 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+import whisper
+
+logger = logging.getLogger(__name__)
+
+# Approximate resident size (fp32 weights) used to make room before a load;
+# replaced by the measured size once the model is in memory
+ESTIMATED_SIZE_MB = {
+    "tiny": 75, "tiny.en": 75,
+    "base": 145, "base.en": 145,
+    "small": 485, "small.en": 485,
+    "medium": 1530, "medium.en": 1530,
+    "large": 3090, "large-v1": 3090, "large-v2": 3090, "large-v3": 3090,
+    "turbo": 1620, "large-v3-turbo": 1620,
+}
+
+
+def _model_size_mb(model) -> float:
+    return sum(p.numel() * p.element_size() for p in model.parameters()) / (1024 * 1024)
+
+
+class WhisperModelCache:
+    """
+    Keeps one Whisper model per size, evicting least recently used sizes
+    when the total resident size would exceed the memory budget
+    """
+
+    def __init__(self, memory_budget_mb: float):
+        self.memory_budget_mb = memory_budget_mb
+        self._models: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, float] = {}
+        self._load_seconds: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def _resident_mb(self) -> float:
+        return sum(self._sizes.values())
+
+    def _make_room(self, needed_mb: float):
+        while self._models and self._resident_mb() + needed_mb > self.memory_budget_mb:
+            name, _ = self._models.popitem(last=False)
+            freed = self._sizes.pop(name, 0.0)
+            self.evictions += 1
+            logger.info(f"Evicted Whisper model {name} ({freed:.0f} MB) to stay within budget")
+
+    def get(self, model_name: str):
+        """Return the model for this size, loading it (and evicting others) if needed"""
+        if model_name not in whisper.available_models():
+            raise ValueError(f"Unknown Whisper model '{model_name}', expected one of {whisper.available_models()}")
+
+        with self._lock:
+            model = self._lookup(model_name)
+            if model is not None:
+                return model
+            load_lock = self._load_locks.setdefault(model_name, threading.Lock())
+
+        # Loads of one size are serialized; other sizes stay servable meanwhile
+        with load_lock:
+            with self._lock:
+                model = self._lookup(model_name)
+                if model is not None:
+                    return model
+                estimate = ESTIMATED_SIZE_MB.get(model_name, 0.0)
+                if estimate > self.memory_budget_mb:
+                    logger.warning(f"Whisper {model_name} (~{estimate} MB) exceeds the {self.memory_budget_mb} MB budget")
+                self._make_room(estimate)
+
+            logger.info(f"Loading Whisper model ({model_name})...")
+            started = time.perf_counter()
+            model = whisper.load_model(model_name)
+            load_seconds = time.perf_counter() - started
+
+            with self._lock:
+                self._models[model_name] = model
+                self._sizes[model_name] = _model_size_mb(model)
+                self._load_seconds[model_name] = load_seconds
+                self.loads += 1
+            logger.info(f"Whisper model {model_name} loaded in {load_seconds:.1f}s")
+            return model
+
+    def _lookup(self, model_name: str):
+        model = self._models.get(model_name)
+        if model is not None:
+            self._models.move_to_end(model_name)
+            self.hits += 1
+        return model
+
+    def preload(self, model_names: List[str]):
+        for model_name in model_names:
+            try:
+                self.get(model_name)
+            except Exception as e:
+                logger.error(f"Failed to preload Whisper model {model_name}: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "loaded": {
+                name: {
+                    "size_mb": round(self._sizes.get(name, 0.0), 1),
+                    "load_seconds": round(self._load_seconds.get(name, 0.0), 2),
+                }
+                for name in self._models
+            },
+            "resident_mb": round(self._resident_mb(), 1),
+            "memory_budget_mb": self.memory_budget_mb,
+            "hits": self.hits,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
+
+
+whisper_models = WhisperModelCache(float(os.getenv("WHISPER_MEMORY_BUDGET_MB", "4096")))
@@ -1,24 +1,56 @@
+import time
+_import_started = time.perf_counter()
+
 import os
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 
 # Import routers
 from routes.query import router as medical_router
-#from routes.symptom import router as symptom_router
 from routes.generate_meal_plan.core import meal_router as meal_generator
 from routes.Location.location import locRouter as locationRouter
 from routes.MythBuster.MythBuster import myth_router as myth_router
 from routes.DeepGram.core import DeepGramRouter as voice_router
 from routes.meal_woman.dpcore import meal_router as meal_woman_router
-from auth.route import auth_router
+from auth.route import auth_router, composition_enricher
+from core.lifecycle import lifecycle
+from core.transcription import transcription_pool
+from core import tracing
 
 load_dotenv()
 
+IMPORT_SECONDS = time.perf_counter() - _import_started
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+# Whisper symptom routers to mount, e.g. "f2,f7" (f2 newborn, f7 pregnancy); none by default
+SYMPTOM_ROUTERS = {name.strip() for name in os.getenv("SYMPTOM_ROUTERS", "").split(",") if name.strip()}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy models load in the background so the app starts serving immediately
+    warmup_task = asyncio.create_task(lifecycle.warmup()) if WARMUP_ON_STARTUP else None
+    # Whisper workers start and load WHISPER_PRELOAD now rather than on the first
+    # upload; without preloaded models or a symptom router there is nothing to warm
+    if WARMUP_ON_STARTUP and SYMPTOM_ROUTERS and transcription_pool.preload:
+        transcription_pool.warmup()
+    # The enrichment worker sweeps for meals left pending, now and periodically
+    composition_enricher.resume()
+    yield
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    composition_enricher.stop()
+    transcription_pool.shutdown()
+
+
 app = FastAPI(
     title="Medical Query API",
     description="A FastAPI application for medical query processing with NLP and user management",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -28,11 +60,36 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination cursor of /api/auth/meals
+    expose_headers=["X-Next-Cursor"],
 )
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Collect per-stage timings for the request and export end-to-end latency"""
+    trace, token = tracing.start_trace()
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        tracing.end_trace(token)
+    elapsed = time.perf_counter() - started
+
+    route = request.scope.get("route")
+    tracing.request_seconds.observe(
+        elapsed,
+        route=getattr(route, "path", "unmatched"),
+        method=request.method,
+        status=str(response.status_code)
+    )
+    if tracing.SERVER_TIMING_ENABLED:
+        timings = trace.server_timing()
+        total = f"total;dur={elapsed * 1000:.1f}"
+        response.headers["Server-Timing"] = f"{timings}, {total}" if timings else total
+    return response
+
 # Include routers
 app.include_router(medical_router, prefix="/api/f1", tags=["Medical Query"])
-#app.include_router(symptom_router, prefix="/api/f2", tags=["Symptoms"])
 app.include_router(meal_generator, prefix="/api/f3", tags=["Meal Planning"])
 app.include_router(locationRouter, prefix="/api/f4", tags=["Location"])
 app.include_router(myth_router, prefix="/api/f5", tags=["MythBuster"])
@@ -40,6 +97,14 @@ app.include_router(meal_woman_router, prefix="/api/f6", tags=["Meal Planning"])
 app.include_router(auth_router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(voice_router, prefix="/api/voice", tags=["Authentication"])
 
+# Imported only when mounted: they bring in Whisper and the transcription pool
+if "f2" in SYMPTOM_ROUTERS:
+    from routes.symptom.symptom import router as symptom_router
+    app.include_router(symptom_router, prefix="/api/f2", tags=["Symptoms"])
+if "f7" in SYMPTOM_ROUTERS:
+    from routes.symptom_preg_women.symptom import router as symptom_preg_router
+    app.include_router(symptom_preg_router, prefix="/api/f7", tags=["Symptoms"])
+
 @app.get("/", tags=["Root"])
 async def root():
     return {"message": "Medical Query API is running"}
@@ -52,7 +117,25 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/metrics", tags=["Health Check"], response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of request, stage and token metrics"""
+    return PlainTextResponse(tracing.render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready", tags=["Health Check"])
+async def readiness_check():
+    """Per-component load state and startup timings"""
+    status = lifecycle.status()
+    content = {
+        "import_seconds": round(IMPORT_SECONDS, 3),
+        "warmup_enabled": WARMUP_ON_STARTUP,
+        **status
+    }
+    return JSONResponse(content=content, status_code=200 if status["ready"] else 503)
+
 if __name__ == "__main__":
+    # Prefer `uvicorn main:app` (see Backend/Readme.md): spawned Whisper workers
+    # re-import this file as __mp_main__ when it is run as a script
     import uvicorn
     ip = os.getenv("IPV4ADDRESS")
     port = int(os.getenv("PORT"))
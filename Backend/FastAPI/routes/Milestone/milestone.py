@@ -1,6 +1,11 @@
-from fastapi import FastAPI, Query
+import asyncio
+
+from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel
-from milestoneCore import run_milestone_pipeline
+# milestoneCore puts Backend/FastAPI on sys.path, so it is imported before core
+from milestoneCore import prepare_instruction, prepare_milestone_chain, run_milestone_pipeline, stream_milestone_answer
+from core.sse import sse_response, stream_events
+from core.tracing import stage, trace_config
 from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI()
@@ -20,3 +25,17 @@ class QueryRequest(BaseModel):
 def get_milestone_info(req: QueryRequest):
     result = run_milestone_pipeline(req.query)
     return result
+
+@app.post("/milestone/stream")
+async def stream_milestone_info(req: QueryRequest):
+    """Server-Sent Events variant of /milestone: answer tokens, then model and sources"""
+    if not req.query:
+        raise HTTPException(status_code=400, detail="Empty query.")
+
+    qa_chain = await asyncio.to_thread(prepare_milestone_chain)
+    with stage("milestone", "retrieve"):
+        documents = await qa_chain.retriever.ainvoke(prepare_instruction(req.query), config=trace_config("milestone"))
+
+    result = {}
+    tokens = stream_milestone_answer(qa_chain, documents, req.query, result)
+    return await sse_response(stream_events("milestone", tokens, lambda _: result))
@@ -1,4 +1,3 @@
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.vectorstores import FAISS
@@ -8,8 +7,19 @@ from langchain_groq import ChatGroq
 from dotenv import load_dotenv
 import google.generativeai as genai
 import os
+import sys
 import logging
 
+# This app runs on its own from routes/Milestone (PDF_DIR and FAISS_DIR are
+# relative to it); make the shared Backend/FastAPI/core package importable
+FASTAPI_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if FASTAPI_DIR not in sys.path:
+    sys.path.insert(0, FASTAPI_DIR)
+
+from core.embeddings import get_embedding_model
+from core.sse import Reset, astream_stuffed
+from core.tracing import stage, trace_config, record_gemini_usage
+
 load_dotenv()
 
 PDF_DIR = "data"
@@ -35,9 +45,6 @@ def create_chunks(documents):
     )
     return splitter.split_documents(documents)
 
-def get_embedding_model():
-    return HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
 def create_vector_store(chunks, embedding_model, persist_directory=FAISS_DIR):
     store = FAISS.from_documents(documents=chunks, embedding=embedding_model)
     store.save_local(persist_directory)
@@ -77,20 +84,47 @@ def prepare_instruction(query):
         f"User Query: {query}"
     )
 
-def run_milestone_pipeline(query):
-    if not query:
-        return {"error": "Empty query."}
+def gemini_fallback_prompt(query):
+    return (
+        "You are a trusted neonatal and pediatric growth assistant.\n"
+        "Your role is to provide accurate, developmentally appropriate, and reassuring responses to caregivers' questions.\n\n"
+        "For every query, structure your answer to include:\n"
+        "✅ Normal growth milestones for the baby’s age\n"
+        "🧠 Expected developmental skills (motor, cognitive, communication, etc.)\n"
+        "🧸 Practical exercises, play routines, or daily activities to promote development\n"
+        "💡 Real-world tips or relatable examples to guide caregivers\n"
+        "⚠️ Red flags or situations where pediatric consultation is recommended\n\n"
+        "Maintain a clear, supportive, and empathetic tone.\n"
+        "Use friendly formatting with emojis like ✅, ⚠️, 🧸, 💡 to make the information easy to digest in a baby care mobile app.\n\n"
+        f"User Query: {query}"
+    )
+
+def _gemini_model():
+    gemini_key = os.getenv("GEMINI_API_KEY")
+    if not gemini_key:
+        raise ValueError("Missing GEMINI_API_KEY in .env")
+
+    genai.configure(api_key=gemini_key)
+    return genai.GenerativeModel("gemini-2.0-flash")
 
+def _sources(documents):
+    return [
+        {"source": doc.metadata.get("source", "unknown"), "content": doc.page_content[:200]}
+        for doc in documents
+    ]
+
+def prepare_milestone_chain():
+    """Load (or build) the index and wire the MultiQuery RetrievalQA chain"""
     embedding_model = get_embedding_model()
 
-    if os.path.exists(f"{FAISS_DIR}/index.faiss"):
-        vector_store = FAISS.load_local(FAISS_DIR, embeddings=embedding_model, allow_dangerous_deserialization=True)
-    else:
-        documents = load_pdf(PDF_DIR)
-        chunks = create_chunks(documents)
-        vector_store = create_vector_store(chunks, embedding_model)
+    with stage("milestone", "load_index"):
+        if os.path.exists(f"{FAISS_DIR}/index.faiss"):
+            vector_store = FAISS.load_local(FAISS_DIR, embeddings=embedding_model, allow_dangerous_deserialization=True)
+        else:
+            documents = load_pdf(PDF_DIR)
+            chunks = create_chunks(documents)
+            vector_store = create_vector_store(chunks, embedding_model)
 
-    instruction = prepare_instruction(query)
     llm = get_llm()
 
     retriever = MultiQueryRetriever.from_llm(
@@ -98,40 +132,30 @@ def run_milestone_pipeline(query):
         llm=llm,
     )
 
-    qa_chain = RetrievalQA.from_chain_type(
+    return RetrievalQA.from_chain_type(
         llm=llm,
         retriever=retriever,
         chain_type="stuff",
         return_source_documents=True
     )
 
-    result = qa_chain.invoke({"query": instruction})
+def run_milestone_pipeline(query):
+    if not query:
+        return {"error": "Empty query."}
+
+    qa_chain = prepare_milestone_chain()
+    instruction = prepare_instruction(query)
+
+    with stage("milestone", "chain"):
+        result = qa_chain.invoke({"query": instruction}, config=trace_config("milestone"))
     answer = result["result"].strip()
 
     if is_poor_answer(answer):
         try:
-            gemini_key = os.getenv("GEMINI_API_KEY")
-            if not gemini_key:
-                raise ValueError("Missing GEMINI_API_KEY in .env")
-
-            genai.configure(api_key=gemini_key)
-
-            gemini_prompt = (
-                "You are a trusted neonatal and pediatric growth assistant.\n"
-                "Your role is to provide accurate, developmentally appropriate, and reassuring responses to caregivers' questions.\n\n"
-                "For every query, structure your answer to include:\n"
-                "✅ Normal growth milestones for the baby’s age\n"
-                "🧠 Expected developmental skills (motor, cognitive, communication, etc.)\n"
-                "🧸 Practical exercises, play routines, or daily activities to promote development\n"
-                "💡 Real-world tips or relatable examples to guide caregivers\n"
-                "⚠️ Red flags or situations where pediatric consultation is recommended\n\n"
-                "Maintain a clear, supportive, and empathetic tone.\n"
-                "Use friendly formatting with emojis like ✅, ⚠️, 🧸, 💡 to make the information easy to digest in a baby care mobile app.\n\n"
-                f"User Query: {query}"
-            )
-
-            model = genai.GenerativeModel("gemini-2.0-flash")
-            gemini_response = model.generate_content(gemini_prompt)
+            model = _gemini_model()
+            with stage("milestone", "gemini_fallback"):
+                gemini_response = model.generate_content(gemini_fallback_prompt(query))
+            record_gemini_usage("milestone", gemini_response)
             answer = gemini_response.text.strip()
             return {"answer": answer, "model": "Gemini"}
         except Exception as e:
@@ -140,8 +164,29 @@ def run_milestone_pipeline(query):
         return {
             "answer": answer,
             "model": "Groq",
-            "sources": [
-                {"source": doc.metadata.get("source", "unknown"), "content": doc.page_content[:200]}
-                for doc in result["source_documents"]
-            ]
+            "sources": _sources(result["source_documents"])
         }
+
+async def stream_milestone_answer(qa_chain, documents, query, result):
+    """
+    Token source for the streaming endpoint; fills `result` with model and sources
+
+    The Groq answer streams first; if it turns out too poor, a Reset is
+    yielded and the Gemini fallback streams in its place.
+    """
+    parts = []
+    async for chunk in astream_stuffed(qa_chain, documents, prepare_instruction(query), "milestone"):
+        parts.append(chunk.content)
+        yield chunk
+
+    if not is_poor_answer("".join(parts).strip()):
+        result.update({"model": "Groq", "sources": _sources(documents)})
+        return
+
+    yield Reset("Groq answer too short, falling back to Gemini")
+    result.update({"model": "Gemini"})
+    with stage("milestone", "gemini_fallback"):
+        gemini_response = await _gemini_model().generate_content_async(gemini_fallback_prompt(query), stream=True)
+        async for chunk in gemini_response:
+            yield chunk.text
+    record_gemini_usage("milestone", gemini_response)
@@ -8,6 +8,8 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from starlette.responses import JSONResponse
 
+from core.sse import sse_response, stream_events
+
 # Init FastAPI
 myth_router = APIRouter()
 
@@ -97,13 +99,8 @@ async def get_myths_by_category(category: str):
     return {"myths": filtered_myths, "category": category, "count": len(filtered_myths)}
 
 
-@myth_router.post("/ask", response_model=MythResponse)
-async def ask_myth(myth_request: MythRequest):
-    user_input = myth_request.user_input.strip()
-
-    if not user_input:
-        raise HTTPException(status_code=400, detail="Empty input")
-
+def _start_turn(user_input: str):
+    """Record the user message; returns its id and the text to send to the chat session"""
     # Add timestamp and unique ID for each message
     message_id = str(uuid.uuid4())
     timestamp = datetime.now().isoformat()
@@ -117,40 +114,83 @@ async def ask_myth(myth_request: MythRequest):
     }
     chat_history_display.append(user_message)
 
-    try:
-        # For first message, include the initial prompt
-        if len(chat_history_display) == 1:
-            full_prompt = f"{initial_prompt}\n\nUser question: {user_input}"
-            response = chat_session.send_message(full_prompt)
-        else:
-            response = chat_session.send_message(user_input)
+    # For first message, include the initial prompt
+    if len(chat_history_display) == 1:
+        return message_id, f"{initial_prompt}\n\nUser question: {user_input}"
+    return message_id, user_input
 
-        reply = response.text.strip()
 
-        # Save bot response
-        bot_message = {
-            "id": str(uuid.uuid4()),
-            "text": reply,
-            "sender": "bot",
-            "timestamp": datetime.now().isoformat()
-        }
-        chat_history_display.append(bot_message)
+def _record_reply(reply: str):
+    # Save bot response
+    bot_message = {
+        "id": str(uuid.uuid4()),
+        "text": reply,
+        "sender": "bot",
+        "timestamp": datetime.now().isoformat()
+    }
+    chat_history_display.append(bot_message)
+
+
+def _record_error():
+    # Log error and return friendly message
+    error_message = {
+        "id": str(uuid.uuid4()),
+        "text": "Sorry, I'm having trouble answering that right now. Please try again later.",
+        "sender": "bot",
+        "timestamp": datetime.now().isoformat(),
+        "is_error": True
+    }
+    chat_history_display.append(error_message)
+
+
+@myth_router.post("/ask", response_model=MythResponse)
+async def ask_myth(myth_request: MythRequest):
+    user_input = myth_request.user_input.strip()
+
+    if not user_input:
+        raise HTTPException(status_code=400, detail="Empty input")
+
+    message_id, prompt = _start_turn(user_input)
+
+    try:
+        response = chat_session.send_message(prompt)
+        reply = response.text.strip()
+        _record_reply(reply)
 
         return MythResponse(reply=reply, message_id=message_id)
 
     except Exception as e:
-        # Log error and return friendly message
-        error_message = {
-            "id": str(uuid.uuid4()),
-            "text": "Sorry, I'm having trouble answering that right now. Please try again later.",
-            "sender": "bot",
-            "timestamp": datetime.now().isoformat(),
-            "is_error": True
-        }
-        chat_history_display.append(error_message)
+        _record_error()
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
 
+@myth_router.post("/ask/stream")
+async def ask_myth_stream(myth_request: MythRequest):
+    """Server-Sent Events variant of /ask: reply tokens as they arrive, message_id in the final event"""
+    user_input = myth_request.user_input.strip()
+
+    if not user_input:
+        raise HTTPException(status_code=400, detail="Empty input")
+
+    message_id, prompt = _start_turn(user_input)
+
+    async def tokens():
+        try:
+            response = await chat_session.send_message_async(prompt, stream=True)
+            async for chunk in response:
+                yield chunk.text
+        except Exception:
+            _record_error()
+            raise
+
+    def done(reply: str):
+        reply = reply.strip()
+        _record_reply(reply)
+        return {"reply": reply, "message_id": message_id}
+
+    return await sse_response(stream_events("f5_ask", tokens(), done))
+
+
 @myth_router.get("/chat-history", response_class=JSONResponse)
 async def get_chat_history():
     """Get the current chat history"""
@@ -1,19 +1,21 @@
 import os
 from dotenv import load_dotenv
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_core.prompts import PromptTemplate
 from langchain.chains import RetrievalQA
 from langchain_community.vectorstores import FAISS
 from langchain_groq import ChatGroq
 
+from core.embeddings import get_embedding_model
+from core.lifecycle import lifecycle
+
 load_dotenv()
 
 # === Step 1: Setup Groq LLM ===
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise ValueError("Missing GROQ_API_KEY in .env")
 
 def load_llm():
+    if not GROQ_API_KEY:
+        raise ValueError("Missing GROQ_API_KEY in .env")
     return ChatGroq(
         model_name="meta-llama/llama-4-scout-17b-16e-instruct",
         api_key=GROQ_API_KEY,
@@ -29,9 +31,6 @@ DB_FAISS_PATH = os.path.join(current_dir, "..", "..", "vectorstore", "meal_gener
 # Normalize the path to handle any path separator issues
 DB_FAISS_PATH = os.path.normpath(DB_FAISS_PATH)
 
-embedding_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-db = FAISS.load_local(DB_FAISS_PATH, embedding_model, allow_dangerous_deserialization=True)
-
 # === Step 3: LangChain Prompt Template (Context + Question only) ===
 CUSTOM_PROMPT_TEMPLATE = """
 You are a trusted nutrition advisor specializing in infant and child nutrition. Your goal is to provide accurate, safe, and guideline-compliant dietary recommendations for infants and toddlers, based strictly on official sources such as WHO, ICMR, and FSSAI guidelines.
@@ -59,14 +58,19 @@ custom_prompt = PromptTemplate(
     input_variables=["context", "question"]
 )
 
-# === Step 4: Setup QA Chain ===
-qa_chain = RetrievalQA.from_chain_type(
-    llm=load_llm(),
-    chain_type="stuff",
-    retriever=db.as_retriever(search_kwargs={'k': 3}),
-    return_source_documents=True,
-    chain_type_kwargs={"prompt": custom_prompt, "document_variable_name": "context"}
-)
+# === Step 4: Setup QA Chain (loaded lazily through the lifecycle manager) ===
+def _load_meal_plan_qa():
+    db = FAISS.load_local(DB_FAISS_PATH, lifecycle.get("embeddings"), allow_dangerous_deserialization=True)
+    return RetrievalQA.from_chain_type(
+        llm=load_llm(),
+        chain_type="stuff",
+        retriever=db.as_retriever(search_kwargs={'k': 3}),
+        return_source_documents=True,
+        chain_type_kwargs={"prompt": custom_prompt, "document_variable_name": "context"}
+    )
+
+lifecycle.register("embeddings", get_embedding_model)
+lifecycle.register("meal_plan_qa", _load_meal_plan_qa)
 
 # === Step 5: Structured Input for Meal Plan Request ===
 user_input = {
@@ -1,9 +1,13 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 # LangChain setup
-from .connect_memory_with_llm import qa_chain, structured_query_template
+from core.lifecycle import lifecycle
+from core.concurrency import get_limiter, limit_concurrency
+from core.sse import astream_stuffed, source_list, sse_response, stream_events
+from core.tracing import stage, trace_config
+from .connect_memory_with_llm import structured_query_template
 
 meal_router = APIRouter()
 
@@ -22,15 +26,35 @@ class NutritionRequest(BaseModel):
 async def home():
     return {"message": "Meal Gen API is running"}
 
-@meal_router.post("/generate")
+@meal_router.post("/generate", dependencies=[Depends(limit_concurrency("f3_generate"))])
 async def generate_meal_plan(payload: NutritionRequest):
     try:
+        qa_chain = await lifecycle.aget("meal_plan_qa")
         prompt = structured_query_template.format(**payload.dict())
-        result = qa_chain.invoke({"query": prompt})
+        with stage("f3_generate", "chain"):
+            result = await qa_chain.ainvoke({"query": prompt}, config=trace_config("f3_generate"))
         sources = [
             {"source": doc.metadata.get("source", "Unknown")}
             for doc in result.get("source_documents", [])
         ]
         return JSONResponse(content={"result": result["result"], "sources": sources})
     except Exception as e:
-        return JSONResponse(content={"error": str(e)}, status_code=500)
\ No newline at end of file
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+
+@meal_router.post("/generate/stream")
+async def generate_meal_plan_stream(payload: NutritionRequest):
+    """Server-Sent Events variant of /generate: plan tokens as they arrive, sources in the final event"""
+    try:
+        qa_chain = await lifecycle.aget("meal_plan_qa")
+        prompt = structured_query_template.format(**payload.dict())
+        with stage("f3_generate", "retrieve"):
+            documents = await qa_chain.retriever.ainvoke(prompt, config=trace_config("f3_generate"))
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+    tokens = astream_stuffed(qa_chain, documents, prompt, "f3_generate")
+    return await sse_response(
+        stream_events("f3_generate", tokens, lambda _: {"sources": source_list(documents)}),
+        get_limiter("f3_generate")
+    )
@@ -1,10 +1,19 @@
-from fastapi import APIRouter
+import os
+
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from .grok import qa_chain, structured_query_template
+from core.lifecycle import lifecycle
+from core.concurrency import get_limiter, limit_concurrency
+from core.sse import astream_stuffed, source_list, sse_response, stream_events
+from core.tracing import stage, trace_config
+from .grok import aselftest, structured_query_template
 
 meal_router = APIRouter()
 
+# /selftest makes a paid LLM call, so it is off unless explicitly enabled
+SELFTEST_ENABLED = os.getenv("F6_SELFTEST_ENABLED", "false").lower() in ("1", "true", "yes")
+
 class Userconstraint(BaseModel):
     pregnancy_month : str
     allergies : str
@@ -18,11 +27,13 @@ async def home():
     return {"message": "Meal Gen API is running"}
 
 
-@meal_router.post("/generate")
+@meal_router.post("/generate", dependencies=[Depends(limit_concurrency("f6_generate"))])
 async def generate_meal_plan(payload: Userconstraint):
      try:
+        qa_chain = await lifecycle.aget("meal_woman_qa")
         prompt = structured_query_template.format(**payload.dict())
-        result = qa_chain.invoke({"query": prompt})
+        with stage("f6_generate", "chain"):
+            result = await qa_chain.ainvoke({"query": prompt}, config=trace_config("f6_generate"))
         sources = [
             {"source": doc.metadata.get("source", "Unknown")}
             for doc in result.get("source_documents", [])
@@ -32,3 +43,30 @@ async def generate_meal_plan(payload: Userconstraint):
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
 
+@meal_router.post("/generate/stream")
+async def generate_meal_plan_stream(payload: Userconstraint):
+    """Server-Sent Events variant of /generate: plan tokens as they arrive, sources in the final event"""
+    try:
+        qa_chain = await lifecycle.aget("meal_woman_qa")
+        prompt = structured_query_template.format(**payload.dict())
+        with stage("f6_generate", "retrieve"):
+            documents = await qa_chain.retriever.ainvoke(prompt, config=trace_config("f6_generate"))
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+    tokens = astream_stuffed(qa_chain, documents, prompt, "f6_generate")
+    return await sse_response(
+        stream_events("f6_generate", tokens, lambda _: {"sources": source_list(documents)}),
+        get_limiter("f6_generate")
+    )
+
+
+@meal_router.get("/selftest", dependencies=[Depends(limit_concurrency("f6_generate"))])
+async def selftest():
+    """Run the sample meal plan request end to end (enable with F6_SELFTEST_ENABLED)"""
+    if not SELFTEST_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    try:
+        return JSONResponse(content=await aselftest())
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
@@ -1,6 +1,7 @@
 import os
+import time
 from dotenv import load_dotenv
-from groq import Groq  # Groq SDK
+from groq import Groq, AsyncGroq  # Groq SDK
 from langchain_core.prompts import PromptTemplate
 from langchain.chains import RetrievalQA
 from langchain_community.vectorstores import FAISS
@@ -8,8 +9,10 @@ from langchain.schema import AIMessage, HumanMessage
 from langchain.llms.base import LLM
 # from langchain_core.language_models.chat_models import BaseChatModel
 from langchain.llms.base import LLM
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.outputs import GenerationChunk
 from pydantic import PrivateAttr
-from typing import List, Optional
+from typing import AsyncIterator, Iterator, List, Optional
 from .prompts import custom_prompt
 
 # === Load env (optional) ===
@@ -17,8 +20,9 @@ load_dotenv()
 
 
 # === Load FAISS Vector Store ===
-from langchain_huggingface import HuggingFaceEmbeddings
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+from core.embeddings import get_embedding_model
+from core.lifecycle import lifecycle
+from core.tracing import TokenUsageCallback, record_tokens, trace_config
 
 # Get the current file's directory
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -28,8 +32,6 @@ DB_FAISS_PATH = os.path.join(current_dir, "..", "..", "vectorstore", "dietplanne
 # Normalize the path to handle any path separator issues
 DB_FAISS_PATH = os.path.normpath(DB_FAISS_PATH)
 
-db = FAISS.load_local(DB_FAISS_PATH, embedding_model, allow_dangerous_deserialization=True)
-
 
 # === Wrap Groq Chat API into LangChain-compatible class ===
 
@@ -37,24 +39,84 @@ db = FAISS.load_local(DB_FAISS_PATH, embedding_model, allow_dangerous_deserializ
 class GroqLLM(LLM):
     model: str = "meta-llama/llama-4-scout-17b-16e-instruct"
     temperature: float = 0.4
+    # Token usage is reported under the pipeline of the call's trace_config, else this one
+    pipeline: str = "f6_generate"
     _client: Groq = PrivateAttr()  # This is how we define a private client field
+    _async_client: AsyncGroq = PrivateAttr()
 
-    def __init__(self, api_key: str, model_name: Optional[str] = None, temperature: float = 0.5):
+    def __init__(self, api_key: str, model_name: Optional[str] = None, temperature: float = 0.5,
+                 pipeline: Optional[str] = None):
         super().__init__()
         self._client = Groq(api_key=api_key)  #  Note the underscore: _client
+        self._async_client = AsyncGroq(api_key=api_key)
         self.model = model_name or self.model
         self.temperature = temperature
+        self.pipeline = pipeline or self.pipeline
 
-    def _call(self, prompt: str, stop: Optional[List[str]] = None) -> str:
-        completion = self._client.chat.completions.create(  #  Use _client here
+    def _request(self, prompt: str, **extra) -> dict:
+        return dict(
             model=self.model,
             messages=[{"role": "user", "content": prompt}],
             temperature=self.temperature,
             max_tokens=5000,
             top_p=1,
+            **extra,
         )
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None,
+              run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs) -> str:
+        completion = self._client.chat.completions.create(**self._request(prompt))  #  Use _client here
+        self._record_usage(run_manager, completion.usage)
+        return completion.choices[0].message.content
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None,
+                     run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs) -> str:
+        # Native async call so ainvoke does not park a thread for the whole round trip
+        completion = await self._async_client.chat.completions.create(**self._request(prompt))
+        self._record_usage(run_manager, completion.usage)
         return completion.choices[0].message.content
 
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs) -> Iterator[GenerationChunk]:
+        for chunk in self._client.chat.completions.create(**self._request(prompt, stream=True)):
+            generation = self._stream_chunk(chunk, run_manager)
+            if generation is not None:
+                if run_manager:
+                    run_manager.on_llm_new_token(generation.text, chunk=generation)
+                yield generation
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs) -> AsyncIterator[GenerationChunk]:
+        stream = await self._async_client.chat.completions.create(**self._request(prompt, stream=True))
+        async for chunk in stream:
+            generation = self._stream_chunk(chunk, run_manager)
+            if generation is not None:
+                if run_manager:
+                    await run_manager.on_llm_new_token(generation.text, chunk=generation)
+                yield generation
+
+    def _stream_chunk(self, chunk, run_manager=None) -> Optional[GenerationChunk]:
+        # Groq reports usage on the last chunk under x_groq
+        usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+        if usage is not None:
+            self._record_usage(run_manager, usage)
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            return None
+        return GenerationChunk(text=chunk.choices[0].delta.content)
+
+    def _pipeline(self, run_manager) -> str:
+        handlers = run_manager.handlers if run_manager is not None else []
+        return next((h.pipeline for h in handlers if isinstance(h, TokenUsageCallback)), self.pipeline)
+
+    def _record_usage(self, run_manager, usage):
+        # The raw SDK response is not an LLMResult, so report token usage directly
+        if usage is not None:
+            record_tokens(self._pipeline(run_manager), {
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+            })
+
     @property
     def _llm_type(self) -> str:
         return "groq-llm"
@@ -62,31 +124,63 @@ class GroqLLM(LLM):
     class Config:
         arbitrary_types_allowed = True
 
-# === Instantiate Groq Model ===
-llm = GroqLLM(api_key=os.getenv("GROQ_API_KEY"))
+# === QA Chain (loaded lazily through the lifecycle manager) ===
+def _load_meal_woman_qa():
+    db = FAISS.load_local(DB_FAISS_PATH, lifecycle.get("embeddings"), allow_dangerous_deserialization=True)
+    llm = GroqLLM(api_key=os.getenv("GROQ_API_KEY"))
+    return RetrievalQA.from_chain_type(
+        llm=llm,
+        chain_type="stuff",
+        retriever=db.as_retriever(search_kwargs={'k': 5}),
+        return_source_documents=True,
+        chain_type_kwargs={"prompt": custom_prompt, "document_variable_name": "context"}
+    )
 
-# === QA Chain ===
-qa_chain = RetrievalQA.from_chain_type(
-    llm=llm,
-    chain_type="stuff",
-    retriever=db.as_retriever(search_kwargs={'k': 5}),
-    return_source_documents=True,
-    chain_type_kwargs={"prompt": custom_prompt, "document_variable_name": "context"}
-)
+lifecycle.register("embeddings", get_embedding_model)
+lifecycle.register("meal_woman_qa", _load_meal_woman_qa)
 
 
 from .prompts import structured_query_template
 from .prompts import user_input
-query = structured_query_template.format(**user_input)
-
-# === Final Call ===
-try:
-    response = qa_chain.invoke({ "query": query })
-    print("\n📘 FINAL RESPONSE:\n", response["result"])
-    print("\n🔗 SOURCES:\n", [doc.metadata for doc in response["source_documents"]])
-except Exception as e:
-    print(f"❌ Error during query processing: {str(e)}")
 
 
-    # function in place of final call, 
-    # function to tak
\ No newline at end of file
+# === Self-test (the sample request from prompts.user_input) ===
+# Makes a real, paid Groq call, so it only runs on demand: `python -m
+# routes.meal_woman.grok` or /api/f6/selftest, never at import.
+def _selftest_report(response, started: float) -> dict:
+    return {
+        "result": response["result"],
+        "sources": [doc.metadata for doc in response["source_documents"]],
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def selftest(qa_chain=None) -> dict:
+    qa_chain = qa_chain or lifecycle.get("meal_woman_qa")
+    started = time.perf_counter()
+    response = qa_chain.invoke(
+        {"query": structured_query_template.format(**user_input)},
+        config=trace_config("f6_selftest")
+    )
+    return _selftest_report(response, started)
+
+
+async def aselftest(qa_chain=None) -> dict:
+    qa_chain = qa_chain or await lifecycle.aget("meal_woman_qa")
+    started = time.perf_counter()
+    response = await qa_chain.ainvoke(
+        {"query": structured_query_template.format(**user_input)},
+        config=trace_config("f6_selftest")
+    )
+    return _selftest_report(response, started)
+
+
+if __name__ == "__main__":
+    try:
+        report = selftest()
+        print("\n📘 FINAL RESPONSE:\n", report["result"])
+        print("\n🔗 SOURCES:\n", report["sources"])
+        print(f"\n⏱️ {report['seconds']}s")
+    except Exception as e:
+        print(f"❌ Error during query processing: {str(e)}")
+        raise SystemExit(1)
@@ -1,55 +1,67 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 import os
-import re
+import asyncio
 import spacy
-from langchain_community.embeddings import HuggingFaceEmbeddings
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from langchain_community.vectorstores import FAISS
 from langchain_core.prompts import PromptTemplate
 from langchain.chains import RetrievalQA
 from langchain_groq import ChatGroq
-from fuzzywuzzy import fuzz
-from sklearn.metrics.pairwise import cosine_similarity
 from dotenv import load_dotenv
 
+from core.embeddings import get_embedding_model
+from core.lifecycle import lifecycle, ComponentUnavailable
+from core.retrieval import search_with_cosine
+from core.concurrency import get_limiter, limit_concurrency, limiter_status
+from core.semantic_cache import SemanticCache
+from core.batching import MicroBatcher
+from core.term_matcher import TermMatcher
+from core.intents import IntentRouter
+from core.sse import astream_stuffed, single_event_stream, sse_response, stream_events
+from core.tracing import stage, trace_config
+
 # Load environment variables
 load_dotenv()
 
-# Option 1: Using transformers for medical NER (Backup)
-try:
-    from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
+router = APIRouter()
+
+# Configuration
+DB_FAISS_PATH = os.path.join(os.path.dirname(__file__), "..", "vectorstore", "medical_db_faiss")
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
-    medical_ner = pipeline(
+# Dedicated pool for the CPU-bound NER models so they run next to the LLM call
+NER_WORKERS = int(os.getenv("NER_WORKERS", "2"))
+ner_executor = ThreadPoolExecutor(max_workers=NER_WORKERS, thread_name_prefix="ner")
+
+# Semantic answer cache: near-identical questions reuse a stored QueryResponse
+ANSWER_CACHE_ENABLED = os.getenv("F1_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+answer_cache = SemanticCache(
+    threshold=float(os.getenv("F1_CACHE_THRESHOLD", "0.95")),
+    ttl_seconds=float(os.getenv("F1_CACHE_TTL", "3600")),
+    max_entries=int(os.getenv("F1_CACHE_MAX_ENTRIES", "2048")),
+    max_bytes=int(float(os.getenv("F1_CACHE_MAX_MB", "64")) * 1024 * 1024),
+)
+
+
+# Heavy NLP models are registered here and loaded on first use or during warmup
+def _load_transformers_ner():
+    """Option 1: Using transformers for medical NER (Backup)"""
+    from transformers import pipeline
+
+    return pipeline(
         "ner",
         model="d4data/biomedical-ner-all",
         tokenizer="d4data/biomedical-ner-all",
         aggregation_strategy="simple"
     )
-    USE_TRANSFORMERS_NER = True
-except Exception as e:
-    print(f"Could not load transformers NER model: {e}")
-    USE_TRANSFORMERS_NER = False
 
-router = APIRouter()
 
-# Configuration
-DB_FAISS_PATH = os.path.join(os.path.dirname(__file__), "..", "vectorstore", "medical_db_faiss")
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-
-# Load NLP models
-try:
-    nlp = spacy.load("en_core_sci_sm")
-    USE_SCISPACY = True
-except Exception as e:
-    print(f"Could not load en_core_sci_sm: {e}")
-    USE_SCISPACY = False
-
-try:
-    nlp_general = spacy.load("en_core_web_sm")
-    USE_GENERAL_NLP = True
-except Exception as e:
-    print(f"Could not load en_core_web_sm: {e}")
-    USE_GENERAL_NLP = False
+lifecycle.register("embeddings", get_embedding_model)
+lifecycle.register("medical_ner", _load_transformers_ner)
+lifecycle.register("scispacy", lambda: spacy.load("en_core_sci_sm"))
+lifecycle.register("spacy_general", lambda: spacy.load("en_core_web_sm"))
 
 # Medical terms regex patterns (fallback)
 MEDICAL_PATTERNS = [
@@ -75,6 +87,18 @@ COMMON_MEDICAL_TERMS = {
 }
 
 
+# Vocabulary file extends COMMON_MEDICAL_TERMS; both are compiled into one matcher
+MEDICAL_TERMS_PATH = os.getenv(
+    "MEDICAL_TERMS_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "data", "medical_terms.txt")
+)
+term_matcher = TermMatcher.from_file(
+    MEDICAL_TERMS_PATH,
+    extra_terms=[term for terms in COMMON_MEDICAL_TERMS.values() for term in terms],
+    patterns=MEDICAL_PATTERNS
+)
+
+
 # Define request/response models
 class QueryRequest(BaseModel):
     query: str
@@ -114,78 +138,73 @@ def set_custom_prompt():
 
 
 # Medical term extraction functions
-def extract_medical_terms_spacy(text):
-    """Extract medical terms using spaCy models"""
-    medical_terms = []
+def extract_medical_terms_spacy_batch(texts):
+    """Extract medical terms for several texts with one nlp.pipe pass per model"""
+    results = [[] for _ in texts]
 
     # Try scientific spaCy model first
-    if USE_SCISPACY:
+    nlp = lifecycle.try_get("scispacy")
+    if nlp is not None:
         try:
-            doc = nlp(text)
-            medical_terms.extend([ent.text for ent in doc.ents])
+            for i, doc in enumerate(nlp.pipe(texts)):
+                results[i].extend([ent.text for ent in doc.ents])
         except Exception as e:
             print(f"Error with sci spaCy: {e}")
 
-    # Fallback to general spaCy model
-    if USE_GENERAL_NLP and not medical_terms:
+    # Fallback to general spaCy model for texts that got nothing
+    pending = [i for i, terms in enumerate(results) if not terms]
+    nlp_general = lifecycle.try_get("spacy_general") if pending else None
+    if nlp_general is not None:
         try:
-            doc = nlp_general(text)
-            medical_terms.extend([ent.text for ent in doc.ents])
+            for i, doc in zip(pending, nlp_general.pipe([texts[i] for i in pending])):
+                results[i].extend([ent.text for ent in doc.ents])
         except Exception as e:
             print(f"Error with general spaCy: {e}")
 
-    return list(set(medical_terms))
+    return [list(set(terms)) for terms in results]
 
 
-def extract_medical_terms_transformers(text):
-    """Extract medical terms using transformers NER model"""
-    if not USE_TRANSFORMERS_NER:
-        return []
+def extract_medical_terms_spacy(text):
+    """Extract medical terms using spaCy models"""
+    return extract_medical_terms_spacy_batch([text])[0]
+
+
+def extract_medical_terms_transformers_batch(texts):
+    """Extract medical terms for several texts in one transformers pipeline call"""
+    medical_ner = lifecycle.try_get("medical_ner")
+    if medical_ner is None:
+        return [[] for _ in texts]
 
     try:
-        entities = medical_ner(text)
-        medical_terms = []
-        for entity in entities:
+        batch_entities = medical_ner(list(texts), batch_size=len(texts))
+        results = []
+        for entities in batch_entities:
             # Filter for medical entities with high confidence
-            if entity['score'] > 0.5:
-                medical_terms.append(entity['word'])
-        return list(set(medical_terms))  # Remove duplicates
+            medical_terms = [entity['word'] for entity in entities if entity['score'] > 0.5]
+            results.append(list(set(medical_terms)))  # Remove duplicates
+        return results
     except Exception as e:
         print(f"Error in transformers NER: {e}")
-        return []
+        return [[] for _ in texts]
 
 
-def extract_medical_terms_regex(text):
-    """Extract medical terms using regex patterns and keyword matching"""
-    medical_terms = []
-    text_lower = text.lower()
+def extract_medical_terms_transformers(text):
+    """Extract medical terms using transformers NER model"""
+    return extract_medical_terms_transformers_batch([text])[0]
 
-    # Check predefined medical terms
-    for category, terms in COMMON_MEDICAL_TERMS.items():
-        for term in terms:
-            if term.lower() in text_lower:
-                medical_terms.append(term)
 
-    # Check regex patterns
-    for pattern in MEDICAL_PATTERNS:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        medical_terms.extend(matches)
+def extract_medical_terms_regex(text):
+    """Extract medical terms using regex patterns and keyword matching"""
+    # One automaton pass for the vocabulary plus one combined regex for the patterns
+    medical_terms = term_matcher.match(text)
 
     # Remove duplicates and return
     return list(set([term for term in medical_terms if len(term) > 2]))
 
 
-def extract_medical_terms(text):
-    """Main function to extract medical terms using all available methods"""
-    medical_terms = []
-
-    # Try spaCy first (most accurate for medical terms)
-    spacy_terms = extract_medical_terms_spacy(text)
-    medical_terms.extend(spacy_terms)
-
-    # Add transformers terms as backup
-    transformer_terms = extract_medical_terms_transformers(text)
-    medical_terms.extend(transformer_terms)
+def _combine_medical_terms(text, spacy_terms, transformer_terms):
+    """Merge model terms, falling back to regex when the models found nothing"""
+    medical_terms = spacy_terms + transformer_terms
 
     # Add regex terms if nothing found
     if not medical_terms:
@@ -196,110 +215,266 @@ def extract_medical_terms(text):
     return list(set([term for term in medical_terms if len(term) > 2]))
 
 
-# Greeting checker
-def is_greeting(text):
-    """Check if text is a greeting"""
-    greetings = [
-        "hi", "hello", "hey", "hii", "hio",
-        "good morning", "good evening", "namaste", "salaam"
-    ]
-    text = text.lower().strip()
+def extract_medical_terms(text):
+    """Main function to extract medical terms using all available methods"""
+    # Try spaCy first (most accurate for medical terms), transformers as backup
+    spacy_terms = extract_medical_terms_spacy(text)
+    transformer_terms = extract_medical_terms_transformers(text)
+    return _combine_medical_terms(text, spacy_terms, transformer_terms)
+
+
+# Concurrent requests are micro-batched into one nlp.pipe / pipeline call per model
+NER_BATCH_SIZE = int(os.getenv("NER_BATCH_SIZE", "16"))
+NER_BATCH_WAIT_MS = float(os.getenv("NER_BATCH_WAIT_MS", "5"))
+spacy_batcher = MicroBatcher(
+    "spacy_ner", extract_medical_terms_spacy_batch,
+    max_batch_size=NER_BATCH_SIZE, max_wait_ms=NER_BATCH_WAIT_MS, executor=ner_executor
+)
+transformers_batcher = MicroBatcher(
+    "transformers_ner", extract_medical_terms_transformers_batch,
+    max_batch_size=NER_BATCH_SIZE, max_wait_ms=NER_BATCH_WAIT_MS, executor=ner_executor
+)
+
+
+async def extract_medical_terms_async(text):
+    """Run the spaCy and transformers extractors concurrently through their batchers"""
+    with stage("f1_query", "ner"):
+        # Load (or wait for) the models here, off the event loop, so the batch
+        # functions' try_get in ner_executor finds them ready or failed
+        scispacy, _ = await asyncio.gather(lifecycle.atry_get("scispacy"), lifecycle.atry_get("medical_ner"))
+        if scispacy is None:
+            await lifecycle.atry_get("spacy_general")
+        spacy_terms, transformer_terms = await asyncio.gather(
+            spacy_batcher.submit(text),
+            transformers_batcher.submit(text),
+        )
+        return _combine_medical_terms(text, spacy_terms, transformer_terms)
 
-    # Exact match or very close match
-    for greet in greetings:
-        if text == greet:
-            return True
-        if fuzz.ratio(text, greet) >= 90:
-            return True
 
-    return False
+# Chit-chat pre-router: canned intents are answered without retrieval or LLM calls
+INTENTS_PATH = os.getenv("INTENTS_PATH", os.path.join(os.path.dirname(__file__), "..", "data", "intents.json"))
+DEFAULT_INTENTS = {
+    "greeting": {
+        "phrases": ["hi", "hello", "hey", "hii", "hio", "good morning", "good evening", "namaste", "salaam"],
+        "response": "Hi there! I'm your medical assistant. Ask me anything about your health, symptoms, or treatment."
+    }
+}
+intent_router = IntentRouter.from_file(INTENTS_PATH, default=DEFAULT_INTENTS)
 
 
-# Initialize vector store and QA chain
-try:
-    embedding_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-    db = FAISS.load_local(DB_FAISS_PATH, embedding_model, allow_dangerous_deserialization=True)
+# Vector store and QA chain
+def _load_medical_qa():
+    """Load the medical FAISS index and build the QA chain"""
+    db = FAISS.load_local(DB_FAISS_PATH, lifecycle.get("embeddings"), allow_dangerous_deserialization=True)
 
-    qa_chain = RetrievalQA.from_chain_type(
+    return RetrievalQA.from_chain_type(
         llm=load_llm(),
         chain_type="stuff",
         retriever=db.as_retriever(search_kwargs={'k': 3}),
         return_source_documents=True,
         chain_type_kwargs={'prompt': set_custom_prompt()},
     )
-    QA_CHAIN_INITIALIZED = True
-except Exception as e:
-    print(f"Error initializing QA chain: {e}")
-    QA_CHAIN_INITIALIZED = False
+
+
+lifecycle.register("medical_qa", _load_medical_qa)
+
+NO_CONTEXT_ANSWER = "Sorry, I couldn't find any relevant information."
+
+
+def _sources(source_documents, similarities):
+    return [
+        {
+            "content": doc.page_content[:300] + ("..." if len(doc.page_content) > 300 else ""),
+            "page": doc.metadata.get("page", "?"),
+            "similarity": similarities[i] if i < len(similarities) else 0.0
+        }
+        for i, doc in enumerate(source_documents)
+    ]
+
+
+def _replay(response: QueryResponse):
+    """SSE events for an answer that is already complete"""
+    return stream_events(
+        "f1_query",
+        single_event_stream(response.result),
+        lambda _: response.model_dump(exclude={"result"})
+    )
 
 
 # Routes
-@router.post("/query", response_model=QueryResponse)
+@router.post("/query", response_model=QueryResponse, dependencies=[Depends(limit_concurrency("f1_query"))])
 async def process_query(request: QueryRequest):
     """Process medical query and return answer with extracted medical terms"""
-    if not QA_CHAIN_INITIALIZED:
-        raise HTTPException(status_code=500, detail="QA chain not initialized")
-
     query_text = request.query.strip()
 
-    # Handle greetings
-    if is_greeting(query_text):
+    # Handle greetings, thanks and other chit-chat
+    with stage("f1_query", "intent"):
+        intent = intent_router.match(query_text)
+    if intent is not None:
         return QueryResponse(
-            result="Hi there! I'm your medical assistant. Ask me anything about your health, symptoms, or treatment.",
+            result=intent.response,
             medical_terms=[],
             context_valid=False,
             sources=[]
         )
 
     try:
-        # Process query
-        response = qa_chain.invoke({'query': query_text})
+        qa_chain = await lifecycle.aget("medical_qa")
+        embedding_model = await lifecycle.aget("embeddings")
+    except ComponentUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"QA chain not initialized: {e}")
 
-        # Extract medical terms
-        medical_terms = extract_medical_terms(query_text)
+    # NER does not depend on retrieval or the LLM, so start it right away
+    ner_task = asyncio.create_task(extract_medical_terms_async(query_text))
+
+    try:
+        # Embed once and retrieve with scores from the stored index vectors
+        with stage("f1_query", "embed"):
+            query_embedding = await asyncio.to_thread(embedding_model.embed_query, query_text)
+
+        if ANSWER_CACHE_ENABLED:
+            with stage("f1_query", "cache_lookup"):
+                cached = answer_cache.lookup(query_embedding)
+            if cached is not None:
+                ner_task.cancel()
+                return cached
+
+        with stage("f1_query", "retrieve"):
+            retriever = qa_chain.retriever
+            scored_docs = search_with_cosine(retriever.vectorstore, query_embedding, k=retriever.search_kwargs.get("k", 3))
+            source_documents = [doc for doc, _ in scored_docs]
+            similarities = [score for _, score in scored_docs]
+
+        # Answer from the retrieved documents without a second retrieval, overlapped with NER.
+        # "generate" covers prompt assembly plus the LLM round trip reported as "llm".
+        with stage("f1_query", "generate"):
+            chain_output, medical_terms = await asyncio.gather(
+                qa_chain.combine_documents_chain.ainvoke(
+                    {"input_documents": source_documents, "question": query_text},
+                    config=trace_config("f1_query")
+                ),
+                ner_task,
+            )
+        answer = chain_output["output_text"]
 
         # Context similarity check using cosine similarity
-        query_embedding = embedding_model.embed_query(query_text)
-        similarities = [
-            cosine_similarity([query_embedding], [embedding_model.embed_query(doc.page_content)])[0][0]
-            for doc in response["source_documents"]
-        ]
-        context_valid = any(sim > 0.50 for sim in similarities)
+        context_valid = bool(np.any(np.asarray(similarities) > 0.50))
 
         # Additional validation: check if medical terms are in context
         if not context_valid and medical_terms:
-            joined_context = " ".join([doc.page_content.lower() for doc in response['source_documents']])
+            joined_context = " ".join([doc.page_content.lower() for doc in source_documents])
             context_valid = any(term.lower() in joined_context for term in medical_terms)
 
         # Prepare sources
-        sources = [
-            {
-                "content": doc.page_content[:300] + ("..." if len(doc.page_content) > 300 else ""),
-                "page": doc.metadata.get("page", "?"),
-                "similarity": similarities[i] if i < len(similarities) else 0.0
-            }
-            for i, doc in enumerate(response["source_documents"])
-        ] if context_valid else []
+        sources = _sources(source_documents, similarities) if context_valid else []
 
-        return QueryResponse(
-            result=response['result'] if context_valid else "Sorry, I couldn't find any relevant information.",
+        query_response = QueryResponse(
+            result=answer if context_valid else NO_CONTEXT_ANSWER,
             medical_terms=medical_terms,
             context_valid=context_valid,
             sources=sources
         )
 
+        # Only grounded answers are cached, so a later index update can still fill misses
+        if ANSWER_CACHE_ENABLED and context_valid:
+            answer_cache.store(query_embedding, query_response, size_bytes=len(query_response.model_dump_json()))
+
+        return query_response
+
+    except Exception as e:
+        ner_task.cancel()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/query/stream")
+async def process_query_stream(request: QueryRequest):
+    """
+    Server-Sent Events variant of /query
+
+    Answer tokens stream as "token" events; the remaining QueryResponse fields
+    (medical_terms, context_valid, sources) arrive in the final "done" event.
+    Ungrounded questions are answered without calling the LLM at all.
+    """
+    query_text = request.query.strip()
+
+    with stage("f1_query", "intent"):
+        intent = intent_router.match(query_text)
+    if intent is not None:
+        return await sse_response(_replay(QueryResponse(
+            result=intent.response,
+            medical_terms=[],
+            context_valid=False,
+            sources=[]
+        )))
+
+    try:
+        qa_chain = await lifecycle.aget("medical_qa")
+        embedding_model = await lifecycle.aget("embeddings")
+    except ComponentUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"QA chain not initialized: {e}")
+
+    ner_task = asyncio.create_task(extract_medical_terms_async(query_text))
+
+    try:
+        with stage("f1_query", "embed"):
+            query_embedding = await asyncio.to_thread(embedding_model.embed_query, query_text)
+
+        if ANSWER_CACHE_ENABLED:
+            with stage("f1_query", "cache_lookup"):
+                cached = answer_cache.lookup(query_embedding)
+            if cached is not None:
+                ner_task.cancel()
+                return await sse_response(_replay(cached))
+
+        with stage("f1_query", "retrieve"):
+            retriever = qa_chain.retriever
+            scored_docs = search_with_cosine(retriever.vectorstore, query_embedding, k=retriever.search_kwargs.get("k", 3))
+            source_documents = [doc for doc, _ in scored_docs]
+            similarities = [score for _, score in scored_docs]
+
+        # Grounding has to be known before the first token is sent; the medical
+        # term check only waits for NER when the similarity check fails
+        context_valid = bool(np.any(np.asarray(similarities) > 0.50))
+        if not context_valid:
+            medical_terms = await ner_task
+            joined_context = " ".join([doc.page_content.lower() for doc in source_documents])
+            context_valid = any(term.lower() in joined_context for term in medical_terms)
+            if not context_valid:
+                return await sse_response(_replay(QueryResponse(
+                    result=NO_CONTEXT_ANSWER,
+                    medical_terms=medical_terms,
+                    context_valid=False,
+                    sources=[]
+                )))
     except Exception as e:
+        ner_task.cancel()
         raise HTTPException(status_code=500, detail=str(e))
 
+    async def done(answer: str):
+        query_response = QueryResponse(
+            result=answer,
+            medical_terms=await ner_task,
+            context_valid=True,
+            sources=_sources(source_documents, similarities)
+        )
+        if ANSWER_CACHE_ENABLED:
+            answer_cache.store(query_embedding, query_response, size_bytes=len(query_response.model_dump_json()))
+        return query_response.model_dump(exclude={"result"})
+
+    tokens = astream_stuffed(qa_chain, source_documents, query_text, "f1_query")
+    return await sse_response(stream_events("f1_query", tokens, done), get_limiter("f1_query"))
+
 
 @router.post("/extract-terms")
 async def test_medical_extraction(request: QueryRequest):
     """Test endpoint to see what medical terms are extracted from text"""
     try:
-        spacy_terms = extract_medical_terms_spacy(request.query)
-        transformer_terms = extract_medical_terms_transformers(request.query)
+        spacy_terms, transformer_terms = await asyncio.gather(
+            spacy_batcher.submit(request.query),
+            transformers_batcher.submit(request.query),
+        )
         regex_terms = extract_medical_terms_regex(request.query)
-        combined_terms = extract_medical_terms(request.query)
+        combined_terms = _combine_medical_terms(request.query, spacy_terms, transformer_terms)
 
         return {
             "query": request.query,
@@ -316,13 +491,19 @@ async def test_medical_extraction(request: QueryRequest):
 async def get_status():
     """Get the status of various components"""
     return {
-        "scispacy_loaded": USE_SCISPACY,
-        "general_nlp_loaded": USE_GENERAL_NLP,
-        "transformers_ner": USE_TRANSFORMERS_NER,
-        "qa_chain_initialized": QA_CHAIN_INITIALIZED,
+        "scispacy_loaded": lifecycle.is_ready("scispacy"),
+        "general_nlp_loaded": lifecycle.is_ready("spacy_general"),
+        "transformers_ner": lifecycle.is_ready("medical_ner"),
+        "qa_chain_initialized": lifecycle.is_ready("medical_qa"),
         "db_path": DB_FAISS_PATH,
         "groq_api_configured": GROQ_API_KEY is not None,
-        "llm_model": "meta-llama/llama-4-scout-17b-16e-instruct"
+        "llm_model": "meta-llama/llama-4-scout-17b-16e-instruct",
+        "concurrency": limiter_status(),
+        "answer_cache": {"enabled": ANSWER_CACHE_ENABLED, **answer_cache.stats()},
+        "ner_batching": {
+            "spacy": spacy_batcher.stats(),
+            "transformers": transformers_batcher.stats()
+        }
     }
 
 
@@ -0,0 +1,121 @@
+"""
+Structured (JSON) output for symptom analysis
+
+The LLM is asked for one JSON object that validates straight into
+SymptomAnalysis, the field set MedicalAnalysisResponse is built on. Output
+that fails validation gets one repair round trip; after that the usable
+fields are salvaged and the rest filled with safe defaults.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+JSON_INSTRUCTIONS = """
+
+Respond with a single JSON object and nothing else, using exactly these keys (one per numbered section above):
+{
+  "symptom_details": {"<symptom name>": {"duration": "...", "severity": "...", "frequency": "...", "pattern": "..."}},
+  "recommended_specialty": "...",
+  "urgency_level": "Emergency | Urgent | Non-urgent but important | Routine check-up",
+  "home_remedies": ["..."],
+  "supportive_care": ["..."],
+  "advice_next_steps": "...",
+  "first_aid": "... (null when the situation is not urgent)",
+  "possible_causes": ["..."],
+  "friendly_summary": "..."
+}
+Use "Not specified" for text with no information and [] for empty lists.
+"""
+
+REPAIR_PROMPT = """The JSON below does not match the required format.
+
+Validation errors:
+{errors}
+
+Return only the corrected JSON object with exactly the keys {keys}. Keep the medical content unchanged.
+
+{output}
+"""
+
+# What the user sees for fields that could not be recovered
+FALLBACK_ANALYSIS: Dict[str, Any] = {
+    "symptom_details": {"description": "Analysis parsing failed"},
+    "recommended_specialty": "General Physician",
+    "urgency_level": "Consult healthcare provider",
+    "home_remedies": ["Consult healthcare provider"],
+    "supportive_care": [],
+    "advice_next_steps": "Please consult a healthcare provider",
+    "first_aid": None,
+    "possible_causes": ["Unable to determine"],
+    "friendly_summary": "Please consult with a healthcare provider for proper assessment."
+}
+
+_json_object = re.compile(r"\{.*\}", re.DOTALL)
+
+
+class SymptomAnalysis(BaseModel):
+    symptom_details: Dict[str, Any] = Field(default_factory=dict)
+    recommended_specialty: str
+    urgency_level: str
+    home_remedies: List[str] = Field(default_factory=list)
+    supportive_care: List[str] = Field(default_factory=list)
+    advice_next_steps: str = ""
+    first_aid: Optional[str] = None
+    possible_causes: List[str] = Field(default_factory=list)
+    friendly_summary: str
+
+    @field_validator("home_remedies", "supportive_care", "possible_causes", mode="before")
+    @classmethod
+    def _as_list(cls, value):
+        # Models sometimes answer a list section with a single sentence
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return [value] if value.strip() else []
+        return value
+
+    @field_validator("first_aid", "advice_next_steps", mode="before")
+    @classmethod
+    def _as_text(cls, value):
+        if isinstance(value, list):
+            return "\n".join(str(item) for item in value)
+        return value
+
+
+ANALYSIS_KEYS = ", ".join(SymptomAnalysis.model_fields)
+
+
+def parse_analysis_json(text: str) -> SymptomAnalysis:
+    """Validate LLM output (optionally wrapped in prose or code fences); raises ValueError"""
+    match = _json_object.search(text or "")
+    if match is None:
+        raise ValueError("No JSON object in the response")
+    return SymptomAnalysis.model_validate_json(match.group(0))
+
+
+def repair_prompt(text: str, error: Exception) -> str:
+    return REPAIR_PROMPT.format(errors=str(error)[:1500], keys=ANALYSIS_KEYS, output=(text or "")[:8000])
+
+
+def salvage_analysis(text: str) -> Dict[str, Any]:
+    """Keep every field that validates on its own; defaults for the rest"""
+    result = dict(FALLBACK_ANALYSIS)
+    match = _json_object.search(text or "")
+    try:
+        data = json.loads(match.group(0)) if match else None
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return result
+
+    for key in SymptomAnalysis.model_fields:
+        if key not in data:
+            continue
+        try:
+            candidate = SymptomAnalysis.model_validate({**result, key: data[key]})
+        except ValueError:
+            continue
+        result[key] = getattr(candidate, key)
+    return result
@@ -0,0 +1,215 @@
+"""
+Population profiles served by the shared symptom analyzer engine
+
+A profile bundles everything that differs between populations: the analysis
+prompt, the vector store the RAG chain retrieves from, the Whisper size used
+when the client does not ask for one and LLM limits. Models, stores and the
+transcription pool are shared across profiles by SymptomEngine.
+"""
+from typing import Callable, Dict, Optional
+
+MEDICAL_QA_TEMPLATE = """
+You are a medical AI assistant. Use the context below to answer medical questions accurately.
+Only answer based on the context provided. If you don't know the answer based on the context, say so.
+Always recommend consulting healthcare professionals for medical advice.
+
+Context: {context}
+
+Question: {question}
+
+Answer:
+"""
+
+
+def newborn_analysis_prompt(transcript: str, age_group: str) -> str:
+    """Create structured prompt for newborn symptom analysis"""
+    return f"""
+You are a intelligent clinical assistant assessing baby (newborn) based on a caregiver's spoken description. Analyze the transcription carefully and provide a detailed, structured response. This age group is highly vulnerable — treat any concerning symptom with the highest caution. Analyze the transcript and extract the following details clearly and precisely.
+
+\"\"\"{transcript}\"\"\"
+
+Your task is to extract and report the following information in a structured format:
+
+1. 🤒 Symptom Details:
+    - For each symptom, list:
+        - Symptom name (e.g., cough)
+        - Include: duration, severity, frequency, and patterns (e.g., "not feeding for 12 hours", "one-time vomiting", "sleepy for 1 day").
+        - Estimate approximate duration if temporal clues like "started today" or "since yesterday" appear.
+2. 🩺 *Recommended Medical Specialty*: Suggest the most appropriate type of specialist (e.g., cardiologist, ENT, general physician).
+3. 🚨 *Urgency Level*:
+    - Categorize the urgency of the condition:
+        - Emergency (needs help now)
+        - Urgent (within 24–48 hours)
+        - Non-urgent but important
+        - Routine check-up
+        - ⚠ If the baby shows danger signs (lethargy, poor feeding, low urine output, cold to touch, abnormal breathing), label this as *Emergency*, not anything else.
+4.  🏠 *Recommended Home Remedies*:
+        Suggest simple, safe, and evidence-informed home care measures (e.g., hydration, warm compress, turmeric milk, saltwater gargle).
+        Highlight safety notes (e.g., "Avoid if allergic to…" or "Do not exceed recommended use").
+        Mention what to *avoid* doing or consuming during recovery (e.g., caffeine, alcohol, heavy meals, painkillers without advice). 
+5. 💊 *Evidence-Based Supportive Care (If Appropriate)*:
+    - Include treatments recommended by WHO/IMCI or pediatric manuals, such as:
+        - "Treat the child to prevent low blood sugar" (offer breastfeeding, sugar water)
+        - "Give paracetamol for high fever or pain"
+        - "Apply tetracycline eye ointment if there is eye discharge"
+        - "Give an oral antimalarial if malaria is suspected"
+        - "Always note: **"Only if applicable and under medical supervision."
+        - "Mention possible care actions known from neonatal protocols (e.g., Kangaroo care, hydration, warmth).
+        - " Do *not* recommend medications unless standard for neonates."**        
+6. 💡 *Advice & Next Steps*: 
+            - Give a clear, confident recommendation for what to do now.
+            - If urgent, emphasize immediate travel to a clinic or hospital.
+7. 🚑 *First-Aid Recommendations* (if urgent): Mention emergency steps to take (e.g., warming the baby, keeping airway clear) *until medical help is available*.
+8. 🧬 *Possible Causes of the Condition*:
+            - Based on the symptoms and context, list likely underlying causes (e.g., infection, allergy, lifestyle factors, exposure, environmental conditions, nutritional deficiency, etc.).
+            - Mention if there could be multiple causes or if further testing is needed to identify the exact one.
+            - List *suspected causes*, using safe language like "may suggest", "could be"
+            - Base suggestions on standard neonatal conditions (e.g., sepsis, hypothermia, dehydration, hypoglycemia).
+            - Answer all the possible causes , no matter how many there are.
+9. 💬 *Friendly Summary to the Patient*: One or two-line response directly to the patient.Be firm but supportive. Make it warm, easy to understand, emotionally attached and supportive.
+
+Important:
+- Be medically cautious: avoid diagnosis, focus on triage and routing.
+- If any section has no info, write "Not specified."
+- Keep it structured, clear, and avoid jargon unless well-explained.
+"""
+
+
+def pregnancy_analysis_prompt(transcript: str, age_group: str) -> str:
+    """Create structured prompt for pregnant women symptom analysis"""
+    return f"""
+    You are a medically informed AI assistant specializing in assessing symptoms in **pregnant women**. You must evaluate the spoken or written description of the patient’s condition and return a structured, clinical but easy-to-understand analysis.
+
+    Your job is NOT to diagnose, but to **triage, provide home guidance**, and **advise on when and where to seek help**. If any symptoms are severe or suggest danger signs, treat the situation with the **highest medical caution**.
+
+    Here is the description of the symptoms:
+
+    \"\"\"{transcript}\"\"\"
+
+    Your task is to extract and report the following information in a structured format:
+
+    1. 🤒 **Symptom Details**:
+    - List each symptom individually with:
+        - Symptom name (e.g., abdominal pain, swelling, fever)
+        - Duration (how long it's been present)
+        - Severity (mild, moderate, severe)
+        - Frequency and pattern (e.g., intermittent, constant, worsening)
+        - Any associated symptoms (e.g., nausea, dizziness, fatigue)
+
+2. 🩺 **Recommended Medical Specialty**:
+    - Suggest the most appropriate doctor type (e.g., Obstetrician, Gynecologist, Maternal-Fetal Medicine specialist, Emergency Physician, Other relevant specialists).
+    - If demand then suggest a nearby hospital number or emergency contact,only give answer or number.(Optional)
+
+3. 🚨 **Urgency Level**:
+    - Categorize urgency:
+        - Emergency (seek help immediately)
+        - Urgent (within 24-48 hours)
+        - Non-urgent but important
+        - Routine check-up
+   - ⚠️ If there are signs like vaginal bleeding, loss of fetal movement, high fever, blurred vision, Severe headache, or convulsions, **label as Emergency**.
+
+4. 🏠 **Recommended Home Remedies** (only if safe in pregnancy):
+   - List **safe, evidence-based remedies**.
+   - Note what's **not safe in pregnancy** (e.g., avoid herbal teas, painkillers).
+    - Include instructions for hydration, rest, warm compresses, etc.
+
+5. 💊 **Evidence-Based Supportive Care**:
+    - Mention standard care protocols for pregnant women such as:
+        - Hydration
+        - Prenatal vitamins
+        - Folic acid or iron supplementation
+        - Gentle rest, positioning (e.g., lying on the left side)
+        - Rest and monitoring
+    - Add: "Only under doctor's supervision" for anything pharmacological.
+
+6. 💡 **Immediate Advice & Next Steps**:
+   - Clearly state what the patient should do **now**.
+    - Emphasize if they should go to a hospital or contact their doctor immediately.
+
+7. 🚑 **First-Aid Guidance** (if urgent):
+   - List **immediate care steps** they can follow while arranging medical help (e.g., lie on left side, ensure hydration, count fetal movements, Keep calm and avoid physical exertion).
+
+8. 🧬 **Possible Causes**:
+    - List possible reasons for the symptoms (e.g., preeclampsia, gestational diabetes, infection, fetal distress).
+    - Use phrases like “could be,” “may suggest,” and advise medical evaluation.
+
+9. 💬 **Friendly Summary to the Patient**:
+    - Give a short, warm summary in 1-2 lines.
+    - Use kind, clear language like:  
+    "It sounds like you're going through something serious. Please don't wait — your health and your baby's health are a priority."
+
+
+    📌 **Important Notes**:
+        - Never assume pregnancy stage unless explicitly given.
+        - Always err on the side of medical safety and suggest seeing a provider.
+        - Be cautious about home remedies and medications unless widely approved for pregnancy.
+        - If no data is available for a section, write "Not specified."
+    """
+
+
+def general_analysis_prompt(transcript: str, age_group: str) -> str:
+    """Create structured prompt for general symptom analysis"""
+    return f"""
+You are an intelligent clinical assistant assessing a {age_group} patient based on their symptom description. Analyze the transcription and provide a structured response.
+
+Transcript: "{transcript}"
+
+Provide analysis in the following structured format:
+
+1. Symptom Details: List each symptom with duration, severity, frequency
+2. Recommended Medical Specialty: Most appropriate specialist
+3. Urgency Level: Emergency/Urgent/Non-urgent/Routine
+4. Recommended Home Remedies: Safe home care measures
+5. Supportive Care: Evidence-based treatments if appropriate
+6. Advice & Next Steps: Clear recommendations
+7. First-Aid Recommendations: If urgent care needed
+8. Possible Causes: Likely underlying causes
+9. Friendly Summary: Supportive message to patient
+
+Be medically cautious and focus on appropriate triage.
+"""
+
+
+class SymptomProfile:
+    def __init__(self, name: str, pipeline: str, age_group: str, vector_store: str,
+                 analysis_prompt: Callable[[str, str], str], whisper_model: str = "medium",
+                 qa_template: Optional[str] = None, max_tokens: Optional[int] = None):
+        self.name = name
+        # Label for tracing stages and token metrics
+        self.pipeline = pipeline
+        self.age_group = age_group
+        self.vector_store = vector_store
+        self.analysis_prompt = analysis_prompt
+        self.whisper_model = whisper_model
+        self.qa_template = qa_template
+        self.max_tokens = max_tokens
+
+
+NEWBORN = SymptomProfile(
+    name="newborn",
+    pipeline="symptom",
+    age_group="newborn",
+    vector_store="symptom_db_faiss",
+    analysis_prompt=newborn_analysis_prompt,
+    qa_template=MEDICAL_QA_TEMPLATE,
+)
+
+PREGNANT = SymptomProfile(
+    name="pregnant",
+    pipeline="symptom_preg",
+    age_group="pregnant women",
+    vector_store="symptom_preg_db_faiss",
+    analysis_prompt=pregnancy_analysis_prompt,
+    max_tokens=1024,
+)
+
+GENERAL = SymptomProfile(
+    name="general",
+    pipeline="symptom_general",
+    age_group="adult",
+    vector_store="medical_db_faiss",
+    analysis_prompt=general_analysis_prompt,
+    qa_template=MEDICAL_QA_TEMPLATE,
+)
+
+PROFILES: Dict[str, SymptomProfile] = {profile.name: profile for profile in (NEWBORN, PREGNANT, GENERAL)}
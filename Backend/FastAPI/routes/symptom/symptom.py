@@ -1,30 +1,39 @@
 import os
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, status, Depends, Request, UploadFile, File, Form, WebSocket
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import logging
-from .symptomCore import SymptomAnalyzer
+from .analysis import SymptomAnalysis
+from .profiles import SymptomProfile, NEWBORN
+from .symptomCore import symptom_engine, GROQ_MODEL_NAME
+from core.audio import AudioDecodeError
+from core.concurrency import limit_concurrency
+from core.lifecycle import ComponentUnavailable
+from core.live_transcription import serve_transcription_stream
+from core.transcription import TranscriptionQueueFull, TranscriptionCancelled
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/medical", tags=["medical"])
+# Every profile shares one Groq client, so they share its concurrency limit too
+llm_slot = Depends(limit_concurrency("symptom_llm"))
 
-# Initialize the symptom analyzer
-symptom_analyzer = SymptomAnalyzer()
+# Seconds a client is asked to wait when the transcription queue is full
+TRANSCRIPTION_RETRY_AFTER = "10"
 
 
 # Pydantic models for request/response
 class HealthCheckResponse(BaseModel):
     status: str
     message: str
+    whisper_models: Optional[Dict[str, Any]] = None
 
 
 class TranscriptionRequest(BaseModel):
     audio_data: str  # Base64 encoded audio data
-    model: Optional[str] = "medium"
+    model: Optional[str] = None  # Whisper size, defaults to the profile's
 
 
 class TranscriptionResponse(BaseModel):
@@ -35,20 +44,12 @@ class TranscriptionResponse(BaseModel):
 
 class MedicalAnalysisRequest(BaseModel):
     transcript: str
-    patient_age_group: Optional[str] = "newborn"
-
-
-class MedicalAnalysisResponse(BaseModel):
-    symptom_details: Dict[str, Any]
-    recommended_specialty: str
-    urgency_level: str
-    home_remedies: List[str]
-    supportive_care: List[str]
-    advice_next_steps: str
-    first_aid: Optional[str]
-    possible_causes: List[str]
-    friendly_summary: str
+    patient_age_group: Optional[str] = None  # defaults to the profile's
+
+
+class MedicalAnalysisResponse(SymptomAnalysis):
     success: bool
+    cached: bool = False
 
 
 class RAGQueryRequest(BaseModel):
@@ -64,8 +65,8 @@ class RAGQueryResponse(BaseModel):
 
 class AudioToAnalysisRequest(BaseModel):
     audio_data: str  # Base64 encoded audio data
-    patient_age_group: Optional[str] = "newborn"
-    model: Optional[str] = "medium"
+    patient_age_group: Optional[str] = None
+    model: Optional[str] = None
 
 
 class QueryRequest(BaseModel):
@@ -79,203 +80,238 @@ class QueryResponse(BaseModel):
     success: bool
 
 
-@router.get("/health-check", response_model=HealthCheckResponse)
-async def health_check():
-    """Health check endpoint to verify the service is running"""
-    try:
-        # Check if the analyzer is properly initialized
-        if symptom_analyzer.is_initialized():
-            return HealthCheckResponse(
-                status="healthy",
-                message="Medical analysis service is running properly with Groq LLM"
-            )
-        else:
+def _analysis_response(analysis_result: Dict[str, Any], cached: bool = False) -> MedicalAnalysisResponse:
+    return MedicalAnalysisResponse(
+        symptom_details=analysis_result.get("symptom_details", {}),
+        recommended_specialty=analysis_result.get("recommended_specialty", "General Physician"),
+        urgency_level=analysis_result.get("urgency_level", "Routine check-up"),
+        home_remedies=analysis_result.get("home_remedies", []),
+        supportive_care=analysis_result.get("supportive_care", []),
+        advice_next_steps=analysis_result.get("advice_next_steps", ""),
+        first_aid=analysis_result.get("first_aid"),
+        possible_causes=analysis_result.get("possible_causes", []),
+        friendly_summary=analysis_result.get("friendly_summary", ""),
+        success=True,
+        cached=cached
+    )
+
+
+def _http_error(e: Exception, label: str) -> HTTPException:
+    """Map a pipeline failure to the HTTP error the client should see"""
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, AudioDecodeError):
+        return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if isinstance(e, TranscriptionQueueFull):
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": TRANSCRIPTION_RETRY_AFTER}
+        )
+    if isinstance(e, TranscriptionCancelled):
+        # Nobody is listening for the response any more
+        return HTTPException(status_code=499, detail="Client closed request")
+    if isinstance(e, ComponentUnavailable):
+        return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+    logger.error(f"{label}: {e}")
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail=f"{label}: {str(e)}"
+    )
+
+
+def create_symptom_router(profile: SymptomProfile) -> APIRouter:
+    """
+    Build the /medical endpoints for one population profile
+
+    Routers for different profiles can be mounted side by side; they share
+    the engine's models, caches and transcription pool.
+    """
+    symptom_engine.register_profile(profile)
+    router = APIRouter(prefix="/medical", tags=["medical"])
+
+    @router.get("/health-check", response_model=HealthCheckResponse)
+    async def health_check():
+        """Health check endpoint to verify the service is running"""
+        if symptom_engine.is_failed(profile):
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Service is not properly initialized"
             )
-    except Exception as e:
-        logger.error(f"Health check failed: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Service is currently unavailable"
-        )
-
-
-@router.post("/transcribe", response_model=TranscriptionResponse)
-async def transcribe_audio(request: TranscriptionRequest):
-    """Transcribe audio to text using Whisper"""
-    try:
-        logger.info("Starting audio transcription")
-
-        transcript, language = await symptom_analyzer.transcribe_audio(
-            request.audio_data,
-            request.model
-        )
-
-        logger.info(f"Transcription completed: {transcript[:100]}...")
-
-        return TranscriptionResponse(
-            transcript=transcript,
-            language=language,
-            success=True
-        )
-
-    except Exception as e:
-        logger.error(f"Transcription failed: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Transcription failed: {str(e)}"
-        )
-
-
-@router.post("/medical-analysis", response_model=MedicalAnalysisResponse)
-async def analyze_medical_symptoms(request: MedicalAnalysisRequest):
-    """Analyze medical symptoms from transcript"""
-    try:
-        logger.info(f"Starting medical analysis for: {request.transcript[:100]}...")
-
-        analysis_result = await symptom_analyzer.analyze_symptoms(
-            request.transcript,
-            request.patient_age_group
-        )
-
-        logger.info("Medical analysis completed successfully")
-
-        return MedicalAnalysisResponse(
-            symptom_details=analysis_result.get("symptom_details", {}),
-            recommended_specialty=analysis_result.get("recommended_specialty", "General Physician"),
-            urgency_level=analysis_result.get("urgency_level", "Routine check-up"),
-            home_remedies=analysis_result.get("home_remedies", []),
-            supportive_care=analysis_result.get("supportive_care", []),
-            advice_next_steps=analysis_result.get("advice_next_steps", ""),
-            first_aid=analysis_result.get("first_aid"),
-            possible_causes=analysis_result.get("possible_causes", []),
-            friendly_summary=analysis_result.get("friendly_summary", ""),
-            success=True
-        )
-
-    except Exception as e:
-        logger.error(f"Medical analysis failed: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Medical analysis failed: {str(e)}"
-        )
 
-
-@router.post("/rag-query", response_model=RAGQueryResponse)
-async def rag_query(request: RAGQueryRequest):
-    """Query the medical knowledge base using RAG"""
-    try:
-        logger.info(f"Processing RAG query: {request.query}")
-
-        answer, source_docs = await symptom_analyzer.query_knowledge_base(
-            request.query,
-            request.max_results
-        )
-
-        logger.info("RAG query completed successfully")
-
-        return RAGQueryResponse(
-            answer=answer,
-            source_documents=source_docs,
-            success=True
-        )
-
-    except Exception as e:
-        logger.error(f"RAG query failed: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"RAG query failed: {str(e)}"
+        ready = symptom_engine.is_ready(profile)
+        return HealthCheckResponse(
+            status="healthy" if ready else "loading",
+            message=f"Medical analysis service ({profile.name}) is running properly with Groq LLM"
+            if ready else f"Medical analysis service ({profile.name}) is loading its models",
+            whisper_models=symptom_engine.whisper_status()
         )
 
+    @router.post("/transcribe", response_model=TranscriptionResponse)
+    async def transcribe_audio(request: TranscriptionRequest, http_request: Request):
+        """Transcribe audio to text using Whisper"""
+        try:
+            logger.info("Starting audio transcription")
+
+            transcript, language = await symptom_engine.transcribe_audio(
+                profile,
+                request.audio_data,
+                request.model,
+                http_request.is_disconnected
+            )
 
-@router.post("/audio-to-analysis", response_model=MedicalAnalysisResponse)
-async def audio_to_analysis(request: AudioToAnalysisRequest):
-    """Complete pipeline: audio transcription + medical analysis"""
-    try:
-        logger.info("Starting audio-to-analysis pipeline")
+            logger.info(f"Transcription completed: {transcript[:100]}...")
 
-        # First transcribe the audio
-        transcript, _ = await symptom_analyzer.transcribe_audio(
-            request.audio_data,
-            request.model
-        )
+            return TranscriptionResponse(
+                transcript=transcript,
+                language=language,
+                success=True
+            )
 
-        logger.info(f"Audio transcribed: {transcript[:100]}...")
+        except Exception as e:
+            raise _http_error(e, "Transcription failed")
+
+    @router.post("/transcribe-file", response_model=TranscriptionResponse)
+    async def transcribe_audio_file(http_request: Request, file: UploadFile = File(...),
+                                    model: Optional[str] = Form(None)):
+        """Transcribe an uploaded audio file (multipart) without base64 encoding"""
+        try:
+            logger.info(f"Starting transcription of uploaded file {file.filename}")
+
+            transcript, language = await symptom_engine.transcribe_audio(
+                profile,
+                await file.read(),
+                model,
+                http_request.is_disconnected
+            )
 
-        # Then analyze the symptoms
-        analysis_result = await symptom_analyzer.analyze_symptoms(
-            transcript,
-            request.patient_age_group
-        )
+            return TranscriptionResponse(
+                transcript=transcript,
+                language=language,
+                success=True
+            )
 
-        logger.info("Audio-to-analysis pipeline completed successfully")
-
-        return MedicalAnalysisResponse(
-            symptom_details=analysis_result.get("symptom_details", {}),
-            recommended_specialty=analysis_result.get("recommended_specialty", "General Physician"),
-            urgency_level=analysis_result.get("urgency_level", "Routine check-up"),
-            home_remedies=analysis_result.get("home_remedies", []),
-            supportive_care=analysis_result.get("supportive_care", []),
-            advice_next_steps=analysis_result.get("advice_next_steps", ""),
-            first_aid=analysis_result.get("first_aid"),
-            possible_causes=analysis_result.get("possible_causes", []),
-            friendly_summary=analysis_result.get("friendly_summary", ""),
-            success=True
-        )
+        except Exception as e:
+            raise _http_error(e, "Transcription failed")
+
+    @router.websocket("/transcribe-stream")
+    async def transcribe_stream(websocket: WebSocket, model: Optional[str] = None):
+        """
+        Streaming transcription: send 16 kHz mono PCM16 chunks as binary messages,
+        then {"type": "end"}; partial transcripts arrive as each pause is reached
+        """
+        await serve_transcription_stream(websocket, model or profile.whisper_model, pipeline=profile.pipeline)
+
+    @router.post("/medical-analysis", response_model=MedicalAnalysisResponse, dependencies=[llm_slot])
+    async def analyze_medical_symptoms(request: MedicalAnalysisRequest):
+        """Analyze medical symptoms from transcript"""
+        try:
+            logger.info(f"Starting medical analysis for: {request.transcript[:100]}...")
+
+            analysis_result = await symptom_engine.analyze_symptoms(
+                profile,
+                request.transcript,
+                request.patient_age_group
+            )
 
-    except Exception as e:
-        logger.error(f"Audio-to-analysis pipeline failed: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Audio-to-analysis pipeline failed: {str(e)}"
-        )
+            logger.info("Medical analysis completed successfully")
+            return _analysis_response(analysis_result)
 
+        except Exception as e:
+            raise _http_error(e, "Medical analysis failed")
 
-@router.post("/query", response_model=QueryResponse)
-async def general_query(request: QueryRequest):
-    """General query endpoint with optional RAG"""
-    try:
-        logger.info(f"Processing general query: {request.query}")
+    @router.post("/rag-query", response_model=RAGQueryResponse, dependencies=[llm_slot])
+    async def rag_query(request: RAGQueryRequest):
+        """Query the medical knowledge base using RAG"""
+        try:
+            logger.info(f"Processing RAG query: {request.query}")
 
-        if request.use_rag:
-            # Use RAG for medical queries
-            answer, source_docs = await symptom_analyzer.query_knowledge_base(
+            answer, source_docs = await symptom_engine.query_knowledge_base(
+                profile,
                 request.query,
-                max_results=3
+                request.max_results
             )
 
-            return QueryResponse(
+            logger.info("RAG query completed successfully")
+
+            return RAGQueryResponse(
                 answer=answer,
                 source_documents=source_docs,
                 success=True
             )
-        else:
-            # Direct LLM query without RAG
-            answer = await symptom_analyzer.direct_llm_query(request.query)
 
-            return QueryResponse(
-                answer=answer,
-                source_documents=None,
-                success=True
+        except Exception as e:
+            raise _http_error(e, "RAG query failed")
+
+    @router.post("/audio-to-analysis", response_model=MedicalAnalysisResponse)
+    async def audio_to_analysis(request: AudioToAnalysisRequest, http_request: Request):
+        """Complete pipeline: audio transcription + medical analysis"""
+        try:
+            logger.info("Starting audio-to-analysis pipeline")
+
+            # Transcribe, then analyze; a retried upload of the same clip is served from cache
+            transcript, analysis_result, cached = await symptom_engine.audio_to_analysis(
+                profile,
+                request.audio_data,
+                request.model,
+                request.patient_age_group,
+                http_request.is_disconnected
             )
 
-    except Exception as e:
-        logger.error(f"General query failed: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Query processing failed: {str(e)}"
-        )
-
-
-@router.get("/status")
-async def get_status():
-    """Get the status of various components"""
-    return {
-        "llm_provider": "Groq",
-        "llm_model": "meta-llama/llama-4-scout-17b-16e-instruct",
-        "symptom_analyzer_initialized": symptom_analyzer.is_initialized(),
-        "groq_api_configured": os.getenv("GROQ_API_KEY") is not None,
-        "embedding_model": "all-MiniLM-L6-v2"
-    }
\ No newline at end of file
+            logger.info(f"Audio-to-analysis pipeline completed successfully (cached={cached}): {transcript[:100]}...")
+            return _analysis_response(analysis_result, cached)
+
+        except Exception as e:
+            raise _http_error(e, "Audio-to-analysis pipeline failed")
+
+    @router.post("/query", response_model=QueryResponse, dependencies=[llm_slot])
+    async def general_query(request: QueryRequest):
+        """General query endpoint with optional RAG"""
+        try:
+            logger.info(f"Processing general query: {request.query}")
+
+            if request.use_rag:
+                # Use RAG for medical queries
+                answer, source_docs = await symptom_engine.query_knowledge_base(
+                    profile,
+                    request.query,
+                    max_results=3
+                )
+
+                return QueryResponse(
+                    answer=answer,
+                    source_documents=source_docs,
+                    success=True
+                )
+            else:
+                # Direct LLM query without RAG
+                answer = await symptom_engine.direct_llm_query(profile, request.query)
+
+                return QueryResponse(
+                    answer=answer,
+                    source_documents=None,
+                    success=True
+                )
+
+        except Exception as e:
+            raise _http_error(e, "Query processing failed")
+
+    @router.get("/status")
+    async def get_status():
+        """Get the status of various components"""
+        return {
+            "profile": profile.name,
+            "llm_provider": "Groq",
+            "llm_model": GROQ_MODEL_NAME,
+            "symptom_analyzer_initialized": symptom_engine.is_ready(profile),
+            "groq_api_configured": os.getenv("GROQ_API_KEY") is not None,
+            "embedding_model": "all-MiniLM-L6-v2",
+            "transcription": symptom_engine.whisper_status(),
+            "audio_cache": symptom_engine.cache_stats()
+        }
+
+    return router
+
+
+router = create_symptom_router(NEWBORN)
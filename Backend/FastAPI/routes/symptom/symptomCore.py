@@ -1,25 +1,26 @@
 import os
-import sys
 import logging
-import asyncio
-import base64
-import tempfile
-import json
 import re
-from typing import Dict, List, Tuple, Any, Optional
-from io import BytesIO
+from typing import Dict, List, Tuple, Any, Optional, Union
 import warnings
 
 # ML/AI libraries
-import whisper
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain.chains import RetrievalQA
-from langchain.retrievers.multi_query import MultiQueryRetriever
 from langchain_core.prompts import PromptTemplate
 from langchain_groq import ChatGroq
 from dotenv import load_dotenv
 
+from core.embeddings import get_embedding_model
+from core.query_expansion import expanding_retriever_from_env
+from core.lifecycle import lifecycle
+from core.tracing import Counter, register_metric, stage, trace_config
+from core.audio import decode_audio_async
+from core.transcription import transcription_pool
+from core.ttl_cache import TTLCache, content_key
+from .analysis import FALLBACK_ANALYSIS, JSON_INSTRUCTIONS, parse_analysis_json, repair_prompt, salvage_analysis
+from .profiles import SymptomProfile, general_analysis_prompt
+
 # Configuration
 warnings.filterwarnings("ignore", message="FP16 is not supported on CPU")
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -28,246 +29,265 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+GROQ_MODEL_NAME = "meta-llama/llama-4-scout-17b-16e-instruct"
 
-class SymptomAnalyzer:
-    """Core class for medical symptom analysis and RAG functionality"""
+current_dir = os.path.dirname(os.path.abspath(__file__))
+VECTORSTORE_DIR = os.path.normpath(os.path.join(current_dir, "..", "..", "vectorstore"))
+# Used when a profile's own store has not been built
+FALLBACK_VECTOR_STORE = "medical_db_faiss"
 
-    def __init__(self):
-        self.embedding_model = None
-        self.medical_vector_store = None
-        self.symptom_vector_store = None
-        self.whisper_model = None
-        self.llm = None
-        self.qa_chain = None
-        self._initialized = False
-
-        # Initialize all components
-        self._initialize_components()
-
-    def _initialize_components(self):
-        """Initialize all ML models and vector stores"""
-        try:
-            logger.info("Initializing SymptomAnalyzer components...")
+# JSON output validated into SymptomAnalysis; "false" restores the emoji-header regex parser
+STRUCTURED_ANALYSIS = os.getenv("STRUCTURED_ANALYSIS", "true").lower() in ("1", "true", "yes")
 
-            # Initialize embedding model
-            self._initialize_embeddings()
+analysis_outputs = register_metric(Counter(
+    "symptom_analysis_outputs_total",
+    "Symptom analysis LLM outputs by parse outcome (ok, repaired, salvaged, regex_ok, regex_partial)",
+    ("pipeline", "outcome")
+))
 
-            # Initialize vector stores
-            self._initialize_vector_stores()
+# Retried uploads of the same voice note are answered from these caches
+AUDIO_CACHE_TTL = float(os.getenv("AUDIO_CACHE_TTL", "3600"))
+AUDIO_CACHE_MAX_ENTRIES = int(os.getenv("AUDIO_CACHE_MAX_ENTRIES", "512"))
 
-            # Initialize LLM
-            self._initialize_llm()
 
-            # Initialize Whisper model (loaded on demand)
-            self.whisper_model = None
+def _load_llm() -> ChatGroq:
+    groq_api_key = os.getenv("GROQ_API_KEY")
+    if not groq_api_key:
+        raise ValueError("GROQ_API_KEY not found in environment variables")
 
-            self._initialized = True
-            logger.info("SymptomAnalyzer initialized successfully")
+    logger.info("Initializing Groq LLM...")
+    return ChatGroq(
+        model_name=GROQ_MODEL_NAME,
+        api_key=groq_api_key,
+        temperature=0.3,
+    )
 
-        except Exception as e:
-            logger.error(f"Failed to initialize SymptomAnalyzer: {e}")
-            raise
 
-    def _initialize_embeddings(self):
-        """Initialize the embedding model"""
-        try:
-            logger.info("Loading embedding model...")
-            self.embedding_model = HuggingFaceEmbeddings(
-                model_name="all-MiniLM-L6-v2"
-            )
-            logger.info("Embedding model loaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to load embedding model: {e}")
-            raise
+def _load_vector_store(name: str) -> Optional[FAISS]:
+    """Load a FAISS store from vectorstore/, or None if it has not been built"""
+    path = os.path.join(VECTORSTORE_DIR, name)
+    if not os.path.exists(os.path.join(path, "index.faiss")):
+        logger.warning(f"Vector store not found at {path}")
+        return None
+    return FAISS.load_local(path, lifecycle.get("embeddings"), allow_dangerous_deserialization=True)
 
-    def _initialize_vector_stores(self):
-        """Initialize vector stores for medical and symptom databases"""
-        try:
-            # Load symptom database vector store (now primary)
-            symptom_db_path = "vectorstore/symptom_db_faiss"
-            if os.path.exists(f"{symptom_db_path}/index.faiss"):
-                logger.info("Loading symptom database vector store...")
-                self.symptom_vector_store = FAISS.load_local(
-                    symptom_db_path,
-                    self.embedding_model,
-                    allow_dangerous_deserialization=True
-                )
-                logger.info("Symptom database vector store loaded successfully")
-            else:
-                logger.warning(f"Symptom database not found at {symptom_db_path}")
-
-            # Load medical database vector store (kept as backup)
-            medical_db_path = "vectorstore/medical_db_faiss"
-            if os.path.exists(f"{medical_db_path}/index.faiss"):
-                logger.info("Loading medical database vector store...")
-                self.medical_vector_store = FAISS.load_local(
-                    medical_db_path,
-                    self.embedding_model,
-                    allow_dangerous_deserialization=True
-                )
-                logger.info("Medical database vector store loaded successfully")
-            else:
-                logger.warning(f"Medical database not found at {medical_db_path}")
 
-        except Exception as e:
-            logger.error(f"Failed to load vector stores: {e}")
-            raise
+lifecycle.register("embeddings", get_embedding_model)
+lifecycle.register("symptom_llm", _load_llm)
 
-    def _initialize_llm(self):
-        """Initialize the Groq LLM"""
-        try:
-            groq_api_key = os.getenv("GROQ_API_KEY")
-            if not groq_api_key:
-                raise ValueError("GROQ_API_KEY not found in environment variables")
-
-            logger.info("Initializing Groq LLM...")
-            self.llm = ChatGroq(
-                model_name="meta-llama/llama-4-scout-17b-16e-instruct",
-                api_key=groq_api_key,
-                temperature=0.3,
-            )
 
-            # Initialize QA chain - prioritize symptom database, fallback to medical database
-            primary_db = self.symptom_vector_store or self.medical_vector_store
-            if primary_db:
-                # Create custom prompt for medical queries
-                custom_prompt = self._create_medical_qa_prompt()
-
-                # Use MultiQueryRetriever for better results
-                try:
-                    retriever = MultiQueryRetriever.from_llm(
-                        retriever=primary_db.as_retriever(
-                            search_type="similarity",
-                            search_kwargs={"k": 3}
-                        ),
-                        llm=self.llm,
-                    )
-                except Exception as e:
-                    logger.warning(f"Failed to create MultiQueryRetriever: {e}, using basic retriever")
-                    retriever = primary_db.as_retriever(
-                        search_type="similarity",
-                        search_kwargs={"k": 3}
-                    )
-
-                self.qa_chain = RetrievalQA.from_chain_type(
-                    llm=self.llm,
-                    retriever=retriever,
-                    chain_type="stuff",
-                    return_source_documents=True,
-                    chain_type_kwargs={'prompt': custom_prompt}
-                )
-
-            db_type = "symptom" if self.symptom_vector_store else "medical" if self.medical_vector_store else "none"
-            logger.info(f"Groq LLM initialized successfully with {db_type} database")
+class SymptomEngine:
+    """
+    Symptom analysis for several populations from one set of resident models
 
-        except Exception as e:
-            logger.error(f"Failed to initialize LLM: {e}")
-            raise
+    The Groq client, embeddings, FAISS stores and the Whisper transcription
+    pool are loaded once through the lifecycle manager and shared; each
+    SymptomProfile only adds its prompts, its vector store and a RAG chain
+    built on top of the shared pieces.
+    """
+
+    def __init__(self):
+        self.profiles: Dict[str, SymptomProfile] = {}
+
+        # Keyed by a hash of the decoded PCM plus the Whisper size, so the
+        # transcript of a clip is shared by every profile; analyses also key on
+        # the profile and age group, since each profile has its own store and prompt
+        self.transcript_cache = TTLCache(AUDIO_CACHE_TTL, AUDIO_CACHE_MAX_ENTRIES)
+        self.analysis_cache = TTLCache(AUDIO_CACHE_TTL, AUDIO_CACHE_MAX_ENTRIES)
+
+    def register_profile(self, profile: SymptomProfile):
+        """Make a profile servable; its chain loads lazily (or during warmup)"""
+        if profile.name in self.profiles:
+            return
+        self.profiles[profile.name] = profile
+        for store in (profile.vector_store, FALLBACK_VECTOR_STORE):
+            lifecycle.register(self._store_component(store), lambda store=store: _load_vector_store(store), warmup=False)
+        lifecycle.register(self._qa_component(profile), lambda: self._load_qa_chain(profile))
+
+        # Whisper runs in the transcription pool; models load there on demand,
+        # or up front when WHISPER_PRELOAD is set
+        transcription_pool.start()
+
+    @staticmethod
+    def _store_component(name: str) -> str:
+        return f"symptom_store_{name}"
+
+    @staticmethod
+    def _qa_component(profile: SymptomProfile) -> str:
+        return f"symptom_qa_{profile.name}"
+
+    def _profile_llm(self, profile: SymptomProfile):
+        llm = lifecycle.get("symptom_llm")
+        return llm.bind(max_tokens=profile.max_tokens) if profile.max_tokens else llm
+
+    def _load_qa_chain(self, profile: SymptomProfile) -> Optional[RetrievalQA]:
+        """RAG chain over the profile's store, falling back to the medical store"""
+        db = lifecycle.get(self._store_component(profile.vector_store)) or \
+            lifecycle.get(self._store_component(FALLBACK_VECTOR_STORE))
+        if db is None:
+            logger.warning(f"No vector store for the {profile.name} profile; analysis will query the LLM directly")
+            return None
+
+        llm = self._profile_llm(profile)
+        # Paraphrase expansion only when the first pass finds nothing close (QUERY_EXPANSION)
+        retriever = expanding_retriever_from_env(db, llm, k=3, pipeline=profile.pipeline)
+
+        chain_type_kwargs = {}
+        if profile.qa_template:
+            chain_type_kwargs["prompt"] = PromptTemplate(
+                template=profile.qa_template, input_variables=["context", "question"]
+            )
 
-    def _create_medical_qa_prompt(self):
-        """Create custom prompt template for medical queries"""
-        template = """
-        You are a medical AI assistant. Use the context below to answer medical questions accurately.
-        Only answer based on the context provided. If you don't know the answer based on the context, say so.
-        Always recommend consulting healthcare professionals for medical advice.
+        return RetrievalQA.from_chain_type(
+            llm=llm,
+            retriever=retriever,
+            chain_type="stuff",
+            return_source_documents=True,
+            chain_type_kwargs=chain_type_kwargs
+        )
 
-        Context: {context}
+    async def _qa_chain(self, profile: SymptomProfile) -> Optional[RetrievalQA]:
+        return await lifecycle.aget(self._qa_component(profile))
 
-        Question: {question}
+    def is_failed(self, profile: SymptomProfile) -> bool:
+        """True once the LLM or the profile's chain failed to load"""
+        return lifecycle.is_failed("symptom_llm") or lifecycle.is_failed(self._qa_component(profile))
 
-        Answer:
-        """
-        return PromptTemplate(template=template, input_variables=["context", "question"])
+    def is_ready(self, profile: SymptomProfile) -> bool:
+        return lifecycle.is_ready("symptom_llm") and lifecycle.is_ready(self._qa_component(profile))
 
-    def is_initialized(self) -> bool:
-        """Check if the analyzer is properly initialized"""
-        return self._initialized
+    def whisper_status(self) -> Dict[str, Any]:
+        """Queue and per-worker model state of the transcription pool"""
+        return transcription_pool.status()
 
-    def _load_whisper_model(self, model_name: str = "medium"):
-        """Load Whisper model on demand"""
-        if self.whisper_model is None:
-            logger.info(f"Loading Whisper model ({model_name})...")
-            self.whisper_model = whisper.load_model(model_name)
-            logger.info("Whisper model loaded successfully")
-        return self.whisper_model
+    def cache_stats(self) -> Dict[str, Any]:
+        return {
+            "transcripts": self.transcript_cache.stats(),
+            "analyses": self.analysis_cache.stats(),
+        }
 
-    async def transcribe_audio(self, audio_data: str, model: str = "medium") -> Tuple[str, str]:
+    async def transcribe_audio(self, profile: SymptomProfile, audio_data: Union[str, bytes],
+                               model: Optional[str] = None, is_disconnected=None) -> Tuple[str, str]:
         """
-        Transcribe base64 encoded audio data to text
+        Transcribe uploaded audio to text
 
         Args:
-            audio_data: Base64 encoded audio data
-            model: Whisper model size
+            profile: Population profile the request was made for
+            audio_data: Base64 encoded audio data, or the raw bytes of an upload
+            model: Whisper model size (defaults to the profile's)
+            is_disconnected: Optional coroutine function (e.g. Request.is_disconnected)
+                used to abandon the job when the client goes away
 
         Returns:
             Tuple of (transcript, detected_language)
         """
         try:
-            # Decode base64 audio data
-            audio_bytes = base64.b64decode(audio_data)
+            # Decode to 16 kHz PCM in memory, piping the bytes through ffmpeg
+            with stage(profile.pipeline, "decode"):
+                audio = await decode_audio_async(audio_data)
 
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp_file:
-                temp_file.write(audio_bytes)
-                temp_file_path = temp_file.name
+            return await self._transcribe_pcm(profile, audio, model or profile.whisper_model, is_disconnected)
 
-            try:
-                # Load Whisper model
-                whisper_model = self._load_whisper_model(model)
+        except Exception as e:
+            logger.error(f"Audio transcription failed: {e}")
+            raise
 
-                # Transcribe audio
-                logger.info("Starting transcription...")
-                result = whisper_model.transcribe(temp_file_path, task="transcribe")
+    async def _transcribe_pcm(self, profile: SymptomProfile, audio, model: str,
+                              is_disconnected=None) -> Tuple[str, str]:
+        """Transcribe decoded PCM, reusing the transcript of an identical earlier upload"""
+        key = content_key(audio, model)
+        cached = self.transcript_cache.get(key)
+        if cached is not None:
+            logger.info("Transcript served from cache")
+            return cached
 
-                transcript = result["text"].strip()
-                language = result.get("language", "unknown")
+        # Transcribe audio in the worker pool, off the event loop
+        logger.info("Starting transcription...")
+        with stage(profile.pipeline, "transcribe"):
+            result = await transcription_pool.transcribe(audio, model, is_disconnected)
 
-                logger.info(f"Transcription completed. Language: {language}")
+        transcript = result["text"].strip()
+        language = result.get("language", "unknown")
 
-                if not transcript or len(transcript.strip()) < 3:
-                    raise ValueError("No meaningful speech detected")
+        logger.info(f"Transcription completed. Language: {language}")
 
-                return transcript, language
+        if not transcript or len(transcript.strip()) < 3:
+            raise ValueError("No meaningful speech detected")
 
-            finally:
-                # Clean up temporary file
-                os.unlink(temp_file_path)
+        self.transcript_cache.put(key, (transcript, language))
+        return transcript, language
 
-        except Exception as e:
-            logger.error(f"Audio transcription failed: {e}")
-            raise
+    async def audio_to_analysis(self, profile: SymptomProfile, audio_data: Union[str, bytes],
+                                model: Optional[str] = None, patient_age_group: Optional[str] = None,
+                                is_disconnected=None) -> Tuple[str, Dict[str, Any], bool]:
+        """
+        Transcribe and analyze an upload in one go
 
-    async def analyze_symptoms(self, transcript: str, patient_age_group: str = "newborn") -> Dict[str, Any]:
+        Returns:
+            Tuple of (transcript, analysis, served_from_cache)
+        """
+        model = model or profile.whisper_model
+        patient_age_group = patient_age_group or profile.age_group
+
+        with stage(profile.pipeline, "decode"):
+            audio = await decode_audio_async(audio_data)
+
+        key = content_key(audio, profile.name, model, patient_age_group)
+        cached = self.analysis_cache.get(key)
+        if cached is not None:
+            logger.info("Audio analysis served from cache")
+            return cached[0], cached[1], True
+
+        transcript, _ = await self._transcribe_pcm(profile, audio, model, is_disconnected)
+        analysis = await self.analyze_symptoms(profile, transcript, patient_age_group)
+        self.analysis_cache.put(key, (transcript, analysis))
+        return transcript, analysis, False
+
+    async def analyze_symptoms(self, profile: SymptomProfile, transcript: str,
+                               patient_age_group: Optional[str] = None,
+                               structured: Optional[bool] = None) -> Dict[str, Any]:
         """
         Analyze symptoms from transcript using structured prompt
 
         Args:
+            profile: Population profile the request was made for
             transcript: Patient's symptom description
-            patient_age_group: Age group of patient
+            patient_age_group: Age group of patient (defaults to the profile's)
+            structured: JSON output instead of regex parsing (defaults to STRUCTURED_ANALYSIS)
 
         Returns:
             Structured analysis results
         """
         try:
-            # Create structured prompt based on age group
-            if patient_age_group.lower() == "newborn":
-                prompt = self._create_newborn_analysis_prompt(transcript)
+            # The profile's own prompt covers its population; any other age group
+            # sent to this profile gets the general prompt
+            patient_age_group = patient_age_group or profile.age_group
+            if patient_age_group.lower() == profile.age_group.lower():
+                prompt = profile.analysis_prompt(transcript, patient_age_group)
             else:
-                prompt = self._create_general_analysis_prompt(transcript, patient_age_group)
+                prompt = general_analysis_prompt(transcript, patient_age_group)
 
             # Get analysis from LLM
             logger.info("Generating symptom analysis...")
 
-            if self.qa_chain:
+            if STRUCTURED_ANALYSIS if structured is None else structured:
+                analysis = await self._structured_analysis(profile, transcript, prompt)
+                logger.info("Symptom analysis completed")
+                return analysis
+
+            qa_chain = await self._qa_chain(profile)
+            if qa_chain:
                 # Use RAG for better medical context
-                result = self.qa_chain.invoke({"query": prompt})
+                with stage(profile.pipeline, "analysis_chain"):
+                    result = await qa_chain.ainvoke({"query": prompt}, config=trace_config(profile.pipeline))
                 analysis_text = result["result"]
             else:
                 # Direct LLM query
-                analysis_text = await self._direct_llm_query(prompt)
+                analysis_text = await self._direct_llm_query(profile, prompt)
 
             # Parse structured response
-            parsed_analysis = self._parse_analysis_response(analysis_text)
+            with stage(profile.pipeline, "parse"):
+                parsed_analysis = self._parse_analysis_response(analysis_text, profile.pipeline)
 
             logger.info("Symptom analysis completed")
             return parsed_analysis
@@ -276,82 +296,53 @@ class SymptomAnalyzer:
             logger.error(f"Symptom analysis failed: {e}")
             raise
 
-    def _create_newborn_analysis_prompt(self, transcript: str) -> str:
-        """Create structured prompt for newborn symptom analysis"""
-        return f"""
-You are a intelligent clinical assistant assessing baby (newborn) based on a caregiver's spoken description. Analyze the transcription carefully and provide a detailed, structured response. This age group is highly vulnerable — treat any concerning symptom with the highest caution. Analyze the transcript and extract the following details clearly and precisely.
-
-\"\"\"{transcript}\"\"\"
-
-Your task is to extract and report the following information in a structured format:
-
-1. 🤒 Symptom Details:
-    - For each symptom, list:
-        - Symptom name (e.g., cough)
-        - Include: duration, severity, frequency, and patterns (e.g., "not feeding for 12 hours", "one-time vomiting", "sleepy for 1 day").
-        - Estimate approximate duration if temporal clues like "started today" or "since yesterday" appear.
-2. 🩺 *Recommended Medical Specialty*: Suggest the most appropriate type of specialist (e.g., cardiologist, ENT, general physician).
-3. 🚨 *Urgency Level*:
-    - Categorize the urgency of the condition:
-        - Emergency (needs help now)
-        - Urgent (within 24–48 hours)
-        - Non-urgent but important
-        - Routine check-up
-        - ⚠ If the baby shows danger signs (lethargy, poor feeding, low urine output, cold to touch, abnormal breathing), label this as *Emergency*, not anything else.
-4.  🏠 *Recommended Home Remedies*:
-        Suggest simple, safe, and evidence-informed home care measures (e.g., hydration, warm compress, turmeric milk, saltwater gargle).
-        Highlight safety notes (e.g., "Avoid if allergic to…" or "Do not exceed recommended use").
-        Mention what to *avoid* doing or consuming during recovery (e.g., caffeine, alcohol, heavy meals, painkillers without advice). 
-5. 💊 *Evidence-Based Supportive Care (If Appropriate)*:
-    - Include treatments recommended by WHO/IMCI or pediatric manuals, such as:
-        - "Treat the child to prevent low blood sugar" (offer breastfeeding, sugar water)
-        - "Give paracetamol for high fever or pain"
-        - "Apply tetracycline eye ointment if there is eye discharge"
-        - "Give an oral antimalarial if malaria is suspected"
-        - "Always note: **"Only if applicable and under medical supervision."
-        - "Mention possible care actions known from neonatal protocols (e.g., Kangaroo care, hydration, warmth).
-        - " Do *not* recommend medications unless standard for neonates."**        
-6. 💡 *Advice & Next Steps*: 
-            - Give a clear, confident recommendation for what to do now.
-            - If urgent, emphasize immediate travel to a clinic or hospital.
-7. 🚑 *First-Aid Recommendations* (if urgent): Mention emergency steps to take (e.g., warming the baby, keeping airway clear) *until medical help is available*.
-8. 🧬 *Possible Causes of the Condition*:
-            - Based on the symptoms and context, list likely underlying causes (e.g., infection, allergy, lifestyle factors, exposure, environmental conditions, nutritional deficiency, etc.).
-            - Mention if there could be multiple causes or if further testing is needed to identify the exact one.
-            - List *suspected causes*, using safe language like "may suggest", "could be"
-            - Base suggestions on standard neonatal conditions (e.g., sepsis, hypothermia, dehydration, hypoglycemia).
-            - Answer all the possible causes , no matter how many there are.
-9. 💬 *Friendly Summary to the Patient*: One or two-line response directly to the patient.Be firm but supportive. Make it warm, easy to understand, emotionally attached and supportive.
-
-Important:
-- Be medically cautious: avoid diagnosis, focus on triage and routing.
-- If any section has no info, write "Not specified."
-- Keep it structured, clear, and avoid jargon unless well-explained.
-"""
-
-    def _create_general_analysis_prompt(self, transcript: str, age_group: str) -> str:
-        """Create structured prompt for general symptom analysis"""
-        return f"""
-You are an intelligent clinical assistant assessing a {age_group} patient based on their symptom description. Analyze the transcription and provide a structured response.
-
-Transcript: "{transcript}"
-
-Provide analysis in the following structured format:
-
-1. Symptom Details: List each symptom with duration, severity, frequency
-2. Recommended Medical Specialty: Most appropriate specialist
-3. Urgency Level: Emergency/Urgent/Non-urgent/Routine
-4. Recommended Home Remedies: Safe home care measures
-5. Supportive Care: Evidence-based treatments if appropriate
-6. Advice & Next Steps: Clear recommendations
-7. First-Aid Recommendations: If urgent care needed
-8. Possible Causes: Likely underlying causes
-9. Friendly Summary: Supportive message to patient
-
-Be medically cautious and focus on appropriate triage.
-"""
-
-    def _parse_analysis_response(self, analysis_text: str) -> Dict[str, Any]:
+    async def _reference_context(self, profile: SymptomProfile, transcript: str) -> str:
+        """Passages from the profile's store relevant to the described symptoms"""
+        qa_chain = await self._qa_chain(profile)
+        if not qa_chain:
+            return ""
+        with stage(profile.pipeline, "retrieve"):
+            docs = await qa_chain.retriever.ainvoke(transcript, config=trace_config(profile.pipeline))
+        return "\n\n".join(doc.page_content for doc in docs)
+
+    async def _structured_analysis(self, profile: SymptomProfile, transcript: str, prompt: str) -> Dict[str, Any]:
+        """
+        JSON-mode analysis validated into SymptomAnalysis
+
+        Invalid output gets exactly one repair call; if that fails too, the
+        fields that do validate are kept and the rest fall back to defaults.
+        """
+        context = await self._reference_context(profile, transcript)
+        if context:
+            prompt += f"\n\nRelevant medical reference material:\n{context}\n"
+        prompt += JSON_INSTRUCTIONS
+
+        await lifecycle.aget("symptom_llm")
+        llm = self._profile_llm(profile).bind(response_format={"type": "json_object"})
+
+        with stage(profile.pipeline, "analysis_llm"):
+            text = (await llm.ainvoke(prompt, config=trace_config(profile.pipeline))).content
+        try:
+            with stage(profile.pipeline, "parse"):
+                analysis = parse_analysis_json(text)
+            analysis_outputs.inc(pipeline=profile.pipeline, outcome="ok")
+            return analysis.model_dump()
+        except ValueError as e:
+            logger.warning(f"Analysis output failed validation, repairing: {str(e)[:200]}")
+            error = e
+
+        with stage(profile.pipeline, "analysis_repair"):
+            text = (await llm.ainvoke(repair_prompt(text, error), config=trace_config(profile.pipeline))).content
+        try:
+            analysis = parse_analysis_json(text)
+            analysis_outputs.inc(pipeline=profile.pipeline, outcome="repaired")
+            return analysis.model_dump()
+        except ValueError as e:
+            logger.error(f"Repaired analysis still invalid, salvaging fields: {str(e)[:200]}")
+            analysis_outputs.inc(pipeline=profile.pipeline, outcome="salvaged")
+            return salvage_analysis(text)
+
+    def _parse_analysis_response(self, analysis_text: str, pipeline: Optional[str] = None) -> Dict[str, Any]:
         """Parse the structured analysis response from LLM"""
         try:
             # Initialize result dictionary
@@ -380,9 +371,11 @@ Be medically cautious and focus on appropriate triage.
                 "friendly_summary": r"9\.\s*💬.*?Friendly Summary:(.*?)(?=10\.|$)"
             }
 
+            matched = 0
             for key, pattern in sections.items():
                 match = re.search(pattern, analysis_text, re.DOTALL | re.IGNORECASE)
                 if match:
+                    matched += 1
                     content = match.group(1).strip()
 
                     if key in ["home_remedies", "supportive_care", "possible_causes"]:
@@ -400,28 +393,25 @@ Be medically cautious and focus on appropriate triage.
             if not any(result.values()):
                 result["friendly_summary"] = analysis_text[:200]
 
+            if pipeline:
+                outcome = "regex_ok" if matched == len(sections) else "regex_partial"
+                analysis_outputs.inc(pipeline=pipeline, outcome=outcome)
+
             return result
 
         except Exception as e:
             logger.error(f"Failed to parse analysis response: {e}")
             # Return default structure with original text
-            return {
-                "symptom_details": {"description": "Analysis parsing failed"},
-                "recommended_specialty": "General Physician",
-                "urgency_level": "Consult healthcare provider",
-                "home_remedies": ["Consult healthcare provider"],
-                "supportive_care": [],
-                "advice_next_steps": "Please consult a healthcare provider",
-                "first_aid": None,
-                "possible_causes": ["Unable to determine"],
-                "friendly_summary": "Please consult with a healthcare provider for proper assessment."
-            }
+            return dict(FALLBACK_ANALYSIS)
+
 
-    async def query_knowledge_base(self, query: str, max_results: int = 3) -> Tuple[str, List[Dict[str, Any]]]:
+    async def query_knowledge_base(self, profile: SymptomProfile, query: str,
+                                   max_results: int = 3) -> Tuple[str, List[Dict[str, Any]]]:
         """
-        Query the symptom knowledge base using RAG
+        Query the profile's knowledge base using RAG
 
         Args:
+            profile: Population profile the request was made for
             query: User's medical query
             max_results: Maximum number of source documents to return
 
@@ -429,13 +419,15 @@ Be medically cautious and focus on appropriate triage.
             Tuple of (answer, source_documents)
         """
         try:
-            if not self.qa_chain:
+            qa_chain = await self._qa_chain(profile)
+            if not qa_chain:
                 raise ValueError("QA chain not initialized - symptom database may not be available")
 
             logger.info(f"Processing RAG query: {query[:100]}...")
 
             # Run the query through RAG chain
-            result = self.qa_chain.invoke({"query": query})
+            with stage(profile.pipeline, "rag_chain"):
+                result = await qa_chain.ainvoke({"query": query}, config=trace_config(profile.pipeline))
 
             answer = result["result"]
             source_docs = []
@@ -455,32 +447,30 @@ Be medically cautious and focus on appropriate triage.
             logger.error(f"RAG query failed: {e}")
             raise
 
-    async def direct_llm_query(self, query: str) -> str:
+    async def direct_llm_query(self, profile: SymptomProfile, query: str) -> str:
         """
         Direct query to LLM without RAG
 
         Args:
+            profile: Population profile the request was made for
             query: User's query
 
         Returns:
             LLM response
         """
         try:
-            if not self.llm:
-                raise ValueError("LLM not initialized")
-
             logger.info("Processing direct LLM query...")
 
             # Add medical context to the query
             medical_prompt = f"""
-As a medical AI assistant, please provide helpful information about the following query. 
+As a medical AI assistant, please provide helpful information about the following query.
 Remember to always recommend consulting healthcare professionals for medical advice.
 
 Query: {query}
 
 Response:"""
 
-            response = await self._direct_llm_query(medical_prompt)
+            response = await self._direct_llm_query(profile, medical_prompt)
 
             logger.info("Direct LLM query completed")
             return response
@@ -489,12 +479,11 @@ Response:"""
             logger.error(f"Direct LLM query failed: {e}")
             raise
 
-    async def _direct_llm_query(self, prompt: str) -> str:
+    async def _direct_llm_query(self, profile: SymptomProfile, prompt: str) -> str:
         """Internal method for direct LLM queries"""
         try:
-            # Since ChatGroq might not be fully async, run in executor
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(None, self.llm.invoke, prompt)
+            await lifecycle.aget("symptom_llm")
+            response = await self._profile_llm(profile).ainvoke(prompt, config=trace_config(profile.pipeline))
 
             # Extract content from ChatGroq response
             if hasattr(response, 'content'):
@@ -504,4 +493,7 @@ Response:"""
 
         except Exception as e:
             logger.error(f"LLM invocation failed: {e}")
-            raise
\ No newline at end of file
+            raise
+
+
+symptom_engine = SymptomEngine()
@@ -0,0 +1,89 @@
+import asyncio
+import base64
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from core.audio import SAMPLE_RATE, AudioDecodeError, decode_audio, decode_audio_async, needs_seekable_input
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+
+SECONDS = 2.0
+FORMATS = {
+    "wav": ["-c:a", "pcm_s16le"],
+    "mp3": ["-c:a", "libmp3lame"],
+    "ogg": ["-c:a", "libvorbis"],
+    "webm": ["-c:a", "libopus"],
+    # ffmpeg writes the moov atom after the audio, like the app's m4a recordings
+    "m4a": ["-c:a", "aac"],
+}
+NOT_AUDIO = [b"not audio at all", "%%% not base64 %%%"]
+
+
+@pytest.fixture(scope="module")
+def fixtures(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("audio")
+    clips = {}
+    for fmt, codec in FORMATS.items():
+        path = tmp / f"tone.{fmt}"
+        subprocess.run(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-f", "lavfi",
+             "-i", f"sine=frequency=440:duration={SECONDS}:sample_rate=44100", *codec, str(path)],
+            check=True,
+        )
+        clips[fmt] = path.read_bytes()
+    return clips
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_decodes_raw_bytes(fixtures, fmt):
+    audio = decode_audio(fixtures[fmt])
+    assert audio.dtype == np.float32 and audio.ndim == 1
+    # Lossy encoders pad a few frames at either end
+    assert abs(len(audio) / SAMPLE_RATE - SECONDS) < 0.1
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_decodes_base64(fixtures, fmt):
+    data = fixtures[fmt]
+    encoded = base64.b64encode(data).decode()
+    expected = decode_audio(data)
+    assert np.array_equal(decode_audio(encoded), expected)
+    assert np.array_equal(decode_audio(f"data:audio/{fmt};base64,{encoded}"), expected)
+
+
+def test_m4a_is_decoded_from_a_file(fixtures):
+    assert needs_seekable_input(fixtures["m4a"])
+    assert not any(needs_seekable_input(fixtures[fmt]) for fmt in ("wav", "mp3", "ogg", "webm"))
+
+
+def test_async_decode_matches(fixtures):
+    for data in (fixtures["webm"], fixtures["m4a"]):
+        assert np.array_equal(asyncio.run(decode_audio_async(data)), decode_audio(data))
+
+
+@pytest.mark.parametrize("bad", NOT_AUDIO)
+def test_rejects_what_is_not_audio(bad):
+    with pytest.raises(AudioDecodeError):
+        decode_audio(bad)
+
+
+@pytest.mark.parametrize("bad", NOT_AUDIO)
+def test_not_audio_is_a_400(bad):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from routes.symptom.profiles import NEWBORN
+    from routes.symptom.symptom import create_symptom_router
+
+    app = FastAPI()
+    app.include_router(create_symptom_router(NEWBORN))
+    client = TestClient(app)
+
+    if isinstance(bad, bytes):
+        response = client.post("/medical/transcribe-file", files={"file": ("clip.webm", bad)})
+    else:
+        response = client.post("/medical/transcribe", json={"audio_data": bad})
+    assert response.status_code == 400, response.text
@@ -0,0 +1,46 @@
+import asyncio
+
+from core.batching import MicroBatcher
+
+
+def _run(batcher, items):
+    async def main():
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True), 5
+        )
+    return asyncio.run(main())
+
+
+def test_every_caller_gets_its_own_result():
+    batcher = MicroBatcher("double", lambda items: [item * 2 for item in items], max_batch_size=4)
+    assert _run(batcher, range(10)) == [item * 2 for item in range(10)]
+    assert batcher.stats()["items"] == 10 and batcher.stats()["largest_batch"] == 4
+
+
+def test_short_result_list_fails_the_batch_instead_of_hanging():
+    batcher = MicroBatcher("short", lambda items: items[:-1], max_batch_size=8, max_wait_ms=50)
+    results = _run(batcher, range(3))
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_batch_fn_error_reaches_every_caller():
+    def fail(items):
+        raise ValueError("model not loaded")
+
+    results = _run(MicroBatcher("fail", fail), range(3))
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_restarted_worker_keeps_queued_items():
+    async def main():
+        batcher = MicroBatcher("restart", lambda items: [item + 1 for item in items])
+        batcher._ensure_worker()
+        queued = asyncio.get_running_loop().create_future()
+        batcher._queue.put_nowait((1, queued))
+        # The worker dies before it reads the queued item
+        batcher._worker.cancel()
+        await asyncio.sleep(0)
+        second = await asyncio.wait_for(batcher.submit(3), 5)
+        return await asyncio.wait_for(queued, 5), second
+
+    assert asyncio.run(main()) == (2, 4)
@@ -0,0 +1,47 @@
+import pytest
+
+from auth.mod.compositions import CompositionCache, normalize_meal_name, typo_distance
+
+
+@pytest.fixture(scope="module")
+def cache():
+    # Bundled nutrient table only, no MongoDB
+    return CompositionCache(None)
+
+
+@pytest.mark.parametrize("name, other", [
+    ("veg curry", "egg curry"),
+    ("egg biryani", "veg biryani"),
+])
+def test_fuzzy_does_not_swap_the_distinguishing_word(cache, name, other):
+    assert normalize_meal_name(other) in cache.table
+    assert cache.lookup(name) == (None, None)
+    assert typo_distance(normalize_meal_name(name).split(), normalize_meal_name(other).split()) is None
+
+
+@pytest.mark.parametrize("typo, dish", [
+    ("chiken curry", "chicken curry"),
+    ("upmaa", "upma"),
+    ("masala dossa", "masala dosa"),
+])
+def test_fuzzy_fixes_spelling(cache, typo, dish):
+    composition, source = cache.lookup(typo)
+    assert source == "fuzzy"
+    assert composition == cache.table[normalize_meal_name(dish)]
+
+
+def test_fuzzy_needs_the_same_words():
+    assert typo_distance(["chiken", "curry"], ["chicken", "curry"]) == 1
+    assert typo_distance(["curry"], ["chicken", "curry"]) is None
+    assert typo_distance(["chicken", "curry", "rice"], ["chicken", "curry"]) is None
+
+
+@pytest.mark.parametrize("name, normalized", [
+    ("French Fries", "french fry"),
+    ("1 plate of fry", "fry"),
+    ("2 bowls of Dal-Rice", "dal rice"),
+    ("idlis", "idli"),
+    ("hummus", "hummus"),
+])
+def test_normalize_meal_name(name, normalized):
+    assert normalize_meal_name(name) == normalized
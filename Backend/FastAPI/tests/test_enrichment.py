@@ -0,0 +1,86 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from auth.mod.compositions import CompositionCache
+from auth.mod.enrichment import CompositionEnricher
+from auth.mod.models import MealComposition
+
+mongomock = pytest.importorskip("mongomock")
+
+DISHES = ["quinoa bowl", "miso ramen", "falafel wrap", "bibimbap", "moussaka", "shakshuka"]
+
+
+def _wait(condition, seconds=5.0):
+    deadline = time.monotonic() + seconds
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+@pytest.fixture
+def meals():
+    collection = mongomock.MongoClient().db.meals
+    logged = datetime.utcnow() - timedelta(hours=1)
+    for i, dish in enumerate(DISHES):
+        collection.insert_one({
+            "_id": ObjectId.from_datetime(logged + timedelta(seconds=i)), "username": "u",
+            "date": "2026-01-01", "time": "13:00", "meal_name": dish, "meal_type": "lunch",
+            "composition": None, "composition_status": "pending",
+        })
+    return collection
+
+
+@pytest.fixture
+def gemini():
+    asked, lock = [], threading.Lock()
+
+    def batch_fn(names):
+        with lock:
+            asked.extend(names)
+        time.sleep(0.05)
+        return [MealComposition(carbs=0.5, proteins=0.25, fats=0.25) for _ in names]
+    return asked, batch_fn
+
+
+def _pending(meals):
+    return meals.count_documents({"composition_status": "pending"})
+
+
+def test_workers_split_pending_meals_without_asking_twice(meals, gemini):
+    asked, batch_fn = gemini
+    # A live process elsewhere holds the last meal
+    meals.update_one({"meal_name": DISHES[-1]},
+                     {"$set": {"claimed_by": "elsewhere", "claimed_until": datetime.utcnow() + timedelta(minutes=5)}})
+
+    workers = [CompositionEnricher(meals, CompositionCache(None, table={}), batch_fn,
+                                   max_wait_seconds=0.05, sweep_interval_seconds=0.2) for _ in range(2)]
+    try:
+        for worker in workers:
+            worker.resume()
+        assert _wait(lambda: _pending(meals) == 1)
+        assert sorted(asked) == sorted(DISHES[:-1])
+        assert meals.count_documents({"claimed_by": {"$exists": True}}) == 1
+
+        # Its lease runs out: the next sweep takes it over
+        meals.update_one({"meal_name": DISHES[-1]}, {"$set": {"claimed_until": datetime.utcnow()}})
+        assert _wait(lambda: _pending(meals) == 0)
+        assert sorted(asked) == sorted(DISHES)
+    finally:
+        for worker in workers:
+            worker.stop()
+
+
+def test_sweep_leaves_recent_meals_to_the_process_that_stored_them(meals, gemini):
+    _, batch_fn = gemini
+    fresh = meals.insert_one({"username": "u", "date": "2026-01-02", "time": "09:00", "meal_name": "poha",
+                              "meal_type": "breakfast", "composition": None,
+                              "composition_status": "pending"}).inserted_id
+
+    worker = CompositionEnricher(meals, CompositionCache(None, table={}), batch_fn, sweep_interval_seconds=60)
+    worker._sweep()
+    assert worker.stats()["swept"] == len(DISHES)
+    assert fresh not in worker._held
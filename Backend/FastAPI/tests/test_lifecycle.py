@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+import pytest
+
+from core import lifecycle as lifecycle_module
+from core.lifecycle import FAILED, READY, ComponentUnavailable, LifecycleManager
+
+
+@pytest.fixture
+def flaky(monkeypatch):
+    monkeypatch.setattr(lifecycle_module, "RETRY_SECONDS", 0.05)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        if len(calls) < 3:
+            raise OSError("model download failed")
+        return "model"
+
+    manager = LifecycleManager()
+    manager.register("model", loader)
+    return manager, calls
+
+
+def test_failed_component_is_retried_after_backoff(flaky):
+    manager, calls = flaky
+    with pytest.raises(ComponentUnavailable):
+        manager.get("model")
+    # Within the backoff the failure is returned without calling the loader
+    assert manager.try_get("model") is None
+    assert len(calls) == 1 and manager.is_failed("model")
+    assert manager.status()["components"]["model"]["retry_in_seconds"] > 0
+
+    time.sleep(0.08)
+    with pytest.raises(ComponentUnavailable):
+        manager.get("model")
+    # The second failure doubles the backoff
+    assert manager.try_get("model") is None
+    assert manager.status()["components"]["model"]["retry_in_seconds"] > 0.05
+    time.sleep(0.15)
+    assert manager.get("model") == "model"
+    assert len(calls) == 3 and manager.is_ready("model")
+    assert manager.status()["components"]["model"]["error"] is None
+
+
+def test_atry_get(flaky):
+    manager, calls = flaky
+
+    async def main():
+        first = await manager.atry_get("model")
+        await asyncio.sleep(0.08)
+        second = await manager.atry_get("model")
+        await asyncio.sleep(0.15)
+        return first, second, await manager.atry_get("model")
+
+    assert asyncio.run(main()) == (None, None, "model")
+    assert manager._components["model"].state == READY
+
+
+def test_failed_state_is_kept_until_a_retry_succeeds(flaky):
+    manager, _ = flaky
+    assert manager.try_get("model") is None
+    assert manager._components["model"].state == FAILED
@@ -0,0 +1,23 @@
+import pytest
+
+from auth.mod.models import Meal, normalize_meal_time
+
+
+@pytest.mark.parametrize("typed, stored", [
+    ("8:30", "08:30"),
+    ("08:30", "08:30"),
+    ("19:30", "19:30"),
+    (" 9:05 ", "09:05"),
+    ("8:30 pm", "20:30"),
+    ("7pm", "19:00"),
+    ("12:05 AM", "00:05"),
+    ("after lunch", "after lunch"),
+])
+def test_normalize_meal_time(typed, stored):
+    assert normalize_meal_time(typed) == stored
+
+
+def test_stored_times_sort_in_time_order():
+    typed = ["19:30", "8:30", "12:00", "7:05"]
+    meals = [Meal(time=t, meal_name="idli", meal_type="snack") for t in typed]
+    assert sorted(meal.time for meal in meals) == ["07:05", "08:30", "12:00", "19:30"]